@@ -2,12 +2,17 @@
 
 from logging.config import fileConfig
 
+import asyncio
+
 from alembic import context
 from sqlalchemy import engine_from_config, pool
+from sqlalchemy.engine import Connection, make_url
+from sqlalchemy.ext.asyncio import async_engine_from_config
 
 # Import Base + models so metadata is populated
 from app.db import Base
 import app.models  # noqa: F401
+from app.fts import FTS_TABLE
 import os
 
 
@@ -16,11 +21,18 @@ fileConfig(config.config_file_name)
 
 target_metadata = Base.metadata
 
-db_url = os.getenv("ALEMBIC_DATABASE_URL")
+# ALEMBIC_DATABASE_URL wins; otherwise migrate the app's own DATABASE_URL.
+# Async drivers (asyncpg, aiosqlite) are run through an async engine.
+db_url = os.getenv("ALEMBIC_DATABASE_URL") or os.getenv("DATABASE_URL")
 if db_url:
     config.set_main_option("sqlalchemy.url", db_url)
 
 
+def include_name(name, type_, parent_names) -> bool:
+    # The FTS5 index and its shadow tables are managed by raw DDL, not the models.
+    return not (type_ == "table" and name is not None and name.startswith(FTS_TABLE))
+
+
 def run_migrations_offline() -> None:
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
@@ -28,14 +40,44 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         compare_type=True,
+        include_name=include_name,
     )
 
     with context.begin_transaction():
         context.run_migrations()
 
 
+def do_run_migrations(connection: Connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        compare_type=True,
+        include_name=include_name,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_async_migrations(section: dict) -> None:
+    connectable = async_engine_from_config(
+        section,
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool,
+    )
+
+    async with connectable.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+
+    await connectable.dispose()
+
+
 def run_migrations_online() -> None:
     section = config.get_section(config.config_ini_section) or {}
+    if make_url(section["sqlalchemy.url"]).get_dialect().is_async:
+        asyncio.run(run_async_migrations(section))
+        return
+
     connectable = engine_from_config(
         section,
         prefix="sqlalchemy.",
@@ -44,14 +86,7 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(
-            connection=connection,
-            target_metadata=target_metadata,
-            compare_type=True,
-        )
-
-        with context.begin_transaction():
-            context.run_migrations()
+        do_run_migrations(connection)
 
 
 if context.is_offline_mode():
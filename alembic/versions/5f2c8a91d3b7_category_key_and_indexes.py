@@ -0,0 +1,54 @@
+"""category_key and indexes
+
+Revision ID: 5f2c8a91d3b7
+Revises: ae750751e4c7
+Create Date: 2026-10-17 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2c8a91d3b7'
+down_revision: Union[str, Sequence[str], None] = 'ae750751e4c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _category_key(category: str) -> str:
+    # Frozen copy of app.models.category_key: migrations must not change
+    # behaviour when the application helper does.
+    return " ".join(str(category).replace("\u00A0", " ").split()).casefold()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('category_key', sa.String(length=255), nullable=True))
+
+    # Backfill in Python: SQLite's lower() does not fold non-ASCII (Cyrillic) letters.
+    conn = op.get_bind()
+    products = sa.table('products', sa.column('id', sa.Integer), sa.column('category', sa.String), sa.column('category_key', sa.String))
+    categories = conn.execute(sa.select(products.c.category).distinct()).scalars().all()
+    for cat in categories:
+        conn.execute(
+            products.update().where(products.c.category == cat).values(category_key=_category_key(cat))
+        )
+
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.alter_column('category_key', existing_type=sa.String(length=255), nullable=False)
+        batch_op.create_index('ix_products_category_key_id', ['category_key', 'id'], unique=False)
+
+    op.create_index('ix_orders_product_id', 'orders', ['product_id'], unique=False)
+    op.create_index('ix_orders_created_at', 'orders', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_orders_created_at', table_name='orders')
+    op.drop_index('ix_orders_product_id', table_name='orders')
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_index('ix_products_category_key_id')
+        batch_op.drop_column('category_key')
@@ -0,0 +1,44 @@
+"""product_stats
+
+Revision ID: c41e7b0a9d26
+Revises: 5f2c8a91d3b7
+Create Date: 2026-10-17 10:03:11.482915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e7b0a9d26'
+down_revision: Union[str, Sequence[str], None] = '5f2c8a91d3b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('product_stats',
+    sa.Column('category_key', sa.String(length=255), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('price_sum', sa.Float(), nullable=False),
+    sa.Column('min_price', sa.Float(), nullable=False),
+    sa.Column('max_price', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('category_key')
+    )
+    # Backfill: one row per category plus the global row (category_key = '').
+    op.execute(
+        "INSERT INTO product_stats (category_key, count, price_sum, min_price, max_price) "
+        "SELECT category_key, count(id), sum(price), min(price), max(price) FROM products GROUP BY category_key"
+    )
+    op.execute(
+        "INSERT INTO product_stats (category_key, count, price_sum, min_price, max_price) "
+        "SELECT '', count(id), sum(price), min(price), max(price) FROM products HAVING count(id) > 0"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('product_stats')
@@ -0,0 +1,63 @@
+"""order rollups and orders (created_at, id) index
+
+Revision ID: d7e3f1a2b4c6
+Revises: c41e7b0a9d26
+Create Date: 2026-10-17 15:40:22.907311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7e3f1a2b4c6'
+down_revision: Union[str, Sequence[str], None] = 'c41e7b0a9d26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _bucket_sql(dialect: str, granularity: str) -> str:
+    if dialect == "postgresql":
+        return f"date_trunc('{granularity}', o.created_at)"
+    # SQLAlchemy stores SQLite DateTime as 'YYYY-MM-DD HH:MM:SS.ffffff'.
+    fmt = "%Y-%m-%d %H:00:00.000000" if granularity == "hour" else "%Y-%m-%d 00:00:00.000000"
+    return f"strftime('{fmt}', o.created_at)"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('order_rollups',
+    sa.Column('granularity', sa.String(length=8), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('category_key', sa.String(length=255), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('granularity', 'bucket_start', 'product_id')
+    )
+    op.create_index('ix_order_rollups_category', 'order_rollups', ['granularity', 'category_key', 'bucket_start'], unique=False)
+
+    # Backfill from existing orders; the category is the product's current one.
+    dialect = op.get_bind().dialect.name
+    for granularity in ("hour", "day"):
+        bucket = _bucket_sql(dialect, granularity)
+        op.execute(
+            "INSERT INTO order_rollups (granularity, bucket_start, product_id, category_key, orders, quantity, revenue) "
+            f"SELECT '{granularity}', {bucket}, o.product_id, p.category_key, count(o.id), sum(o.quantity), sum(o.total_price) "
+            "FROM orders o JOIN products p ON p.id = o.product_id "
+            f"GROUP BY {bucket}, o.product_id, p.category_key"
+        )
+
+    op.create_index('ix_orders_created_at_id', 'orders', ['created_at', 'id'], unique=False)
+    op.drop_index('ix_orders_created_at', table_name='orders')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_orders_created_at', 'orders', ['created_at'], unique=False)
+    op.drop_index('ix_orders_created_at_id', table_name='orders')
+    op.drop_index('ix_order_rollups_category', table_name='order_rollups')
+    op.drop_table('order_rollups')
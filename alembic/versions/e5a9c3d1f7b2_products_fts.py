@@ -0,0 +1,54 @@
+"""products full-text index (SQLite FTS5)
+
+Revision ID: e5a9c3d1f7b2
+Revises: d7e3f1a2b4c6
+Create Date: 2026-10-17 18:21:05.640193
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a9c3d1f7b2'
+down_revision: Union[str, Sequence[str], None] = 'd7e3f1a2b4c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Frozen copy of app.fts.CREATE_STATEMENTS.
+_CREATE = [
+    "CREATE VIRTUAL TABLE products_fts USING fts5("
+    "name, category, content='products', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE VIRTUAL TABLE products_fts_vocab USING fts5vocab(products_fts, 'row')",
+    "CREATE TRIGGER products_fts_ai AFTER INSERT ON products BEGIN "
+    "INSERT INTO products_fts(rowid, name, category) VALUES (new.id, new.name, new.category); END",
+    "CREATE TRIGGER products_fts_ad AFTER DELETE ON products BEGIN "
+    "INSERT INTO products_fts(products_fts, rowid, name, category) VALUES ('delete', old.id, old.name, old.category); END",
+    "CREATE TRIGGER products_fts_au AFTER UPDATE OF name, category ON products BEGIN "
+    "INSERT INTO products_fts(products_fts, rowid, name, category) VALUES ('delete', old.id, old.name, old.category); "
+    "INSERT INTO products_fts(rowid, name, category) VALUES (new.id, new.name, new.category); END",
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # FTS5 is SQLite-only; on PostgreSQL search_products falls back to ILIKE.
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for stmt in _CREATE:
+        op.execute(stmt)
+    # Backfill: index the existing catalog from the content table.
+    op.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for trigger in ("products_fts_au", "products_fts_ad", "products_fts_ai"):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS products_fts_vocab")
+    op.execute("DROP TABLE IF EXISTS products_fts")
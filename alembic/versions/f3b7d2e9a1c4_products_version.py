@@ -0,0 +1,34 @@
+"""products_version
+
+Revision ID: f3b7d2e9a1c4
+Revises: e5a9c3d1f7b2
+Create Date: 2026-10-17 21:12:47.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b7d2e9a1c4'
+down_revision: Union[str, Sequence[str], None] = 'e5a9c3d1f7b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('products_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # The single row; every product write increments it.
+    op.execute("INSERT INTO products_version (id, version) VALUES (1, 1)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('products_version')
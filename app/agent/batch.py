@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from functools import partial
+from typing import Any, AsyncContextManager, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from . import metrics
+from .graph import (
+    INTENT_CALLS,
+    PART_SEPARATOR,
+    UNKNOWN_ANSWER,
+    add_product_answer,
+    create_order_answer,
+    discount_answer,
+    get_order_answer,
+    list_category_answer,
+    list_orders_answer,
+    search_answer,
+    stats_answer,
+)
+from .mcp_client import MCPProductsClient, MCPToolClient
+from .mcp_pool import orders_session, products_session
+from .mock_llm import PLANNER
+from .response_cache import category_key, search_key
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_BATCH_CONCURRENCY = int(os.getenv("AGENT_BATCH_CONCURRENCY", "8"))
+
+
+async def _get_product(mcp: MCPProductsClient, product_id: int) -> Dict[str, Any]:
+    return await mcp.get_product(product_id=product_id)
+
+
+async def run_agent_batch(queries: List[str], concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Answer many queries with one tool call per distinct read.
+
+    All queries are planned up front. Reads are grouped by what they fetch:
+    listings and statistics by category (or the whole catalog), discounts
+    by product id, searches by normalized text, and order lookups by order
+    id. Each group makes one MCP call whose result every query in it
+    reuses. The parts of a multi-intent query join the groups like separate
+    queries, and their answers are merged in plan order. Writes
+    (add_product, create_order) run first, one call each, so the reads in
+    the same batch see them. At most ``concurrency`` MCP sessions are used
+    at once. Results come back in input order, shaped like ``run_agent``.
+    """
+    limit = asyncio.Semaphore(concurrency or DEFAULT_BATCH_CONCURRENCY)
+    with metrics.track("plan"):
+        plans = PLANNER.plan_batch(queries)
+    for plan in plans:
+        metrics.count_intent(plan.get("intent", "unknown"))
+    results: List[Dict[str, Any]] = [
+        {"answer": "", "trace": [f"plan={plan}"], "plan": plan} for plan in plans
+    ]
+    # Sub-plans of multi-intent queries get entries after the queries' own.
+    parts: Dict[int, List[int]] = {}
+    for i, plan in enumerate(list(plans)):
+        if plan.get("intent") == "multi":
+            parts[i] = list(range(len(plans), len(plans) + len(plan["plans"])))
+            plans.extend(plan["plans"])
+            results.extend({"answer": "", "trace": []} for _ in plan["plans"])
+
+    async def run(
+        indices: List[int],
+        call: Callable[[Any], Awaitable[Any]],
+        finish: Callable[[int, Any], str],
+        session: Callable[[], AsyncContextManager[MCPToolClient]] = products_session,
+    ) -> None:
+        async with limit:
+            try:
+                async with session() as mcp:
+                    value = await call(mcp)
+            except Exception as e:
+                logger.exception("batch tool call failed")
+                metrics.count_error("exec", type(e))
+                for i in indices:
+                    results[i]["answer"] = f"Ошибка: {e}"
+                    results[i]["trace"].append(f"error:{type(e).__name__}")
+                return
+        for i in indices:
+            results[i]["answer"] = finish(i, value)
+            results[i]["trace"].append(INTENT_CALLS[plans[i]["intent"]])
+            if len(indices) > 1:
+                results[i]["trace"].append(f"batched:{len(indices)}")
+
+    def shared(_i: int, answer: str) -> str:
+        return answer
+
+    def with_discount(i: int, product: Dict[str, Any]) -> str:
+        return discount_answer(product, float(plans[i]["discount_percent"]))
+
+    writes: List[Awaitable[None]] = []
+    groups: Dict[Hashable, List[int]] = {}
+    for i, plan in enumerate(plans):
+        intent = plan.get("intent", "unknown")
+        if intent == "multi":
+            continue
+        if intent == "add_product":
+            writes.append(run([i], partial(add_product_answer, plan=plan), shared))
+        elif intent == "create_order":
+            writes.append(run([i], partial(create_order_answer, plan=plan), shared, orders_session))
+        elif intent == "list_by_category":
+            groups.setdefault(("list", category_key(plan.get("category"))), []).append(i)
+        elif intent == "stats":
+            groups.setdefault(("stats", category_key(plan.get("category"))), []).append(i)
+        elif intent == "discount":
+            groups.setdefault(("discount", int(plan["product_id"])), []).append(i)
+        elif intent == "search":
+            groups.setdefault(("search", search_key(plan.get("text"))), []).append(i)
+        elif intent == "get_order":
+            groups.setdefault(("order", int(plan["order_id"])), []).append(i)
+        elif intent == "list_orders":
+            groups.setdefault(("orders", None), []).append(i)
+        else:
+            results[i]["answer"] = UNKNOWN_ANSWER
+            results[i]["trace"].append("intent:unknown")
+
+    await asyncio.gather(*writes)
+
+    reads: List[Awaitable[None]] = []
+    for (kind, key), indices in groups.items():
+        category = plans[indices[0]].get("category")
+        if kind == "list":
+            reads.append(run(indices, partial(list_category_answer, category=category), shared))
+        elif kind == "stats":
+            reads.append(run(indices, partial(stats_answer, category=category), shared))
+        elif kind == "discount":
+            reads.append(run(indices, partial(_get_product, product_id=key), with_discount))
+        elif kind == "search":
+            reads.append(run(indices, partial(search_answer, text=plans[indices[0]]["text"]), shared))
+        elif kind == "order":
+            reads.append(run(indices, partial(get_order_answer, order_id=key), shared, orders_session))
+        else:
+            reads.append(run(indices, list_orders_answer, shared, orders_session))
+
+    await asyncio.gather(*reads)
+
+    for i, subs in parts.items():
+        results[i]["answer"] = PART_SEPARATOR.join(results[j]["answer"] for j in subs)
+        for j in subs:
+            results[i]["trace"].extend(results[j]["trace"])
+        results[i]["trace"].append(f"fanout:{len(subs)}")
+    return results[:len(queries)]
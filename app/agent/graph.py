@@ -1,82 +1,315 @@
 from __future__ import annotations
 
+import asyncio
 import json
-import os
-from typing import Any, Dict
+from contextlib import AsyncExitStack, nullcontext
+from typing import Any, AsyncContextManager, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
+from fastmcp.exceptions import ToolError
 from langchain_core.messages import HumanMessage
+from langchain_core.tools import BaseTool
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
+from langgraph.types import StreamWriter
 
+from . import metrics
 from .types import AgentState, Plan
-from .mock_llm import MockPlannerLLM
-from .mcp_client import MCPProductsClient
-from .tools_custom import calc_discount, format_products, format_statistics
+from .mock_llm import PLANNER
+from .response_cache import RESPONSE_CACHE, plan_cache_key
+from .mcp_client import ORDERS_PAGE_SIZE, STREAM_FIRST_PAGE_SIZE, MCPOrdersClient, MCPProductsClient
+from .mcp_pool import orders_session, products_session
+from .tools_custom import calc_discount, format_orders, format_products, format_statistics
 
 
 
+UNKNOWN_ANSWER = (
+    "Не понял запрос. Примеры:\n"
+    "- Покажи все продукты в категории Электроника\n"
+    "- Какая средняя цена продуктов?\n"
+    "- Добавь новый продукт: Мышка, цена 1500, категория Электроника\n"
+    "- Посчитай скидку 15% на товар с ID 1\n"
+    "- Закажи 2 шт товара с ID 1\n"
+    "- Покажи мои заказы\n"
+    "- Найди ноутбук"
+)
+
+# Trace entry recorded for each intent's tool calls.
+INTENT_CALLS = {
+    "list_by_category": "called:list_products",
+    "stats": "called:get_statistics",
+    "add_product": "called:add_product",
+    "discount": "called:get_product+calc_discount",
+    "create_order": "called:create_orders_batch",
+    "get_order": "called:get_order",
+    "list_orders": "called:list_orders",
+    "search": "called:search_products",
+}
+
+# Intents served by the orders MCP server rather than the products one.
+ORDER_INTENTS = frozenset({"create_order", "get_order", "list_orders"})
+
+# Separates the sub-answers of a multi-intent query.
+PART_SEPARATOR = "\n\n"
+
+
+def _format(formatter: BaseTool, payload: Dict[str, Any]) -> str:
+    # Call the tool's function directly: .invoke() validates the whole payload
+    # through the tool's pydantic schema and runs callbacks, which costs ~4x the
+    # formatting itself on large listings. Payloads here are already typed.
+    with metrics.track("format"):
+        return formatter.func(**payload)
+
+
+# Receives each formatted piece of an answer as soon as it is ready.
+Emit = Callable[[str], None]
+
+
+async def list_category_answer(
+    mcp: MCPProductsClient, category: Optional[str], emit: Optional[Emit] = None
+) -> str:
+    # Format page by page so only one page of rows is alive at a time.
+    chunks = []
+    first_page = STREAM_FIRST_PAGE_SIZE if emit is not None else None
+    async for page in mcp.iter_products(category=category, first_page_size=first_page):
+        chunks.append(_format(format_products, {"products": page}))
+        if emit is not None:
+            emit(chunks[-1])
+    return "\n".join(chunks) if chunks else "Ничего не найдено."
+
+
+async def stats_answer(mcp: MCPProductsClient, category: Optional[str]) -> str:
+    stats = await mcp.get_statistics(category=category)
+    return _format(format_statistics, {"stats": stats})
+
+
+async def search_answer(mcp: MCPProductsClient, text: str) -> str:
+    res = await mcp.search_products(query=text)
+    if "error" in res:
+        return f"Ошибка MCP: {res['error']}"
+    answer = _format(format_products, {"products": res["items"]})
+    if res.get("corrections"):
+        fixed = ", ".join(f"{word} → {' / '.join(alts)}" for word, alts in res["corrections"].items())
+        answer = f"С учётом опечаток: {fixed}\n" + answer
+    if res.get("next_offset") is not None:
+        answer += f"\nПоказаны первые {len(res['items'])} совпадений; уточните запрос."
+    return answer
+
+
+async def add_product_answer(mcp: MCPProductsClient, plan: Plan) -> str:
+    p = await mcp.add_product(
+        name=str(plan["name"]),
+        price=float(plan["price"]),
+        category=str(plan["category"]),
+        in_stock=bool(plan.get("in_stock", True)),
+    )
+    if "error" not in p:
+        RESPONSE_CACHE.invalidate_category(p.get("category"))
+    return "Добавлено:\n" + _format(format_products, {"products": [p]})
+
+
+def discount_answer(p: Dict[str, Any], disc: float) -> str:
+    if "error" in p:
+        return f"Ошибка MCP: {p['error']}"
+    new_price = calc_discount.invoke({"price": float(p["price"]), "percent": disc})["final_price"]
+    return (
+        f'Товар: #{p["id"]} — {p["name"]}\n'
+        f'Цена: {p["price"]}\n'
+        f'Скидка: {disc}%\n'
+        f'Цена со скидкой: {new_price:.2f}'
+    )
+
+
+async def create_order_answer(mcp: MCPOrdersClient, plan: Plan) -> str:
+    # One call for all items: prices are read in one query and the orders
+    # are inserted in one transaction, so either all are created or none.
+    try:
+        orders = await mcp.create_orders_batch(plan["items"])
+    except ToolError as e:
+        return f"Ошибка MCP: {e}"
+    # No cached intent reads orders today; drop everything so one that does
+    # later can't serve a pre-order answer.
+    RESPONSE_CACHE.clear()
+    answer = "Заказ оформлен:\n" + _format(format_orders, {"orders": orders})
+    if len(orders) > 1:
+        answer += f'\nИтого: {sum(float(o["total_price"]) for o in orders)}'
+    return answer
+
+
+async def get_order_answer(mcp: MCPOrdersClient, order_id: int) -> str:
+    try:
+        order = await mcp.get_order(order_id=order_id)
+    except ToolError as e:
+        return f"Ошибка MCP: {e}"
+    return _format(format_orders, {"orders": [order]})
+
+
+async def list_orders_answer(mcp: MCPOrdersClient) -> str:
+    # One page, newest first; the extra row tells whether older orders exist.
+    limit = ORDERS_PAGE_SIZE
+    orders = await mcp.list_orders(limit=limit + 1)
+    answer = _format(format_orders, {"orders": orders[:limit]})
+    if len(orders) > limit:
+        answer += f'\nПоказаны последние {limit} заказов; более ранние: list_orders(before_id={orders[limit - 1]["id"]}).'
+    return answer
 
 
 async def plan_node(state: AgentState) -> AgentState:
-    llm = MockPlannerLLM()
-    msg = HumanMessage(content=state["query"])
-    res = await llm.ainvoke([msg])
-    plan: Plan = json.loads(res.content)
+    with metrics.track("plan"):
+        msg = HumanMessage(content=state["query"])
+        res = await PLANNER.ainvoke([msg])
+        plan: Plan = json.loads(res.content)
+    metrics.count_intent(plan.get("intent", "unknown"))
     state["plan"] = plan
     state["trace"].append(f"plan={plan}")
     return state
 
 
-async def exec_node(state: AgentState) -> AgentState:
+async def exec_node(state: AgentState, config: RunnableConfig, writer: StreamWriter) -> AgentState:
+    # stream_agent() asks for every piece of the answer as it is produced;
+    # otherwise nothing is emitted and listings are fetched in full pages.
+    streaming = bool(config.get("configurable", {}).get("stream"))
+    streamed = False
+
+    def emit(text: str) -> None:
+        nonlocal streamed
+        streamed = True
+        writer({"chunk": text})
+
+    if not streaming:
+        emit = None  # type: ignore[assignment]
+
+    with metrics.track("exec"):
+        state = await _run(state, emit)
+    if streaming and not streamed:
+        writer({"chunk": state["answer"]})
+    return state
+
+
+async def fanout_node(state: AgentState, config: RunnableConfig, writer: StreamWriter) -> AgentState:
+    """Answer every sub-plan of a multi-intent plan concurrently and merge the answers.
+
+    All sub-plans share one products session (and one orders session if
+    any needs it). The MCP server handles requests on a session
+    concurrently, so the whole takes about as long as the slowest part.
+    Sub-answers are joined in plan order; each part still goes through
+    RESPONSE_CACHE.
+    """
+    plans: List[Plan] = state["plan"]["plans"]
+    with metrics.track("exec"):
+        async with AsyncExitStack() as stack:
+            products = orders = None
+            if any(p.get("intent") not in ORDER_INTENTS for p in plans):
+                products = await stack.enter_async_context(products_session())
+            if any(p.get("intent") in ORDER_INTENTS for p in plans):
+                orders = await stack.enter_async_context(orders_session())
+            parts = await asyncio.gather(*(
+                _run({"query": state["query"], "plan": p, "trace": [], "answer": ""}, products=products, orders=orders)
+                for p in plans
+            ))
+    state["answer"] = PART_SEPARATOR.join(part["answer"] for part in parts)
+    for part in parts:
+        state["trace"].extend(part["trace"])
+    state["trace"].append(f"fanout:{len(parts)}")
+    if config.get("configurable", {}).get("stream"):
+        writer({"chunk": state["answer"]})
+    return state
+
+
+def route_plan(state: AgentState) -> str:
+    return "fanout" if state["plan"].get("intent") == "multi" else "exec"
+
+
+async def _run(
+    state: AgentState,
+    emit: Optional[Emit] = None,
+    products: Optional[MCPProductsClient] = None,
+    orders: Optional[MCPOrdersClient] = None,
+) -> AgentState:
+    cache_key = plan_cache_key(state["plan"]) if RESPONSE_CACHE.enabled else None
+    if cache_key is None:
+        return await _exec(state, emit, products, orders)
+    return await _exec_cached(state, *cache_key, emit=emit, products=products, orders=orders)
+
+
+async def _exec_cached(
+    state: AgentState,
+    key: Any,
+    tag: Any,
+    emit: Optional[Emit] = None,
+    products: Optional[MCPProductsClient] = None,
+    orders: Optional[MCPOrdersClient] = None,
+) -> AgentState:
+    """Serve a read-only plan from RESPONSE_CACHE; identical concurrent plans run once.
+
+    Only the caller that computes the answer streams it piece by piece;
+    hits and coalesced callers get it whole.
+    """
+
+    async def compute():
+        out = await _exec({**state, "trace": []}, emit, products, orders)
+        # Error answers are returned but not cached.
+        return (out["answer"], tuple(out["trace"])), not out["answer"].startswith("Ошибка")
+
+    (answer, trace), source = await RESPONSE_CACHE.get_or_compute(key, compute, tag=tag)
+    state["answer"] = answer
+    if source == "miss":
+        state["trace"].extend(trace)
+    else:
+        state["trace"].append(f"cache:{source}")
+    return state
+
+
+def _session(client: Any, open_session: Callable[[], AsyncContextManager[Any]]) -> AsyncContextManager[Any]:
+    # Use the caller's open session if there is one, else take one from the pool.
+    return nullcontext(client) if client is not None else open_session()
+
+
+async def _exec(
+    state: AgentState,
+    emit: Optional[Emit] = None,
+    products: Optional[MCPProductsClient] = None,
+    orders: Optional[MCPOrdersClient] = None,
+) -> AgentState:
     plan: Dict[str, Any] = state["plan"]
     intent = plan.get("intent", "unknown")
 
-    db_url = os.getenv("DATABASE_URL", "sqlite+aiosqlite:////app/data/app.db")
-    async with MCPProductsClient(db_url) as mcp:
-        if intent == "list_by_category":
-            category = plan.get("category")
-            products = await mcp.list_products(category=category)
-            state["answer"] = format_products.invoke({"products": products})
+    if intent not in INTENT_CALLS:
+        state["answer"] = UNKNOWN_ANSWER
+        state["trace"].append("intent:unknown")
+        return state
+
+    if intent in ORDER_INTENTS:
+        async with _session(orders, orders_session) as mcp_orders:
+            if intent == "create_order":
+                state["answer"] = await create_order_answer(mcp_orders, plan)
+
+            elif intent == "get_order":
+                state["answer"] = await get_order_answer(mcp_orders, int(plan["order_id"]))
+
+            elif intent == "list_orders":
+                state["answer"] = await list_orders_answer(mcp_orders)
 
-            state["trace"].append("called:list_products")
+        state["trace"].append(INTENT_CALLS[intent])
+        return state
+
+    async with _session(products, products_session) as mcp:
+        if intent == "list_by_category":
+            state["answer"] = await list_category_answer(mcp, plan.get("category"), emit)
 
         elif intent == "stats":
-            stats = await mcp.get_statistics()
-            state["answer"] = format_statistics.invoke({"stats": stats})
-            state["trace"].append("called:get_statistics")
+            state["answer"] = await stats_answer(mcp, plan.get("category"))
 
         elif intent == "add_product":
-            p = await mcp.add_product(
-                name=str(plan["name"]),
-                price=float(plan["price"]),
-                category=str(plan["category"]),
-                in_stock=bool(plan.get("in_stock", True)),
-            )
-            state["answer"] = "Добавлено:\n" + format_products.invoke({"products": [p]})
-            state["trace"].append("called:add_product")
+            state["answer"] = await add_product_answer(mcp, plan)
+
+        elif intent == "search":
+            state["answer"] = await search_answer(mcp, str(plan.get("text", "")))
 
         elif intent == "discount":
-            pid = int(plan["product_id"])
-            disc = float(plan["discount_percent"])
-            p = await mcp.get_product(product_id=pid)
-            new_price = calc_discount.invoke({"price": float(p["price"]), "percent": disc})
-            state["answer"] = (
-                f'Товар: #{p["id"]} — {p["name"]}\n'
-                f'Цена: {p["price"]}\n'
-                f'Скидка: {disc}%\n'
-                f'Цена со скидкой: {new_price:.2f}'
-            )
-            state["trace"].append("called:get_product+calc_discount")
-
-        else:
-            state["answer"] = (
-                "Не понял запрос. Примеры:\n"
-                "- Покажи все продукты в категории Электроника\n"
-                "- Какая средняя цена продуктов?\n"
-                "- Добавь новый продукт: Мышка, цена 1500, категория Электроника\n"
-                "- Посчитай скидку 15% на товар с ID 1"
-            )
-            state["trace"].append("intent:unknown")
+            p = await mcp.get_product(product_id=int(plan["product_id"]))
+            state["answer"] = discount_answer(p, float(plan["discount_percent"]))
 
+    state["trace"].append(INTENT_CALLS[intent])
     return state
 
 
@@ -84,9 +317,11 @@ def build_graph():
     g = StateGraph(AgentState)
     g.add_node("plan", plan_node)
     g.add_node("exec", exec_node)
+    g.add_node("fanout", fanout_node)
     g.set_entry_point("plan")
-    g.add_edge("plan", "exec")
+    g.add_conditional_edges("plan", route_plan, ["exec", "fanout"])
     g.add_edge("exec", END)
+    g.add_edge("fanout", END)
     return g.compile()
 
 
@@ -97,3 +332,21 @@ async def run_agent(query: str) -> Dict[str, Any]:
     init: AgentState = {"query": query, "plan": {"intent": "unknown"}, "trace": [], "answer": ""}
     out = await GRAPH.ainvoke(init)
     return {"answer": out["answer"], "trace": out["trace"], "plan": out["plan"]}
+
+
+async def stream_agent(query: str) -> AsyncIterator[Tuple[str, Any]]:
+    """Run the agent, yielding ``(event, data)`` as results become available.
+
+    Events: ``plan`` (the plan dict, right after planning), ``chunk``
+    (``{"text": ...}``; joined with newlines they make up the answer) and
+    finally ``trace`` (``{"trace": [...]}``).
+    """
+    init: AgentState = {"query": query, "plan": {"intent": "unknown"}, "trace": [], "answer": ""}
+    config: RunnableConfig = {"configurable": {"stream": True}}
+    async for mode, data in GRAPH.astream(init, config, stream_mode=["updates", "custom"]):
+        if mode == "custom":
+            yield "chunk", {"text": data["chunk"]}
+        elif "plan" in data:
+            yield "plan", data["plan"]["plan"]
+        elif "exec" in data or "fanout" in data:
+            yield "trace", {"trace": (data.get("exec") or data["fanout"])["trace"]}
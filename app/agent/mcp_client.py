@@ -1,189 +1,338 @@
 from __future__ import annotations
 
+import contextlib
+import importlib
 import json
 import os
 import sys
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
+import anyio
+import mcp.types as mcp_types
 from fastmcp import Client
-from fastmcp.client.transports import StdioTransport
+from fastmcp.client.transports import ClientTransport, FastMCPTransport, StdioTransport
+from fastmcp.exceptions import ToolError
+from mcp import ClientSession
+from mcp.shared.message import SessionMessage
 
+from . import metrics
+from .types import OrderItem, OrderRecord, ProductRow, StatsRecord
+from .zygote import ensure_zygote
 
-def _to_plain(x: Any) -> Any:
-    """Convert nested structures / pydantic models into plain python types."""
-    if x is None:
-        return None
 
-    # pydantic v2 BaseModel / RootModel
-    if hasattr(x, "model_dump"):
-        return _to_plain(x.model_dump())
+# "stdio": each client talks to its own `python -m <server module>` subprocess.
+# "inprocess": the server's FastMCP instance runs in this interpreter and is
+# reached over FastMCP's in-memory transport (same MCP messages, no pipes).
+# "zygote": like stdio, but the server process is forked from a pre-imported
+# spawner (app.mcp_server.zygote) and talks over a Unix socket.
+TRANSPORT_MODES = ("stdio", "inprocess", "zygote")
 
-    # pydantic v1 BaseModel
-    if hasattr(x, "dict"):
-        return _to_plain(x.dict())
+# Rows per list_products call when paging through a category.
+DEFAULT_PAGE_SIZE = int(os.getenv("MCP_LIST_PAGE_SIZE", "500"))
+# Smaller first page when streaming, so the first rows go out sooner.
+STREAM_FIRST_PAGE_SIZE = int(os.getenv("MCP_STREAM_FIRST_PAGE_SIZE", "50"))
+# Orders in the answer to "Покажи мои заказы"; older ones are paged with before_id.
+ORDERS_PAGE_SIZE = int(os.getenv("MCP_ORDERS_PAGE_SIZE", "20"))
 
-    # RootModel variants
-    if hasattr(x, "root"):
-        return _to_plain(getattr(x, "root"))
-    if hasattr(x, "__root__"):
-        return _to_plain(getattr(x, "__root__"))
 
-    # sometimes wrappers use .data
-    if hasattr(x, "data"):
-        return _to_plain(getattr(x, "data"))
+def get_transport_mode() -> str:
+    mode = os.getenv("MCP_TRANSPORT", "stdio").strip().lower()
+    if mode not in TRANSPORT_MODES:
+        raise ValueError(f"MCP_TRANSPORT must be one of {TRANSPORT_MODES}, got {mode!r}")
+    return mode
 
-    if isinstance(x, list):
-        return [_to_plain(i) for i in x]
 
-    if isinstance(x, dict):
-        return {k: _to_plain(v) for k, v in x.items()}
+def make_server_transport(module: str, db_url: str, mode: Optional[str] = None) -> ClientTransport:
+    """Build the client transport for the MCP server defined in ``module``.
 
-    return x
+    In-process servers share this interpreter's ``app.db`` engine, so they
+    use the process-wide ``DATABASE_URL`` rather than ``db_url``.
+    """
+    mode = mode or get_transport_mode()
+    if mode == "inprocess":
+        server = importlib.import_module(module).mcp
+        return FastMCPTransport(server)
+    if mode == "zygote":
+        return ZygoteTransport(module, {"DATABASE_URL": db_url})
+
+    # Keep base environment (PATH etc.), override only what we need
+    base_env = os.environ.copy()
+    base_env["DATABASE_URL"] = db_url
+    base_env["PYTHONPATH"] = "/app"
+
+    return StdioTransport(
+        command=sys.executable,
+        args=["-m", module],
+        env=base_env,
+        cwd="/app",
+        # The subprocess lives exactly as long as this client's context;
+        # long-lived reuse is handled by MCPSessionPool instead.
+        keep_alive=False,
+    )
+
+
+class ZygoteTransport(ClientTransport):
+    """MCP stdio framing over a Unix socket to a worker forked by the zygote.
+
+    The zygote is started on first use. Closing the session closes the
+    socket, which ends the worker process.
+    """
 
+    def __init__(self, module: str, env: Dict[str, str]) -> None:
+        self.module = module
+        self.env = env
+
+    @contextlib.asynccontextmanager
+    async def connect_session(self, **session_kwargs: Any) -> AsyncIterator[ClientSession]:
+        path = await ensure_zygote()
+        stream = await anyio.connect_unix(path)
+        header = json.dumps({"module": self.module, "env": self.env}) + "\n"
+        read_writer, read_stream = anyio.create_memory_object_stream(0)
+        write_stream, write_reader = anyio.create_memory_object_stream(0)
+
+        async def reader() -> None:
+            # One JSON-RPC message per line, as on a stdio server's stdout.
+            buf = b""
+            try:
+                async with read_writer:
+                    async for chunk in stream:
+                        *lines, buf = (buf + chunk).split(b"\n")
+                        for line in lines:
+                            if line.strip():
+                                msg = mcp_types.JSONRPCMessage.model_validate_json(line)
+                                await read_writer.send(SessionMessage(msg))
+            except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+                pass
 
-def _extract_payload(res: Any) -> Any:
-    """
-    FastMCP 2.14.x: real tool output is often in res.content as TextContent with JSON string.
-    res.data in your setup is [Root(), ...] placeholders (types.Root), so we ignore it.
+        async def writer() -> None:
+            try:
+                async with write_reader:
+                    async for sm in write_reader:
+                        data = sm.message.model_dump_json(by_alias=True, exclude_none=True) + "\n"
+                        await stream.send(data.encode("utf-8"))
+            except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+                pass
+
+        async with stream, anyio.create_task_group() as tg:
+            await stream.send(header.encode("utf-8"))
+            tg.start_soon(reader)
+            tg.start_soon(writer)
+            try:
+                async with ClientSession(read_stream, write_stream, **session_kwargs) as session:
+                    yield session
+            finally:
+                tg.cancel_scope.cancel()
+
+    def __repr__(self) -> str:
+        return f"<ZygoteTransport(module={self.module!r})>"
+
+
+def decode_tool_result(res: mcp_types.CallToolResult, wrapped: bool) -> Any:
+    """Return the tool's JSON value from a raw CallToolResult, decoding it once.
+
+    FastMCP tools with an output schema send the value as structuredContent
+    (already parsed from the JSON-RPC frame); non-object return types are
+    wrapped as ``{"result": ...}``, flagged by ``x-fastmcp-wrap-result`` in
+    the schema. Tools without a schema fall back to the first text block.
     """
-    # 1) MCP content blocks
-    content = getattr(res, "content", None)
-    if content:
-        # content is usually a list; in your logs it's [TextContent(type='text', text='[...]')]
-        # Try parse first text block
-        c0 = content[0]
-
-        # dict-like block
-        if isinstance(c0, dict):
-            # some versions may send {"type":"text","text":"...json..."}
-            text = c0.get("text")
-            if isinstance(text, str) and text.strip():
-                try:
-                    return json.loads(text)
-                except Exception:
-                    return text
-
-            # or {"type":"json","json":{...}}
-            if "json" in c0:
-                return c0["json"]
-
-        # object-like block (TextContent / JsonContent)
-        text = getattr(c0, "text", None)
-        if isinstance(text, str) and text.strip():
+    sc = res.structuredContent
+    if sc is not None:
+        return sc.get("result") if wrapped else sc
+    for block in res.content:
+        text = getattr(block, "text", None)
+        if text:
             try:
                 return json.loads(text)
-            except Exception:
+            except ValueError:
                 return text
+    return None
 
-        js = getattr(c0, "json", None)
-        if js is not None:
-            return js
-
-    # 2) pydantic-like dump of result (sometimes contains content/data)
-    if hasattr(res, "model_dump"):
-        d = res.model_dump()
-        if isinstance(d, dict):
-            # prefer content (most reliable in your case)
-            if d.get("content"):
-                try:
-                    c0 = d["content"][0]
-                    if isinstance(c0, dict) and isinstance(c0.get("text"), str):
-                        return json.loads(c0["text"])
-                except Exception:
-                    pass
-                return d["content"]
-
-            # fallback
-            for key in ("result", "value", "data", "message"):
-                v = d.get(key)
-                if v not in (None, [], {}, "Root()"):
-                    return v
-
-    # 3) last resort: direct attributes
-    for key in ("result", "value", "message"):
-        if hasattr(res, key):
-            v = getattr(res, key)
-            if v not in (None, [], {}, "Root()"):
-                return v
 
-    return None
+def decode_product_rows(payload: Any) -> List[ProductRow]:
+    """ProductRows from a list_products result: a compact page or a list of dicts.
 
+    Repeated category strings are shared, so a decoded page keeps one
+    string per distinct category instead of one per row.
+    """
+    categories: Dict[str, str] = {}
+    if isinstance(payload, dict) and "rows" in payload:
+        columns = payload.get("columns") or []
+        rows = payload["rows"]
+        if tuple(columns) != ProductRow._fields:
+            idx = [columns.index(f) for f in ProductRow._fields]
+            rows = ([r[i] for i in idx] for r in rows)
+        return [ProductRow(i, n, p, categories.setdefault(c, c), s) for i, n, p, c, s in rows]
+    if isinstance(payload, list):
+        return [
+            ProductRow(d["id"], d["name"], d["price"], categories.setdefault(d["category"], d["category"]), d["in_stock"])
+            for d in payload
+        ]
+    return []
+
+
+class MCPToolClient:
+    """Thin MCP client for one of our servers with schema-driven result decoding.
+
+    Output schemas are read once per session (``tools/list``); results are
+    taken from the raw protocol response without FastMCP's dynamic-type
+    validation or any recursive re-normalization.
+    """
 
-class MCPProductsClient:
-    def __init__(self, db_url: str) -> None:
-        # Keep base environment (PATH etc.), override only what we need
-        base_env = os.environ.copy()
-        base_env["DATABASE_URL"] = db_url
-        base_env["PYTHONPATH"] = "/app"
+    server_module: str = ""
 
-        transport = StdioTransport(
-            command=sys.executable,
-            args=["-m", "app.mcp_server.products_server"],
-            env=base_env,
-            cwd="/app",
-        )
-        self._client = Client(transport)
+    def __init__(self, db_url: str, transport: Optional[str] = None) -> None:
+        self._client = Client(make_server_transport(self.server_module, db_url, transport))
+        self._wrapped: Optional[Dict[str, bool]] = None
+        self._open = False
+        # Short server name used as a metrics label ("products", "orders").
+        self.server_name = self.server_module.rsplit(".", 1)[-1].removesuffix("_server")
 
-    async def __aenter__(self) -> "MCPProductsClient":
+    async def __aenter__(self):
         await self._client.__aenter__()
+        self._mark_open(True)
         return self
 
     async def __aexit__(self, exc_type, exc, tb) -> None:
+        self._mark_open(False)
         await self._client.__aexit__(exc_type, exc, tb)
 
-    async def list_products(self, category: Optional[str] = None) -> List[Dict[str, Any]]:
-        res = await self._client.call_tool("list_products", {"category": category})
-        payload = _extract_payload(res)
-        out = _to_plain(payload)
+    def _mark_open(self, is_open: bool) -> None:
+        if is_open != self._open:
+            self._open = is_open
+            metrics.session_opened(self.server_name, 1 if is_open else -1)
+
+    async def ping(self) -> bool:
+        return await self._client.ping()
+
+    async def aclose(self) -> None:
+        """Force-close the session and its transport (stops a stdio server subprocess)."""
+        self._mark_open(False)
+        await self._client.close()
+
+    async def _output_wrapping(self) -> Dict[str, bool]:
+        if self._wrapped is None:
+            tools = await self._client.list_tools()
+            self._wrapped = {t.name: bool((t.outputSchema or {}).get("x-fastmcp-wrap-result")) for t in tools}
+        return self._wrapped
+
+    async def _call(self, name: str, args: Dict[str, Any]) -> Any:
+        wrapped = (await self._output_wrapping()).get(name, False)
+        with metrics.track_tool(self.server_name, name):
+            res = await self._client.call_tool_mcp(name, args)
+            if res.isError:
+                text = getattr(res.content[0], "text", "") if res.content else ""
+                raise ToolError(text or f"Tool {name} failed")
+            return decode_tool_result(res, wrapped)
+
+    async def _call_dict(self, name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        out = await self._call(name, args)
+        return out if isinstance(out, dict) else {"error": "Invalid tool payload", "raw": str(out)}
 
-        # Normalize: sometimes payload could be a JSON string if parsing failed
-        if isinstance(out, str):
-            try:
-                out = json.loads(out)
-            except Exception:
-                pass
 
-        # Ensure list return
-        return out if isinstance(out, list) else ([] if out is None else [out])  # type: ignore[return-value]
+class MCPProductsClient(MCPToolClient):
+    server_module = "app.mcp_server.products_server"
+
+    async def list_products(
+        self,
+        category: Optional[str] = None,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+    ) -> List[ProductRow]:
+        args: Dict[str, Any] = {"category": category, "compact": True}
+        if limit is not None:
+            args["limit"] = int(limit)
+        if after_id is not None:
+            args["after_id"] = int(after_id)
+        return decode_product_rows(await self._call("list_products", args))
+
+    async def iter_products(
+        self,
+        category: Optional[str] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        first_page_size: Optional[int] = None,
+    ) -> AsyncIterator[List[ProductRow]]:
+        """Yield non-empty pages of products, following the id cursor until exhausted."""
+        after_id: Optional[int] = None
+        limit = first_page_size or page_size
+        while True:
+            page = await self.list_products(category=category, limit=limit, after_id=after_id)
+            if page:
+                yield page
+            if len(page) < limit:
+                return
+            after_id = page[-1].id
+            limit = page_size
 
     async def get_product(self, product_id: int) -> Dict[str, Any]:
-        res = await self._client.call_tool("get_product", {"id": int(product_id)})
-        payload = _extract_payload(res)
-        out = _to_plain(payload)
-
-        if isinstance(out, str):
-            try:
-                out = json.loads(out)
-            except Exception:
-                pass
-
-        return out if isinstance(out, dict) else {"error": "Invalid tool payload", "raw": str(out)}
+        return await self._call_dict("get_product", {"id": int(product_id)})
 
     async def add_product(self, name: str, price: float, category: str, in_stock: bool = True) -> Dict[str, Any]:
-        res = await self._client.call_tool(
+        return await self._call_dict(
             "add_product",
             {"name": name, "price": float(price), "category": category, "in_stock": bool(in_stock)},
         )
-        payload = _extract_payload(res)
-        out = _to_plain(payload)
-
-        if isinstance(out, str):
-            try:
-                out = json.loads(out)
-            except Exception:
-                pass
-
-        return out if isinstance(out, dict) else {"error": "Invalid tool payload", "raw": str(out)}
-
-    async def get_statistics(self) -> Dict[str, Any]:
-        res = await self._client.call_tool("get_statistics", {})
-        payload = _extract_payload(res)
-        out = _to_plain(payload)
 
-        if isinstance(out, str):
-            try:
-                out = json.loads(out)
-            except Exception:
-                pass
+    async def add_products_bulk(
+        self, data: str, format: str = "jsonl", batch_size: int = 1000, first_line: int = 1
+    ) -> Dict[str, Any]:
+        return await self._call_dict(
+            "add_products_bulk",
+            {"data": data, "format": format, "batch_size": int(batch_size), "first_line": int(first_line)},
+        )
 
-        return out if isinstance(out, dict) else {"error": "Invalid tool payload", "raw": str(out)}
+    async def get_statistics(self, category: Optional[str] = None) -> StatsRecord:
+        args = {"category": category} if category else {}
+        return await self._call_dict("get_statistics", args)  # type: ignore[return-value]
+
+    async def get_price_distribution(self, category: Optional[str] = None, bins: int = 10) -> Dict[str, Any]:
+        args: Dict[str, Any] = {"bins": int(bins)}
+        if category:
+            args["category"] = category
+        return await self._call_dict("get_price_distribution", args)
+
+    async def search_products(self, query: str, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        return await self._call_dict("search_products", {"query": query, "limit": int(limit), "offset": int(offset)})
+
+    async def cache_stats(self) -> Dict[str, Any]:
+        return await self._call_dict("cache_stats", {})
+
+
+class MCPOrdersClient(MCPToolClient):
+    server_module = "app.mcp_server.orders_server"
+
+    async def create_order(self, product_id: int, quantity: int) -> OrderRecord:
+        return await self._call_dict("create_order", {"product_id": int(product_id), "quantity": int(quantity)})  # type: ignore[return-value]
+
+    async def create_orders_batch(self, items: List[OrderItem]) -> List[OrderRecord]:
+        """Create all orders in one server-side transaction (all or nothing)."""
+        args = {"items": [{"product_id": int(i["product_id"]), "quantity": int(i["quantity"])} for i in items]}
+        out = await self._call("create_orders_batch", args)
+        return out if isinstance(out, list) else []
+
+    async def get_order(self, order_id: int) -> OrderRecord:
+        return await self._call_dict("get_order", {"id": int(order_id)})  # type: ignore[return-value]
+
+    async def list_orders(
+        self,
+        created_from: Optional[str] = None,
+        created_to: Optional[str] = None,
+        limit: Optional[int] = None,
+        before_id: Optional[int] = None,
+    ) -> List[OrderRecord]:
+        args: Dict[str, Any] = {}
+        if created_from:
+            args["created_from"] = created_from
+        if created_to:
+            args["created_to"] = created_to
+        if limit is not None:
+            args["limit"] = int(limit)
+        if before_id is not None:
+            args["before_id"] = int(before_id)
+        out = await self._call("list_orders", args)
+        return out if isinstance(out, list) else []
+
+    async def get_revenue(self, granularity: str = "day", **filters: Any) -> List[Dict[str, Any]]:
+        """Revenue buckets from the rollup tables; filters as in the ``get_revenue`` tool."""
+        args = {"granularity": granularity, **{k: v for k, v in filters.items() if v is not None}}
+        out = await self._call("get_revenue", args)
+        return out if isinstance(out, list) else []
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional, Type
+
+import anyio
+
+from . import metrics
+from .mcp_client import MCPOrdersClient, MCPProductsClient, MCPToolClient
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_DB_URL = "sqlite+aiosqlite:////app/data/app.db"
+
+
+class MCPSessionPool:
+    """Bounded pool of warm MCP client sessions.
+
+    Every pooled client holds one long-lived MCP session with a completed
+    handshake (for the stdio transport, one server subprocess), so a request
+    only pays for its tool calls.
+    Sessions are handed out exclusively (one request at a time per session);
+    callers wait when all of them are busy.
+
+    A session that has been idle longer than ``health_check_interval`` is
+    pinged before being handed out, and a session whose request failed is
+    pinged when it comes back. Dead sessions are replaced with a fresh
+    session.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], MCPToolClient],
+        size: int = 4,
+        health_check_interval: float = 30.0,
+        ping_timeout: float = 5.0,
+    ) -> None:
+        if size < 1:
+            raise ValueError("pool size must be >= 1")
+        self._factory = factory
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self.ping_timeout = ping_timeout
+
+        self._idle: "asyncio.Queue[MCPToolClient]" = asyncio.Queue()
+        self._last_used: Dict[int, float] = {}
+        self._clients: List[MCPToolClient] = []
+        self._started = False
+        self._closed = False
+        self.respawns = 0
+
+    @property
+    def in_use(self) -> int:
+        return len(self._clients) - self._idle.qsize()
+
+    async def start(self) -> None:
+        if self._started:
+            return
+        clients = await asyncio.gather(*(self._spawn() for _ in range(self.size)))
+        for c in clients:
+            self._clients.append(c)
+            self._idle.put_nowait(c)
+        self._started = True
+        logger.info("MCP session pool started: size=%s", self.size)
+
+    async def close(self) -> None:
+        self._closed = True
+        clients, self._clients = self._clients, []
+        self._last_used.clear()
+        while not self._idle.empty():
+            self._idle.get_nowait()
+        await asyncio.gather(*(self._dispose(c) for c in clients))
+        logger.info("MCP session pool closed")
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[MCPToolClient]:
+        if not self._started or self._closed:
+            raise RuntimeError("MCP session pool is not running")
+
+        client = await self._idle.get()
+        try:
+            if self._needs_check(client) and not await self._is_alive(client):
+                client = await self._respawn(client)
+        except BaseException:
+            self._release(client, suspect=True)
+            raise
+
+        failed = False
+        try:
+            yield client
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            suspect = False
+            if failed and not self._closed:
+                # The failure may be an ordinary tool error; only replace the
+                # session if the server no longer answers.
+                with anyio.CancelScope(shield=True):
+                    if not await self._is_alive(client):
+                        try:
+                            client = await self._respawn(client)
+                        except Exception as e:
+                            logger.error("MCP session respawn failed: %s", e)
+                            suspect = True
+            self._release(client, suspect=suspect)
+
+    def _needs_check(self, client: MCPToolClient) -> bool:
+        idle_for = time.monotonic() - self._last_used.get(id(client), 0.0)
+        return idle_for > self.health_check_interval
+
+    def _release(self, client: MCPToolClient, suspect: bool = False) -> None:
+        if self._closed or client not in self._clients:
+            return
+        # A suspect session is re-checked by the next caller that takes it.
+        self._last_used[id(client)] = 0.0 if suspect else time.monotonic()
+        self._idle.put_nowait(client)
+
+    async def _spawn(self) -> MCPToolClient:
+        client = self._factory()
+        await client.__aenter__()
+        self._last_used[id(client)] = time.monotonic()
+        return client
+
+    async def _dispose(self, client: MCPToolClient) -> None:
+        self._last_used.pop(id(client), None)
+        with anyio.move_on_after(5):
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.debug("Error closing MCP session: %s", e)
+
+    async def _is_alive(self, client: MCPToolClient) -> bool:
+        try:
+            with anyio.fail_after(self.ping_timeout):
+                return await client.ping()
+        except Exception:
+            return False
+
+    async def _respawn(self, client: MCPToolClient) -> MCPToolClient:
+        logger.warning("MCP session is not responding, respawning it")
+        await self._dispose(client)
+        fresh = await self._spawn()
+        self._clients[self._clients.index(client)] = fresh
+        self.respawns += 1
+        return fresh
+
+
+_PRODUCTS_POOL: Optional[MCPSessionPool] = None
+_ORDERS_POOL: Optional[MCPSessionPool] = None
+
+
+def get_products_pool() -> Optional[MCPSessionPool]:
+    return _PRODUCTS_POOL
+
+
+def set_products_pool(pool: Optional[MCPSessionPool]) -> None:
+    global _PRODUCTS_POOL
+    _PRODUCTS_POOL = pool
+
+
+def get_orders_pool() -> Optional[MCPSessionPool]:
+    return _ORDERS_POOL
+
+
+def set_orders_pool(pool: Optional[MCPSessionPool]) -> None:
+    global _ORDERS_POOL
+    _ORDERS_POOL = pool
+
+
+def create_products_pool(db_url: Optional[str] = None) -> MCPSessionPool:
+    """Build the products pool from ``MCP_POOL_*`` env settings."""
+    url = db_url or os.getenv("DATABASE_URL", DEFAULT_DB_URL)
+    return MCPSessionPool(
+        lambda: MCPProductsClient(url),
+        size=int(os.getenv("MCP_POOL_SIZE", "4")),
+        health_check_interval=float(os.getenv("MCP_POOL_HEALTH_CHECK_INTERVAL", "30")),
+    )
+
+
+def create_orders_pool(db_url: Optional[str] = None) -> MCPSessionPool:
+    """Build the orders pool; sized by ``MCP_ORDERS_POOL_SIZE`` (orders traffic is lighter)."""
+    url = db_url or os.getenv("DATABASE_URL", DEFAULT_DB_URL)
+    return MCPSessionPool(
+        lambda: MCPOrdersClient(url),
+        size=int(os.getenv("MCP_ORDERS_POOL_SIZE", "2")),
+        health_check_interval=float(os.getenv("MCP_POOL_HEALTH_CHECK_INTERVAL", "30")),
+    )
+
+
+@asynccontextmanager
+async def _session(pool: Optional[MCPSessionPool], client_cls: Type[MCPToolClient]) -> AsyncIterator[MCPToolClient]:
+    # Session setup (pool checkout or one-off spawn) is timed as its own stage.
+    async with AsyncExitStack() as stack:
+        with metrics.track("mcp_session"):
+            if pool is not None:
+                mcp = await stack.enter_async_context(pool.session())
+            else:
+                mcp = await stack.enter_async_context(client_cls(os.getenv("DATABASE_URL", DEFAULT_DB_URL)))
+        metrics.session_active(mcp.server_name)
+        try:
+            yield mcp
+        finally:
+            metrics.session_active(mcp.server_name, -1)
+
+
+@asynccontextmanager
+async def products_session() -> AsyncIterator[MCPProductsClient]:
+    """Yield a products MCP session.
+
+    Uses the shared pool when the API lifespan has started one, otherwise
+    spawns a one-off server for the duration of the block (scripts, tests).
+    """
+    async with _session(_PRODUCTS_POOL, MCPProductsClient) as mcp:
+        yield mcp  # type: ignore[misc]
+
+
+@asynccontextmanager
+async def orders_session() -> AsyncIterator[MCPOrdersClient]:
+    """Yield an orders MCP session; same pool/one-off rules as ``products_session``."""
+    async with _session(_ORDERS_POOL, MCPOrdersClient) as mcp:
+        yield mcp  # type: ignore[misc]
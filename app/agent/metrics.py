@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import os
+from time import perf_counter
+from typing import Dict, Tuple, Type
+
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.metrics import MetricWrapperBase
+
+
+# Observation is a dict lookup plus a lock-protected add per metric, cheap
+# enough to leave on under load (see benchmarks/bench_metrics.py).
+# AGENT_METRICS=0 turns recording off; /metrics then serves zeros.
+ENABLED = os.getenv("AGENT_METRICS", "1").strip().lower() not in ("0", "false", "no")
+
+# 0.5 ms .. 10 s: in-process tool calls sit at the low end, stdio spawns at the top.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_SECONDS = Histogram(
+    "agent_stage_seconds",
+    "Latency of agent pipeline stages (plan, exec, mcp_session, format).",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+TOOL_CALL_SECONDS = Histogram(
+    "mcp_tool_call_seconds",
+    "Client-side latency of MCP tool calls.",
+    ["server", "tool"],
+    buckets=LATENCY_BUCKETS,
+)
+QUERIES = Counter("agent_queries_total", "Planned agent queries by intent.", ["intent"])
+ERRORS = Counter("agent_errors_total", "Errors by pipeline stage and exception type.", ["stage", "error"])
+RESPONSE_CACHE = Counter(
+    "agent_response_cache_total", "Agent response cache lookups by result (hit, coalesced, miss).", ["result"]
+)
+SESSIONS_ACTIVE = Gauge("mcp_sessions_active", "MCP sessions currently handed out to requests.", ["server"])
+SESSIONS_OPEN = Gauge("mcp_sessions_open", "Open MCP client sessions (pooled and one-off).", ["server"])
+
+# Labelled children are resolved once per label set; .labels() itself
+# validates and hashes on every call.
+_children: Dict[Tuple[int, Tuple[str, ...]], MetricWrapperBase] = {}
+
+
+def _child(metric: MetricWrapperBase, *labels: str) -> MetricWrapperBase:
+    key = (id(metric), labels)
+    child = _children.get(key)
+    if child is None:
+        child = _children[key] = metric.labels(*labels)
+    return child
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    if ENABLED:
+        _child(STAGE_SECONDS, stage).observe(seconds)
+
+
+def count_intent(intent: str) -> None:
+    if ENABLED:
+        _child(QUERIES, intent).inc()
+
+
+def count_error(stage: str, error: Type[BaseException]) -> None:
+    if ENABLED:
+        _child(ERRORS, stage, error.__name__).inc()
+
+
+def count_response_cache(result: str) -> None:
+    if ENABLED:
+        _child(RESPONSE_CACHE, result).inc()
+
+
+def session_opened(server: str, delta: int = 1) -> None:
+    if ENABLED:
+        _child(SESSIONS_OPEN, server).inc(delta)
+
+
+def session_active(server: str, delta: int = 1) -> None:
+    if ENABLED:
+        _child(SESSIONS_ACTIVE, server).inc(delta)
+
+
+class track:
+    """Time a block into ``agent_stage_seconds{stage}``; exceptions are counted
+    in ``agent_errors_total`` and re-raised."""
+
+    __slots__ = ("stage", "_t0")
+
+    def __init__(self, stage: str) -> None:
+        self.stage = stage
+
+    def __enter__(self) -> "track":
+        self._t0 = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if ENABLED:
+            _child(STAGE_SECONDS, self.stage).observe(perf_counter() - self._t0)
+            if exc_type is not None and issubclass(exc_type, Exception):
+                _child(ERRORS, self.stage, exc_type.__name__).inc()
+        return False
+
+
+class track_tool:
+    """Time one MCP tool call into ``mcp_tool_call_seconds{server, tool}``."""
+
+    __slots__ = ("server", "tool", "_t0")
+
+    def __init__(self, server: str, tool: str) -> None:
+        self.server = server
+        self.tool = tool
+
+    def __enter__(self) -> "track_tool":
+        self._t0 = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if ENABLED:
+            _child(TOOL_CALL_SECONDS, self.server, self.tool).observe(perf_counter() - self._t0)
+            if exc_type is not None and issubclass(exc_type, Exception):
+                _child(ERRORS, "call_tool", exc_type.__name__).inc()
+        return False
@@ -2,21 +2,170 @@ from __future__ import annotations
 
 import json
 import re
-from typing import Any, List, Optional
+from typing import Any, Iterable, List, Optional
 
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
 from langchain_core.outputs import ChatGeneration, ChatResult
 
 
+# Rules are compiled once at import; plan_query() lowers the text once and
+# uses cheap substring checks to skip regexes that cannot match.
+_CATEGORY_RE = re.compile(r"категори[ия]\s+([\w\-]+)", re.IGNORECASE)
+_AVG_PRICE_RE = re.compile(r"средн(яя|юю)\s+цен", re.IGNORECASE)
+_ADD_NAME_RE = re.compile(r"продукт\s*:\s*([^,]+)", re.IGNORECASE)
+_ADD_PRICE_RE = re.compile(r"цен[аы]\s*(\d+(?:[\.,]\d+)?)", re.IGNORECASE)
+_ADD_CATEGORY_RE = re.compile(r"категори[ия]\s*([\w\-]+)", re.IGNORECASE)
+_DISCOUNT_RE = re.compile(r"скидк\w*\s*(\d+(?:[\.,]\d+)?)%?", re.IGNORECASE)
+_ID_RE = re.compile(r"(?:id|ID)\s*(\d+)")
+# "ID 1 x2" / "ID 1 × 2" / "ID 1 х 2" (Cyrillic х); quantity defaults to 1.
+_ORDER_ITEM_RE = re.compile(r"(?:id|ID)\s*(\d+)(?:\s*[x×х*]\s*(\d+))?")
+_ORDER_QTY_RE = re.compile(r"(\d+)\s*(?:шт|штук)", re.IGNORECASE)
+_ORDER_ID_RE = re.compile(r"заказ\w*\s*(?:№|#|номер)?\s*(\d+)", re.IGNORECASE)
+# "Найди ноутбук lenovo" / "Поиск: кофе" / "Найди товары чайник"
+_SEARCH_RE = re.compile(r"^(?:найди|найти|поищи|ищу|поиск)[\s:]+(?:(?:товар|продукт)\w*\s+)?(.*\w.*)$", re.IGNORECASE)
+# Separators between the parts of a compound query: "...; ...", "... и ...", "..., а также ...".
+_MULTI_SPLIT_RE = re.compile(r"\s*;\s*|,?\s+(?:а\s+также|и|плюс)\s+", re.IGNORECASE)
+_MULTI_SEPARATORS = (";", " и ", " плюс ", "а также")
+# A part that only names another category: "... и в категории Книги", "... и Книги".
+_PART_CATEGORY_RE = re.compile(r"^(?:(?:в|из)\s+)?(?:категори[ийю]\s+)?([\w\-]+)[\s?!.]*$", re.IGNORECASE)
+
+_LIST_VERBS = ("покажи", "показать", "выведи")
+_ADD_PREFIXES = ("добавь", "добавить")
+_ORDER_PREFIXES = ("закажи", "заказать", "оформи")
+_SEARCH_PREFIXES = ("найди", "найти", "поищи", "ищу", "поиск")
+
+# Intents that may run side by side in one multi-intent plan. Writes are
+# never fanned out: they must be ordered against the reads.
+MULTI_INTENTS = frozenset({"list_by_category", "stats", "discount", "search", "get_order", "list_orders"})
+
+
+def plan_query(text: str) -> dict:
+    """Map one user query to a plan dict (the planner's JSON output).
+
+    A compound query whose parts are all reads ("Покажи все продукты в
+    категории Книги и среднюю цену") becomes
+    ``{"intent": "multi", "plans": [...]}``; anything else gets one plan.
+    """
+    plans = _plan_parts(text)
+    if plans is not None:
+        return {"intent": "multi", "plans": plans}
+    return _plan_one(text)
+
+
+def _plan_parts(text: str) -> Optional[List[dict]]:
+    """Sub-plans of a compound read-only query, or None to plan it as a whole."""
+    low = text.lower()
+    if not any(sep in low for sep in _MULTI_SEPARATORS):
+        return None
+    parts = [p for p in _MULTI_SPLIT_RE.split(text.strip()) if p.strip()]
+    if len(parts) < 2:
+        return None
+    plans: List[dict] = []
+    prev: Optional[dict] = None
+    for part in parts:
+        plan = _plan_one(part)
+        if plan["intent"] == "unknown" and prev is not None:
+            plan = _with_category(prev, part)
+        # Anything else unrecognized ("Найди хлеб и молоко") keeps the query whole.
+        if plan is None or plan["intent"] not in MULTI_INTENTS:
+            return None
+        if plan not in plans:
+            plans.append(plan)
+        prev = plan
+    return plans if len(plans) > 1 else None
+
+
+def _with_category(prev: dict, part: str) -> Optional[dict]:
+    # "Какая средняя цена в категории Электроника и в категории Книги": same intent, next category.
+    if prev["intent"] not in ("list_by_category", "stats"):
+        return None
+    m = _PART_CATEGORY_RE.match(part.strip())
+    return {**prev, "category": m.group(1)} if m else None
+
+
+def _plan_one(text: str) -> dict:
+    t = text.strip()
+    low = t.lower()
+
+    category = None
+    if "категор" in low:
+        m = _CATEGORY_RE.search(t)
+        category = m.group(1) if m else None
+
+    # list by category
+    if category and any(v in low for v in _LIST_VERBS):
+        return {"intent": "list_by_category", "category": category}
+
+    # statistics / average price
+    if "статист" in low or ("средн" in low and _AVG_PRICE_RE.search(t)):
+        if category:
+            return {"intent": "stats", "category": category}
+        return {"intent": "stats"}
+
+    # add product: "Добавь новый продукт: Мышка, цена 1500, категория Электроника"
+    if low.startswith(_ADD_PREFIXES):
+        m_name = _ADD_NAME_RE.search(t)
+        m_price = _ADD_PRICE_RE.search(t)
+        m_cat = _ADD_CATEGORY_RE.search(t)
+        if m_name and m_price and m_cat:
+            name = m_name.group(1).strip()
+            cat = m_cat.group(1).strip()
+            if name and cat:
+                price = float(m_price.group(1).replace(",", "."))
+                return {"intent": "add_product", "name": name, "price": price, "category": cat, "in_stock": True}
+
+    # discount
+    if "скидк" in low:
+        m_disc = _DISCOUNT_RE.search(t)
+        m_id = _ID_RE.search(t) if m_disc else None
+        if m_disc and m_id:
+            disc = float(m_disc.group(1).replace(",", "."))
+            return {"intent": "discount", "discount_percent": disc, "product_id": int(m_id.group(1))}
+
+    # search by name: "Найди ноутбук"
+    if low.startswith(_SEARCH_PREFIXES) and "заказ" not in low:
+        m_search = _SEARCH_RE.match(t)
+        if m_search:
+            return {"intent": "search", "text": m_search.group(1).strip(" ?!.")}
+
+    # orders: "Закажи 3 шт товара с ID 1", "Закажи ID 1 x2, ID 2 x3"
+    if low.startswith(_ORDER_PREFIXES):
+        found = _ORDER_ITEM_RE.findall(t)
+        if found:
+            items = [{"product_id": int(pid), "quantity": int(qty or 1)} for pid, qty in found]
+            if len(items) == 1 and not found[0][1]:
+                m_qty = _ORDER_QTY_RE.search(t)
+                if m_qty:
+                    items[0]["quantity"] = int(m_qty.group(1))
+            if all(i["quantity"] > 0 for i in items):
+                return {"intent": "create_order", "items": items}
+
+    # "Статус заказа №5" / "Покажи мои заказы"
+    elif "заказ" in low:
+        m_order = _ORDER_ID_RE.search(t)
+        if m_order:
+            return {"intent": "get_order", "order_id": int(m_order.group(1))}
+        if "заказы" in low or "заказов" in low:
+            return {"intent": "list_orders"}
+
+    return {"intent": "unknown"}
+
+
 class MockPlannerLLM(BaseChatModel):
     """A deterministic mock chat model that outputs a JSON plan.
 
     It supports Russian queries like:
     - "Покажи все продукты в категории Электроника"
     - "Какая средняя цена продуктов?"
+    - "Какая средняя цена в категории Электроника?"
     - "Добавь новый продукт: Мышка, цена 1500, категория Электроника"
     - "Посчитай скидку 15% на товар с ID 1"
+    - "Закажи 3 шт товара с ID 1" / "Закажи ID 1 x2, ID 2 x3"
+    - "Статус заказа №5"
+    - "Покажи мои заказы"
+    - "Найди ноутбук"
+    - several reads at once: "Покажи все продукты в категории Книги и среднюю цену"
     """
 
     model_name: str = "mock-planner-llm"
@@ -28,49 +177,11 @@ class MockPlannerLLM(BaseChatModel):
         return messages[-1].content if messages else ""
 
     def _plan(self, text: str) -> dict:
-        t = text.strip()
-
-        # list by category
-        m = re.search(r"категори[ия]\s+([\w\-]+)", t, flags=re.IGNORECASE)
-        if ("покажи" in t.lower() or "показать" in t.lower() or "выведи" in t.lower()) and m:
-            return {"intent": "list_by_category", "category": m.group(1)}
-
-        # statistics / average price
-        if re.search(r"средн(яя|юю)\s+цен", t, flags=re.IGNORECASE) or "статист" in t.lower():
-            return {"intent": "stats"}
-
-        # add product
-        if t.lower().startswith("добавь") or t.lower().startswith("добавить"):
-            # "Добавь новый продукт: Мышка, цена 1500, категория Электроника"
-            name = None
-            price = None
-            category = None
-            in_stock = True
-
-            m_name = re.search(r"продукт\s*:\s*([^,]+)", t, flags=re.IGNORECASE)
-            if m_name:
-                name = m_name.group(1).strip()
-
-            m_price = re.search(r"цен[аы]\s*(\d+(?:[\.,]\d+)?)", t, flags=re.IGNORECASE)
-            if m_price:
-                price = float(m_price.group(1).replace(",", "."))
+        return plan_query(text)
 
-            m_cat = re.search(r"категори[ия]\s*([\w\-]+)", t, flags=re.IGNORECASE)
-            if m_cat:
-                category = m_cat.group(1).strip()
-
-            if name and price is not None and category:
-                return {"intent": "add_product", "name": name, "price": price, "category": category, "in_stock": in_stock}
-
-        # discount
-        m_disc = re.search(r"скидк\w*\s*(\d+(?:[\.,]\d+)?)%?", t, flags=re.IGNORECASE)
-        m_id = re.search(r"(?:id|ID)\s*(\d+)", t)
-        if m_disc and m_id:
-            disc = float(m_disc.group(1).replace(",", "."))
-            pid = int(m_id.group(1))
-            return {"intent": "discount", "discount_percent": disc, "product_id": pid}
-
-        return {"intent": "unknown"}
+    def plan_batch(self, texts: Iterable[str]) -> List[dict]:
+        """Classify many queries at once, without the chat-model call overhead per query."""
+        return [plan_query(t) for t in texts]
 
     @property
     def _llm_type(self) -> str:
@@ -85,3 +196,7 @@ class MockPlannerLLM(BaseChatModel):
 
     async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs: Any) -> ChatResult:
         return self._generate(messages, stop=stop, **kwargs)
+
+
+# Stateless, so one instance serves every request.
+PLANNER = MockPlannerLLM()
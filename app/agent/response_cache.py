@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from app.mcp_server.cache import TTLCache
+
+from . import metrics
+
+
+# Intents whose answer depends only on the plan and the catalog.
+CACHEABLE_INTENTS = frozenset({"list_by_category", "stats", "discount", "search"})
+
+# Tag for entries that depend on the whole catalog (global statistics).
+ALL_PRODUCTS = "*"
+
+
+def category_key(category: Optional[str]) -> Optional[str]:
+    # Same normalization the server applies to category lookups (case/space-insensitive).
+    return " ".join(str(category).replace("\u00A0", " ").split()).casefold() if category else None
+
+
+def search_key(text: Optional[str]) -> str:
+    # Search ignores case and spacing, so these spellings share a key.
+    return " ".join(str(text or "").split()).casefold()
+
+
+def plan_cache_key(plan: Dict[str, Any]) -> Optional[Tuple[Hashable, Hashable]]:
+    """``(key, tag)`` for a cacheable plan, or None.
+
+    Plans that differ only in category spelling share a key; the tag says
+    which writes invalidate the entry.
+    """
+    intent = plan.get("intent")
+    if intent not in CACHEABLE_INTENTS:
+        return None
+    if intent == "discount":
+        pid = int(plan["product_id"])
+        return ("discount", pid, float(plan["discount_percent"])), ("product", pid)
+    if intent == "search":
+        # Any new product may match, whatever its category.
+        return ("search", search_key(plan.get("text"))), ALL_PRODUCTS
+    key = category_key(plan.get("category"))
+    return (intent, key), (key if key is not None else ALL_PRODUCTS)
+
+
+class _OwnerCancelled(Exception):
+    """The request computing a shared answer was cancelled; its waiters retry."""
+
+
+class ResponseCache:
+    """Answers for read-only plans: LRU + TTL, tag invalidation, single flight.
+
+    Concurrent requests for the same key share one computation. A value
+    computed while an invalidation happened is returned to its callers but
+    not stored, so a write is never followed by a pre-write answer.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 5.0) -> None:
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._inflight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self._generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._cache.enabled
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Tuple[Any, bool]]],
+        tag: Hashable = None,
+    ) -> Tuple[Any, str]:
+        """Return ``(value, source)`` with source ``hit``, ``coalesced`` or ``miss``.
+
+        ``compute`` returns ``(value, cacheable)``; errors are not cached.
+        """
+        while True:
+            value = self._cache.get(key)
+            if value is not None:
+                metrics.count_response_cache("hit")
+                return value, "hit"
+
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            metrics.count_response_cache("coalesced")
+            try:
+                # shield: a cancelled waiter must not cancel the shared computation.
+                return await asyncio.shield(pending), "coalesced"
+            except _OwnerCancelled:
+                continue  # compute it here, or join whoever took over
+
+        metrics.count_response_cache("miss")
+        fut: "asyncio.Future[Any]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        generation = self._generation
+        try:
+            value, cacheable = await compute()
+        except BaseException as e:
+            # Waiters were not cancelled themselves: they retry instead.
+            fut.set_exception(_OwnerCancelled() if isinstance(e, asyncio.CancelledError) else e)
+            fut.exception()  # retrieved: don't warn when nobody was waiting
+            raise
+        finally:
+            if self._inflight.get(key) is fut:
+                del self._inflight[key]
+
+        fut.set_result(value)
+        if cacheable and generation == self._generation:
+            self._cache.set(key, value, tag=tag)
+        return value, "miss"
+
+    def invalidate_category(self, category: Optional[str]) -> None:
+        """A product was added in ``category``: drop its listing and the statistics."""
+        self._generation += 1
+        self._inflight.clear()
+        key = category_key(category)
+        if key is not None:
+            self._cache.invalidate_tag(key)
+        self._cache.invalidate_tag(ALL_PRODUCTS)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._inflight.clear()
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._cache.stats(), "inflight": len(self._inflight)}
+
+
+RESPONSE_CACHE = ResponseCache(
+    maxsize=int(os.getenv("AGENT_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("AGENT_CACHE_TTL", "5")),
+)
@@ -1,7 +1,21 @@
 from __future__ import annotations
+
+import logging
+from time import perf_counter
 from typing import Any, Dict, List
+
 from langchain_core.tools import tool
 
+from app.log import sample_rate, should_log
+
+from .types import ProductRow
+
+logger = logging.getLogger(__name__)
+
+# Share of formatter calls that emit a DEBUG record (only when DEBUG is on).
+LOG_SAMPLE_RATE = sample_rate("FORMAT_LOG_SAMPLE_RATE", 0.01)
+
+
 def _plain(x: Any) -> Any:
     """Convert pydantic objects (RootModel/BaseModel) into plain python types recursively."""
     if x is None:
@@ -68,53 +82,49 @@ def _plain(x: Any) -> Any:
     return x
 
 
-@tool
-def format_products(products: Any) -> str:
-    """Format products list into readable text."""
-    print(f"DEBUG format_products: Received type: {type(products)}")
-    
-    # Преобразуем в простые типы
-    products = _plain(products)
-    print(f"DEBUG format_products: After _plain type: {type(products)}")
-    print(f"DEBUG format_products: After _plain value: {products}")
-    
+def _product_list(products: Any) -> Any:
+    """Coerce tool input to a list of product dicts, or return an error string."""
+    # MCP-клиент уже отдаёт список ProductRow/dict — повторная нормализация не нужна
+    if not (isinstance(products, list) and (not products or isinstance(products[0], (ProductRow, dict)))):
+        products = _plain(products)
     # поддержка формы {"products": [...]}
     if isinstance(products, dict):
-        for key in ["products", "items", "results", "data", "content"]:
-            if key in products and isinstance(products[key], list):
-                products = products[key]
-                break
-    
-    if not products or (isinstance(products, list) and len(products) == 0):
-        return "Ничего не найдено."
-    
-    # Убедимся, что это список
+        for key in ("products", "items", "results", "data", "content"):
+            if isinstance(products.get(key), list):
+                return products[key]
+    if not products:
+        return []
+    if isinstance(products, dict):
+        return [products]
     if not isinstance(products, list):
-        if isinstance(products, dict):
-            products = [products]
-        else:
-            return f"Ошибка: ожидался список, получен {type(products)}"
-    
-    lines = []
-    for i, p in enumerate(products):
-        print(f"DEBUG format_products: Processing item {i}: {p}")
-        
-        if not isinstance(p, dict):
-            print(f"DEBUG format_products: Item {i} is not dict: {type(p)}")
-            continue
-            
-        # Безопасно получаем значения
-        p_id = p.get("id", "N/A")
-        name = p.get("name", "Без названия")
-        price = p.get("price", 0)
-        category = p.get("category", "Без категории")
-        in_stock = p.get("in_stock", False)
-        
-        stock = "в наличии" if in_stock else "нет в наличии"
-        lines.append(
-            f'#{p_id} — {name} — {price} — {category} — {stock}'
+        return f"Ошибка: ожидался список, получен {type(products)}"
+    return products
+
+
+@tool
+def format_products(products: Any) -> str:
+    """Format products list into readable text."""
+    t0 = perf_counter()
+    items = _product_list(products)
+    if isinstance(items, str):
+        return items
+
+    lines = [
+        f'#{p.id} — {p.name} — {p.price} — {p.category} — {"в наличии" if p.in_stock else "нет в наличии"}'
+        if isinstance(p, ProductRow) else
+        f'#{p.get("id", "N/A")} — {p.get("name", "Без названия")} — {p.get("price", 0)} — '
+        f'{p.get("category", "Без категории")} — {"в наличии" if p.get("in_stock", False) else "нет в наличии"}'
+        for p in items
+        if isinstance(p, (ProductRow, dict))
+    ]
+    if should_log(logger, logging.DEBUG, LOG_SAMPLE_RATE):
+        logger.debug(
+            "format_products rows=%d skipped=%d",
+            len(lines),
+            len(items) - len(lines),
+            extra={"tool": "format_products", "rows": len(lines), "skipped": len(items) - len(lines),
+                   "seconds": round(perf_counter() - t0, 6)},
         )
-    
     return "\n".join(lines) if lines else "Ничего не найдено."
 
 
@@ -133,16 +143,33 @@ def calc_discount(price: float, percent: float) -> Dict[str, float]:
 @tool
 def format_statistics(stats: Any) -> str:
     """Format statistics dict into readable text."""
-    stats = _plain(stats)
+    if not isinstance(stats, dict):
+        stats = _plain(stats)
     if isinstance(stats, dict) and "stats" in stats and isinstance(stats["stats"], dict):
         stats = stats["stats"]
     if not isinstance(stats, dict):
         return f"Ошибка: ожидался dict, получен {type(stats)}"
     if "error" in stats:
+        logger.warning("format_statistics got an MCP error: %s", stats["error"], extra={"tool": "format_statistics"})
         return f"Ошибка MCP: {stats['error']}"
-    return (
+    header = f"Категория: {stats['category']}\n" if stats.get("category") else ""
+    return header + (
         f"Всего продуктов: {stats.get('count', 0)}\n"
         f"Средняя цена: {stats.get('avg_price', 0)}\n"
         f"Мин. цена: {stats.get('min_price', 0)}\n"
         f"Макс. цена: {stats.get('max_price', 0)}"
     )
+
+
+@tool
+def format_orders(orders: List[Dict[str, Any]]) -> str:
+    """Format orders list into readable text."""
+    if not orders:
+        return "Заказов нет."
+    if should_log(logger, logging.DEBUG, LOG_SAMPLE_RATE):
+        logger.debug("format_orders rows=%d", len(orders), extra={"tool": "format_orders", "rows": len(orders)})
+    return "\n".join(
+        f'Заказ #{o.get("id", "N/A")} — товар #{o.get("product_id", "N/A")} × {o.get("quantity", 0)}'
+        f' — {o.get("total_price", 0)} — {o.get("created_at", "")}'
+        for o in orders
+    )
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+import atexit
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from typing import Optional
+
+from app.mcp_server.zygote import READY_LINE
+
+logger = logging.getLogger(__name__)
+
+ZYGOTE_MODULE = "app.mcp_server.zygote"
+
+
+def default_socket_path() -> str:
+    return os.getenv("MCP_ZYGOTE_SOCKET") or os.path.join(tempfile.gettempdir(), f"mcp-zygote-{os.getpid()}.sock")
+
+
+class ZygoteProcess:
+    """The spawner subprocess behind ``MCP_TRANSPORT=zygote``.
+
+    Started on first use (or by the API lifespan, to pay the preload before
+    traffic arrives) and restarted if it has died. Start/stop are blocking
+    and guarded by a thread lock, so callers from any event loop can use
+    them through ``asyncio.to_thread``.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, start_timeout: float = 60.0) -> None:
+        self.socket_path = socket_path or default_socket_path()
+        self.start_timeout = start_timeout
+        self._proc: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+        self.starts = 0
+
+    @property
+    def running(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def ensure(self) -> str:
+        """Start the zygote unless it is running; return its socket path."""
+        with self._lock:
+            if not self.running:
+                self._start()
+            return self.socket_path
+
+    def _start(self) -> None:
+        env = os.environ.copy()
+        env["PYTHONPATH"] = "/app"
+        proc = subprocess.Popen(
+            [sys.executable, "-m", ZYGOTE_MODULE, "--socket", self.socket_path],
+            env=env,
+            cwd="/app",
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        timer = threading.Timer(self.start_timeout, proc.kill)
+        timer.start()
+        try:
+            line = proc.stdout.readline().strip() if proc.stdout else ""
+        finally:
+            timer.cancel()
+        if line != READY_LINE:
+            proc.kill()
+            proc.wait()
+            raise RuntimeError(f"MCP zygote failed to start (exit code {proc.returncode})")
+        self._proc = proc
+        self.starts += 1
+        logger.info("MCP zygote started: pid=%s socket=%s", proc.pid, self.socket_path)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            proc, self._proc = self._proc, None
+            if proc is None or proc.poll() is not None:
+                return
+            # Workers are separate processes and keep serving their sessions.
+            proc.terminate()
+            try:
+                proc.wait(timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+
+_ZYGOTE = ZygoteProcess()
+atexit.register(_ZYGOTE.stop)
+
+
+def get_zygote() -> ZygoteProcess:
+    return _ZYGOTE
+
+
+async def ensure_zygote() -> str:
+    return await asyncio.to_thread(_ZYGOTE.ensure)
+
+
+async def stop_zygote() -> None:
+    await asyncio.to_thread(_ZYGOTE.stop)
@@ -1,19 +1,56 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import os
-from fastapi import FastAPI
-from pydantic import BaseModel, Field
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from .agent.graph import run_agent
-import logging, os
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from pydantic import BaseModel, Field
 
-logging.basicConfig(
-    level=os.getenv("LOG_LEVEL", "INFO"),
-    format="%(asctime)s %(levelname)s [%(name)s] %(message)s",
+from .agent.batch import run_agent_batch
+from .agent.graph import run_agent, stream_agent
+from .agent.mcp_client import DEFAULT_PAGE_SIZE, get_transport_mode
+from .agent.response_cache import RESPONSE_CACHE
+from .agent.mcp_pool import (
+    create_orders_pool,
+    create_products_pool,
+    products_session,
+    set_orders_pool,
+    set_products_pool,
 )
+from .agent.zygote import ensure_zygote, stop_zygote
+from .log import configure_logging
+
+configure_logging()
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm MCP server processes live for the whole app lifetime.
+    zygote = get_transport_mode() == "zygote"
+    if zygote:
+        # Pay the spawner's preload once, before the pools fork their workers.
+        await ensure_zygote()
+    pool = create_products_pool()
+    orders_pool = create_orders_pool()
+    await asyncio.gather(pool.start(), orders_pool.start())
+    set_products_pool(pool)
+    set_orders_pool(orders_pool)
+    try:
+        yield
+    finally:
+        set_products_pool(None)
+        set_orders_pool(None)
+        await asyncio.gather(pool.close(), orders_pool.close())
+        if zygote:
+            await stop_zygote()
 
-app = FastAPI(title="MCP + LangGraph Product Agent", version="1.0.0")
+
+app = FastAPI(title="MCP + LangGraph Product Agent", version="1.0.0", lifespan=lifespan)
 
 
 class AgentQuery(BaseModel):
@@ -25,6 +62,131 @@ async def agent_query(payload: AgentQuery):
     return await run_agent(payload.query)
 
 
+def _sse(event: str, data: Any) -> str:
+    # JSON keeps multi-line answer text on a single ``data:`` line.
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/api/v1/agent/query:stream")
+async def agent_query_stream(payload: AgentQuery):
+    """Server-Sent Events: ``plan``, then answer ``chunk``s as pages arrive, then ``trace``."""
+
+    async def events():
+        try:
+            async for event, data in stream_agent(payload.query):
+                yield _sse(event, data)
+        except Exception as e:
+            # Headers are already sent; report the failure in-band.
+            yield _sse("error", {"error": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+class AgentBatchQuery(BaseModel):
+    queries: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=1000,
+        examples=[["Какая средняя цена продуктов?", "Посчитай скидку 15% на товар с ID 1"]],
+    )
+    concurrency: Optional[int] = Field(None, ge=1, le=64, description="Max concurrent MCP calls")
+
+
+@app.post("/api/v1/agent/query:batch")
+async def agent_query_batch(payload: AgentBatchQuery):
+    return {"results": await run_agent_batch(payload.queries, payload.concurrency)}
+
+
+@app.get("/api/v1/products")
+async def list_products(
+    category: Optional[str] = None,
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=10000),
+):
+    """Stream products as JSON Lines, fetching them from MCP page by page."""
+
+    async def rows():
+        async with products_session() as mcp:
+            async for page in mcp.iter_products(category=category, page_size=page_size):
+                yield "".join(json.dumps(p._asdict(), ensure_ascii=False) + "\n" for p in page)
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+
+# Rows per add_products_bulk MCP call when importing an HTTP stream.
+BULK_CHUNK_ROWS = int(os.getenv("BULK_CHUNK_ROWS", "10000"))
+BULK_MAX_ERRORS = 100
+
+
+async def _line_chunks(body: AsyncIterator[bytes], size: int) -> AsyncIterator[Tuple[int, List[str]]]:
+    """Split a byte stream into chunks of ``size`` lines, yielding (first_line_no, lines)."""
+    buf = b""
+    chunk: List[str] = []
+    first = 1
+    line_no = 0
+    async for part in body:
+        buf += part
+        *lines, buf = buf.split(b"\n")
+        for raw in lines:
+            line_no += 1
+            chunk.append(raw.decode("utf-8").rstrip("\r"))
+            if len(chunk) >= size:
+                yield first, chunk
+                chunk, first = [], line_no + 1
+    if buf:
+        line_no += 1
+        chunk.append(buf.decode("utf-8").rstrip("\r"))
+    if chunk:
+        yield first, chunk
+
+
+@app.post("/api/v1/products:bulk")
+async def import_products(
+    request: Request,
+    format: str = Query("jsonl", pattern="^(jsonl|csv)$"),
+    batch_size: int = Query(1000, ge=1, le=50000),
+):
+    """Import a JSON Lines or CSV body, forwarding it to MCP in chunks as it arrives."""
+    report: Dict[str, Any] = {"inserted": 0, "rejected": 0, "errors": [], "batches": []}
+    header: Optional[str] = None
+
+    try:
+        async with products_session() as mcp:
+            async for first, lines in _line_chunks(request.stream(), BULK_CHUNK_ROWS):
+                if format == "csv" and header is None:
+                    header, lines, first = lines[0], lines[1:], first + 1
+                if not lines:
+                    continue
+                data = "\n".join([header, *lines] if header is not None else lines)
+                part = await mcp.add_products_bulk(data, format=format, batch_size=batch_size, first_line=first)
+                if "error" in part:
+                    # Earlier chunks are already committed; report them with the error.
+                    report["error"] = part["error"]
+                    return JSONResponse(status_code=400, content=report)
+
+                report["inserted"] += part["inserted"]
+                report["rejected"] += part["rejected"]
+                report["errors"].extend(part["errors"][: max(0, BULK_MAX_ERRORS - len(report["errors"]))])
+                for b in part["batches"]:
+                    report["batches"].append({**b, "batch": len(report["batches"]) + 1})
+    finally:
+        # Chunks (or batches of a failed chunk) may have committed.
+        RESPONSE_CACHE.clear()
+
+    seconds = sum(b["seconds"] for b in report["batches"])
+    report["rows_per_sec"] = round(report["inserted"] / seconds, 1) if seconds > 0 else None
+    return report
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: pipeline stage and tool-call latencies, intents, errors, MCP sessions."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/health")
 async def health():
     return {"status": "ok", "db_path": os.getenv("PRODUCTS_DB_PATH", "/app/data/products.json")}
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import os
-from typing import AsyncIterator
+from typing import Any, AsyncIterator, Dict, Tuple
 
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     create_async_engine,
     async_sessionmaker,
@@ -12,9 +15,120 @@ from sqlalchemy.orm import DeclarativeBase
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./data/app.db")
 
+# "tuned": WAL + the pragmas below on every SQLite connection, with a
+# separate read-only engine for read tools. "default": SQLite's own settings
+# and one shared engine (the previous behaviour).
+SQLITE_PROFILES = ("tuned", "default")
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "tuned").strip().lower()
 
-engine = create_async_engine(DATABASE_URL, echo=False, future=True)
+
+def sqlite_pragmas() -> Dict[str, Any]:
+    """Per-connection pragmas for the tuned profile (env-overridable)."""
+    return {
+        # WAL lets readers run alongside the single writer; NORMAL only
+        # syncs at checkpoints, which is safe in WAL mode.
+        "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        # Wait for a competing writer (another server process) instead of
+        # failing with "database is locked".
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        # Negative cache_size is in KiB.
+        "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+        "temp_store": "MEMORY",
+    }
+
+
+def _install_pragmas(engine: AsyncEngine, pragmas: Dict[str, Any]) -> None:
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_pragmas(dbapi_conn, _record) -> None:
+        cur = dbapi_conn.cursor()
+        for name, value in pragmas.items():
+            cur.execute(f"PRAGMA {name}={value}")
+        cur.close()
+
+
+def _begin_immediate(engine: AsyncEngine) -> None:
+    # Take the write lock when the transaction starts. A deferred transaction
+    # that reads first and then writes can fail at once with "database is
+    # locked" under WAL (stale snapshot), without waiting on busy_timeout.
+    @event.listens_for(engine.sync_engine, "connect")
+    def _no_driver_transactions(dbapi_conn, _record) -> None:
+        dbapi_conn.isolation_level = None
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def _begin(conn) -> None:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def server_pool_options(url: str) -> Dict[str, Any]:
+    """Engine pool options for server databases (PostgreSQL/asyncpg), from env.
+
+    Every MCP server process has its own pool, so the database sees up to
+    processes * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections.
+    """
+    opts: Dict[str, Any] = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "5")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1").strip().lower() not in ("0", "false", "no"),
+    }
+    if make_url(url).get_driver_name() == "asyncpg":
+        # Prepared statements cached per connection; set 0 behind pgbouncer
+        # in transaction mode, where server-side statements don't survive.
+        size = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+        opts["connect_args"] = {"statement_cache_size": size, "prepared_statement_cache_size": size}
+    return opts
+
+
+def _is_file_sqlite(url: str) -> bool:
+    u = make_url(url)
+    return u.get_backend_name() == "sqlite" and bool(u.database) and u.database != ":memory:"
+
+
+def create_engines(url: str, profile: str = SQLITE_PROFILE) -> Tuple[AsyncEngine, AsyncEngine]:
+    """Return ``(write_engine, read_engine)`` for ``url``.
+
+    With the tuned profile on a SQLite file, the write engine holds a single
+    connection, so writers in this process queue in the pool rather than
+    contend for SQLite's lock, and starts transactions with ``BEGIN
+    IMMEDIATE``; the read engine has its own connections marked
+    ``query_only``. Otherwise both are the same engine.
+    """
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"SQLITE_PROFILE must be one of {SQLITE_PROFILES}, got {profile!r}")
+    backend = make_url(url).get_backend_name()
+    if backend != "sqlite":
+        engine = create_async_engine(url, echo=False, future=True, **server_pool_options(url))
+        return engine, engine
+    if profile == "default" or not _is_file_sqlite(url):
+        engine = create_async_engine(url, echo=False, future=True)
+        return engine, engine
+
+    pragmas = sqlite_pragmas()
+    write_engine = create_async_engine(url, echo=False, future=True, pool_size=1, max_overflow=0)
+    _install_pragmas(write_engine, pragmas)
+    _begin_immediate(write_engine)
+
+    # journal_mode is a property of the database file; the writer sets it.
+    read_pragmas = {k: v for k, v in pragmas.items() if k != "journal_mode"}
+    read_pragmas["query_only"] = "ON"
+    read_engine = create_async_engine(
+        url,
+        echo=False,
+        future=True,
+        pool_size=int(os.getenv("SQLITE_READ_POOL_SIZE", "8")),
+        max_overflow=0,
+    )
+    _install_pragmas(read_engine, read_pragmas)
+    return write_engine, read_engine
+
+
+engine, read_engine = create_engines(DATABASE_URL)
 SessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+# For tools that only read; never commit through it.
+ReadSessionLocal = async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
 
 
 class Base(DeclarativeBase):
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from typing import List
+
+from sqlalchemy import DDL, Table, event
+
+
+# Full-text index over products.name/category (SQLite FTS5, external content:
+# the text lives only in products, the index stores tokens and rowids).
+# Triggers keep it in step with every write path: add_product, ORM flushes,
+# bulk import and raw inserts. Other backends get neither table nor triggers.
+FTS_TABLE = "products_fts"
+# One row per distinct indexed term; used to find spelling corrections.
+VOCAB_TABLE = "products_fts_vocab"
+
+CREATE_STATEMENTS: List[str] = [
+    # unicode61 folds case for Cyrillic too; prefix indexes make "ноу"* cheap.
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    "name, category, content='products', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE VIRTUAL TABLE {VOCAB_TABLE} USING fts5vocab({FTS_TABLE}, 'row')",
+    f"CREATE TRIGGER products_fts_ai AFTER INSERT ON products BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, name, category) VALUES (new.id, new.name, new.category); END",
+    f"CREATE TRIGGER products_fts_ad AFTER DELETE ON products BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, category) VALUES ('delete', old.id, old.name, old.category); END",
+    f"CREATE TRIGGER products_fts_au AFTER UPDATE OF name, category ON products BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, category) VALUES ('delete', old.id, old.name, old.category); "
+    f"INSERT INTO {FTS_TABLE}(rowid, name, category) VALUES (new.id, new.name, new.category); END",
+]
+
+# Triggers go with the products table; the virtual tables must be dropped explicitly.
+DROP_STATEMENTS: List[str] = [
+    f"DROP TABLE IF EXISTS {VOCAB_TABLE}",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+# Re-index every product from the content table (after a backfill or a restore).
+REBUILD_STATEMENT = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+
+def install(table: Table) -> None:
+    """Create/drop the index with ``table`` in ``metadata.create_all``/``drop_all`` on SQLite."""
+    for stmt in CREATE_STATEMENTS:
+        event.listen(table, "after_create", DDL(stmt).execute_if(dialect="sqlite"))
+    for stmt in DROP_STATEMENTS:
+        event.listen(table, "before_drop", DDL(stmt).execute_if(dialect="sqlite"))
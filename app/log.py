@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import random
+
+# Attributes every LogRecord has; anything else came in through ``extra=``.
+_STANDARD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message plus ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                out[key] = value
+        if record.exc_info:
+            out["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+def configure_logging() -> None:
+    """Root logging from env: ``LOG_LEVEL`` (default INFO), ``LOG_FORMAT`` text|json."""
+    handler = logging.StreamHandler()
+    if os.getenv("LOG_FORMAT", "text").strip().lower() == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), handlers=[handler])
+
+
+def sample_rate(env_var: str, default: float) -> float:
+    try:
+        return min(1.0, max(0.0, float(os.getenv(env_var, str(default)))))
+    except ValueError:
+        return default
+
+
+def should_log(logger: logging.Logger, level: int, rate: float) -> bool:
+    """Cheap gate for hot paths: level check first, then a 1-in-(1/rate) sample."""
+    return logger.isEnabledFor(level) and (rate >= 1.0 or random.random() < rate)
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import csv
+import json
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models import Product, category_key
+from app.stats import apply_stats_delta
+
+
+FORMATS = ("jsonl", "csv")
+CSV_FIELDS = ("name", "price", "category", "in_stock")
+
+# Keep MCP payloads bounded on feeds that are mostly garbage.
+MAX_REPORTED_ERRORS = 100
+
+_TRUE = {"1", "true", "yes", "y", "да", "t"}
+_FALSE = {"0", "false", "no", "n", "нет", "f", ""}
+
+
+def _as_bool(v: Any) -> bool:
+    if isinstance(v, bool):
+        return v
+    if v is None:
+        return True
+    s = str(v).strip().lower()
+    if s in _TRUE:
+        return True
+    if s in _FALSE:
+        return False
+    raise ValueError(f"in_stock: cannot parse {v!r} as boolean")
+
+
+def validate_row(d: Any) -> Dict[str, Any]:
+    """Validate one feed record and return the products row to insert."""
+    if not isinstance(d, dict):
+        raise ValueError("record must be an object")
+    name = str(d.get("name") or "").strip()
+    category = str(d.get("category") or "").strip()
+    key = category_key(category)
+    if not name or not key:
+        raise ValueError("name and category are required")
+    try:
+        price = float(str(d.get("price")).replace(",", "."))
+    except (TypeError, ValueError):
+        raise ValueError(f"price: cannot parse {d.get('price')!r}") from None
+    if price < 0:
+        raise ValueError("price must be >= 0")
+    return {
+        "name": name,
+        "price": price,
+        "category": category,
+        "category_key": key,
+        "in_stock": _as_bool(d.get("in_stock", True)),
+    }
+
+
+def parse_records(
+    lines: Iterable[str], fmt: str, first_line: int = 1
+) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """Yield (line_no, row, error) per record; exactly one of row/error is set.
+
+    For CSV the first line is the header and ``first_line`` is the line
+    number of the first record after it.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}")
+
+    if fmt == "jsonl":
+        for i, line in enumerate(lines, start=first_line):
+            if not line.strip():
+                continue
+            try:
+                yield i, validate_row(json.loads(line)), None
+            except ValueError as e:  # json.JSONDecodeError is a ValueError
+                yield i, None, str(e)
+        return
+
+    reader = csv.DictReader(lines)
+    missing = [f for f in ("name", "price", "category") if f not in (reader.fieldnames or ())]
+    if missing:
+        yield first_line - 1, None, f"csv header is missing columns: {', '.join(missing)}"
+        return
+    for i, rec in enumerate(reader, start=first_line):
+        try:
+            yield i, validate_row(rec), None
+        except ValueError as e:
+            yield i, None, str(e)
+
+
+async def _insert_batch(session: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    # Core executemany: no ORM identity map, no per-row RETURNING/refresh.
+    await session.execute(insert(Product.__table__), rows)
+    added = [(r["category_key"], r["price"]) for r in rows]
+    await session.run_sync(lambda s: apply_stats_delta(s.connection(), added))
+    await session.commit()
+
+
+async def import_records(
+    session_factory: async_sessionmaker,
+    records: Iterable[Tuple[int, Optional[Dict[str, Any]], Optional[str]]],
+    batch_size: int = 1000,
+) -> Dict[str, Any]:
+    """Insert validated records in batches of ``batch_size``, one transaction per batch.
+
+    Returns a report with per-batch row counts and throughput, plus the
+    first ``MAX_REPORTED_ERRORS`` validation errors.
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size must be > 0")
+
+    report: Dict[str, Any] = {"inserted": 0, "rejected": 0, "errors": [], "batches": []}
+    started = time.perf_counter()
+
+    async def flush(rows: List[Dict[str, Any]]) -> None:
+        t0 = time.perf_counter()
+        async with session_factory() as s:
+            await _insert_batch(s, rows)
+        dt = time.perf_counter() - t0
+        report["inserted"] += len(rows)
+        report["batches"].append({
+            "batch": len(report["batches"]) + 1,
+            "rows": len(rows),
+            "seconds": round(dt, 4),
+            "rows_per_sec": round(len(rows) / dt, 1) if dt > 0 else None,
+        })
+
+    batch: List[Dict[str, Any]] = []
+    for line_no, row, error in records:
+        if error is not None:
+            report["rejected"] += 1
+            if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                report["errors"].append({"line": line_no, "error": error})
+            continue
+        batch.append(row)
+        if len(batch) >= batch_size:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+
+    total = time.perf_counter() - started
+    report["seconds"] = round(total, 4)
+    report["rows_per_sec"] = round(report["inserted"] / total, 1) if total > 0 else None
+    return report
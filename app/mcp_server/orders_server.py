@@ -1,76 +1,214 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from app.mcp_server import startup  # first: starts the startup-profile clock
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
 
 from fastmcp import FastMCP
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, func, insert, or_, select
+
+from app.db import ReadSessionLocal, SessionLocal
+from app.models import Order, OrderRollup, Product, category_key
+from app.rollups import GRANULARITIES, apply_order_rollups, bucket_start
+
+
+mcp = FastMCP(
+    "Orders MCP Server",
+    instructions="Tools: create_order, create_orders_batch, list_orders, get_order, get_revenue",
+)
+
+
+REVENUE_GROUPS = ("product", "category")
+
+
+def _parse_ts(value: Optional[str], name: str) -> Optional[datetime]:
+    """ISO 8601 -> naive UTC, as created_at is stored."""
+    if not value:
+        return None
+    try:
+        ts = datetime.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"{name}: expected ISO 8601 datetime, got {value!r}") from None
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def _o_to_dict(o: Any) -> Dict[str, Any]:
+    # Accepts an Order or an orders row (e.g. from INSERT ... RETURNING).
+    return {
+        "id": o.id,
+        "product_id": o.product_id,
+        "quantity": o.quantity,
+        "total_price": o.total_price,
+        "created_at": o.created_at.isoformat(),
+    }
 
-from app.db import SessionLocal
-from app.models import Product, Order
 
+async def _create_orders(items: List[Dict[str, int]]) -> List[Dict[str, Any]]:
+    """Validate and insert orders in one transaction; prices come from one SELECT ... IN."""
+    if not items:
+        raise ValueError("items must not be empty")
+    wanted: List[tuple] = []
+    for it in items:
+        product_id, quantity = int(it["product_id"]), int(it["quantity"])
+        if quantity <= 0:
+            raise ValueError("quantity must be > 0")
+        wanted.append((product_id, quantity))
 
-mcp = FastMCP("Orders MCP Server", instructions="Tools: create_order, list_orders, get_order")
+    async with SessionLocal() as s:
+        ids = {pid for pid, _ in wanted}
+        found = (await s.execute(
+            select(Product.id, Product.price, Product.category_key).where(Product.id.in_(ids))
+        )).all()
+        prices = {pid: price for pid, price, _ in found}
+        categories = {pid: key for pid, _, key in found}
+        missing = sorted(ids - prices.keys())
+        if missing:
+            raise ValueError(f"Product with id={', '.join(map(str, missing))} not found")
+
+        # One multi-row INSERT ... RETURNING: ids and all columns come back
+        # with the insert, in parameter order, without a refresh per order.
+        now = datetime.utcnow()
+        stmt = insert(Order.__table__).returning(*Order.__table__.c, sort_by_parameter_order=True)
+        rows = (await s.execute(stmt, [
+            {"product_id": pid, "quantity": qty, "total_price": float(prices[pid]) * qty, "created_at": now}
+            for pid, qty in wanted
+        ])).all()
+        # Hourly/daily revenue rollups move in the same transaction.
+        added = [(o.product_id, categories[o.product_id], o.created_at, o.quantity, o.total_price) for o in rows]
+        await s.run_sync(lambda ss: apply_order_rollups(ss.connection(), added))
+        await s.commit()
+        return [_o_to_dict(o) for o in rows]
 
 
 @mcp.tool
 async def create_order(product_id: int, quantity: int) -> Dict[str, Any]:
     """Создать заказ. ValueError если товара нет или quantity <= 0."""
-    if quantity <= 0:
-        raise ValueError("quantity must be > 0")
+    (order,) = await _create_orders([{"product_id": product_id, "quantity": quantity}])
+    return order
 
-    async with SessionLocal() as s:
-        p = await s.get(Product, product_id)
-        if not p:
-            raise ValueError(f"Product with id={product_id} not found")
 
-        total = float(p.price) * int(quantity)
-        order = Order(product_id=product_id, quantity=quantity, total_price=total)
-        s.add(order)
-        await s.commit()
-        await s.refresh(order)
+@mcp.tool
+async def create_orders_batch(items: List[Dict[str, int]]) -> List[Dict[str, Any]]:
+    """Создать несколько заказов одной транзакцией.
 
-        return {
-            "id": order.id,
-            "product_id": order.product_id,
-            "quantity": order.quantity,
-            "total_price": order.total_price,
-            "created_at": order.created_at.isoformat(),
-        }
+    items: [{"product_id": int, "quantity": int}, ...]. Цены всех товаров
+    читаются одним запросом; если хотя бы один товар не найден или
+    quantity <= 0 — ValueError, и ни один заказ не создаётся.
+    """
+    return await _create_orders(items)
 
 
 @mcp.tool
 async def get_order(id: int) -> Dict[str, Any]:
     """Получить заказ по id. ValueError если не найден."""
-    async with SessionLocal() as s:
+    async with ReadSessionLocal() as s:
         o = await s.get(Order, id)
         if not o:
             raise ValueError(f"Order with id={id} not found")
-        return {
-            "id": o.id,
-            "product_id": o.product_id,
-            "quantity": o.quantity,
-            "total_price": o.total_price,
-            "created_at": o.created_at.isoformat(),
-        }
+        return _o_to_dict(o)
 
 
 @mcp.tool
-async def list_orders() -> List[Dict[str, Any]]:
-    """Список всех заказов."""
-    async with SessionLocal() as s:
-        rows = (await s.execute(select(Order).order_by(Order.id.desc()))).scalars().all()
-        return [
-            {
-                "id": o.id,
-                "product_id": o.product_id,
-                "quantity": o.quantity,
-                "total_price": o.total_price,
-                "created_at": o.created_at.isoformat(),
-            }
-            for o in rows
-        ]
+async def list_orders(
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    limit: Optional[int] = None,
+    before_id: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Список заказов, новые первыми (created_at desc, id desc).
+
+    created_from/created_to — ISO 8601, полуинтервал [from, to); без зоны считается UTC.
+    Keyset-пагинация: limit — размер страницы, before_id — id последнего заказа
+    предыдущей страницы. Без limit возвращаются все подходящие заказы.
+    """
+    if limit is not None and int(limit) <= 0:
+        raise ValueError("limit must be > 0")
+    start, end = _parse_ts(created_from, "created_from"), _parse_ts(created_to, "created_to")
+
+    async with ReadSessionLocal() as s:
+        # Served by ix_orders_created_at_id in both directions.
+        stmt = select(Order).order_by(Order.created_at.desc(), Order.id.desc())
+        if start is not None:
+            stmt = stmt.where(Order.created_at >= start)
+        if end is not None:
+            stmt = stmt.where(Order.created_at < end)
+        if before_id is not None:
+            cursor = (await s.execute(select(Order.created_at).where(Order.id == int(before_id)))).scalar()
+            if cursor is None:
+                raise ValueError(f"Order with id={before_id} not found")
+            stmt = stmt.where(or_(
+                Order.created_at < cursor,
+                and_(Order.created_at == cursor, Order.id < int(before_id)),
+            ))
+        if limit is not None:
+            stmt = stmt.limit(int(limit))
+        rows = (await s.execute(stmt)).scalars().all()
+        return [_o_to_dict(o) for o in rows]
+
+
+@mcp.tool
+async def get_revenue(
+    granularity: str = "day",
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    group_by: Optional[str] = None,
+    category: Optional[str] = None,
+    product_id: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Выручка по часам или дням: orders, quantity, revenue на интервал.
+
+    Читает только таблицу order_rollups (агрегаты обновляются вместе с заказами),
+    таблица orders не сканируется. granularity: hour | day; group_by: product |
+    category | не задан (итог по интервалу). created_from/created_to (ISO 8601):
+    возвращаются все интервалы, пересекающие [from, to) — первый и последний
+    могут быть неполными и считаются целиком. category и product_id фильтруют строки.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {GRANULARITIES}")
+    if group_by is not None and group_by not in REVENUE_GROUPS:
+        raise ValueError(f"group_by must be one of {REVENUE_GROUPS}")
+    start, end = _parse_ts(created_from, "created_from"), _parse_ts(created_to, "created_to")
+
+    r = OrderRollup
+    dims = [r.bucket_start]
+    if group_by == "product":
+        dims.append(r.product_id)
+    elif group_by == "category":
+        dims.append(r.category_key)
+    stmt = (
+        select(*dims, func.sum(r.orders), func.sum(r.quantity), func.sum(r.revenue))
+        .where(r.granularity == granularity)
+        .group_by(*dims)
+        .order_by(*dims)
+    )
+    if start is not None:
+        stmt = stmt.where(r.bucket_start >= bucket_start(start, granularity))
+    if end is not None:
+        # Not rounded: the bucket holding ``end`` starts before it and is included.
+        stmt = stmt.where(r.bucket_start < end)
+    if category:
+        stmt = stmt.where(r.category_key == category_key(category))
+    if product_id is not None:
+        stmt = stmt.where(r.product_id == int(product_id))
+
+    async with ReadSessionLocal() as s:
+        rows = (await s.execute(stmt)).all()
+    out = []
+    for row in rows:
+        item: Dict[str, Any] = {"bucket": row[0].isoformat()}
+        if group_by:
+            item[group_by] = row[1]
+        item.update({"orders": int(row[-3]), "quantity": int(row[-2]), "revenue": float(row[-1])})
+        out.append(item)
+    return out
+
+
+def main() -> None:
+    startup.run(mcp, "orders")  # stdio
 
 
 if __name__ == "__main__":
-    mcp.run()  # stdio
+    main()
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+# No database imports: the file-backed ProductStore (no-DB mode) uses this too.
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# numpy is imported where it is used: it adds ~0.2 s to every MCP server
+# start, and most server processes never compute a price distribution.
+
+
+PERCENTILES = (("median", 0.5), ("p90", 0.9), ("p99", 0.99))
+DEFAULT_BINS = 10
+MAX_BINS = 1000
+
+
+def _group_starts(codes: np.ndarray, n_groups: int) -> Tuple[np.ndarray, np.ndarray]:
+    import numpy as np
+
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.zeros(n_groups, dtype=np.int64)
+    np.cumsum(counts[:-1], out=starts[1:])
+    return starts, counts
+
+
+def grouped_stats(prices: np.ndarray, codes: np.ndarray, n_groups: int, bins: int = DEFAULT_BINS) -> Dict[str, np.ndarray]:
+    """Per-group price aggregates in one vectorized pass.
+
+    ``prices`` must be sorted by (code, price), as ``PriceSnapshot`` keeps
+    them, so min/max/percentiles are index lookups and sums are
+    ``reduceat`` over contiguous runs. Percentiles use linear
+    interpolation (numpy's default); stddev is the population one.
+    Histograms have ``bins`` equal-width bins between each group's min
+    and max. Empty groups get zeros.
+    """
+    import numpy as np
+
+    starts, counts = _group_starts(codes, n_groups)
+    nonempty = counts > 0
+    safe_starts = np.where(nonempty, starts, 0)
+    n = np.maximum(counts, 1)
+    last = safe_starts + n - 1
+
+    out: Dict[str, np.ndarray] = {"count": counts}
+    if not len(prices):
+        zeros = np.zeros(n_groups)
+        out.update({k: zeros for k in ("mean", "stddev", "min", "max", *(name for name, _ in PERCENTILES))})
+        out["hist_edges"] = np.zeros((n_groups, bins + 1))
+        out["hist_counts"] = np.zeros((n_groups, bins), dtype=np.int64)
+        return out
+
+    sums = np.where(nonempty, np.add.reduceat(prices, safe_starts), 0.0)
+    mean = sums / n
+    # Two-pass variance: deviations from the group mean, not sum of squares.
+    dev = prices - np.repeat(mean, counts)
+    var = np.where(nonempty, np.add.reduceat(dev * dev, safe_starts), 0.0) / n
+
+    lo = np.where(nonempty, prices[safe_starts], 0.0)
+    hi = np.where(nonempty, prices[last], 0.0)
+    out.update({"mean": mean, "stddev": np.sqrt(var), "min": lo, "max": hi})
+
+    for name, q in PERCENTILES:
+        pos = q * (n - 1)
+        below = np.floor(pos).astype(np.int64)
+        a = prices[safe_starts + below]
+        b = prices[safe_starts + np.minimum(below + 1, n - 1)]
+        out[name] = np.where(nonempty, a + (b - a) * (pos - below), 0.0)
+
+    width = hi - lo
+    group_lo = np.repeat(lo, counts)
+    group_width = np.repeat(width, counts)
+    scaled = np.divide(prices - group_lo, group_width, out=np.zeros_like(prices), where=group_width > 0)
+    bin_idx = np.minimum((scaled * bins).astype(np.int64), bins - 1)
+    out["hist_counts"] = np.bincount(codes * bins + bin_idx, minlength=n_groups * bins).reshape(n_groups, bins)
+    out["hist_edges"] = lo[:, None] + width[:, None] * (np.arange(bins + 1) / bins)
+    return out
+
+
+def _row(stats: Dict[str, np.ndarray], i: int) -> Dict[str, Any]:
+    return {
+        "count": int(stats["count"][i]),
+        "mean": float(stats["mean"][i]),
+        "stddev": float(stats["stddev"][i]),
+        "min": float(stats["min"][i]),
+        **{name: float(stats[name][i]) for name, _ in PERCENTILES},
+        "max": float(stats["max"][i]),
+        "histogram": {
+            "edges": [round(float(e), 2) for e in stats["hist_edges"][i]],
+            "counts": [int(c) for c in stats["hist_counts"][i]],
+        },
+    }
+
+
+def _single(sorted_prices: np.ndarray, bins: int) -> Dict[str, Any]:
+    import numpy as np
+
+    codes = np.zeros(len(sorted_prices), dtype=np.int32)
+    return _row(grouped_stats(sorted_prices, codes, 1, bins), 0)
+
+
+@dataclass
+class PriceSnapshot:
+    """Columnar copy of (category_key, price), sorted for grouped lookups."""
+
+    version: Hashable
+    keys: List[str]  # category_key per group code
+    prices: np.ndarray  # float64, sorted by (code, price)
+    codes: np.ndarray  # int32 group code per price, non-decreasing
+    all_prices: np.ndarray  # float64, sorted by price
+    _results: Dict[Tuple[Optional[str], int], Dict[str, Any]] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, version: Hashable, rows: Sequence[Tuple[str, float]]) -> "PriceSnapshot":
+        import numpy as np
+
+        # Dictionary-encode categories so grouping works on small ints.
+        index: Dict[str, int] = {}
+        codes = np.fromiter((index.setdefault(k, len(index)) for k, _ in rows), dtype=np.int32, count=len(rows))
+        prices = np.fromiter((p for _, p in rows), dtype=np.float64, count=len(rows))
+        # Sort by price, then stably by code: the second sort is a radix sort
+        # on small ints, about twice as fast as lexsort on both columns.
+        by_price = np.argsort(prices)
+        order = by_price[np.argsort(codes[by_price], kind="stable")]
+        return cls(version, list(index), prices[order], codes[order], prices[by_price])
+
+    def distribution(self, key: Optional[str], bins: int) -> Dict[str, Any]:
+        """Stats for one category_key, or for the whole catalog plus every category when None."""
+        cached = self._results.get((key, bins))
+        if cached is not None:
+            return cached
+        import numpy as np
+
+        if key is None:
+            overall = _single(self.all_prices, bins)
+            per = grouped_stats(self.prices, self.codes, len(self.keys), bins)
+            result = {**overall, "categories": {k: _row(per, i) for i, k in enumerate(self.keys)}}
+        elif key in self.keys:
+            code = self.keys.index(key)
+            start, stop = np.searchsorted(self.codes, [code, code + 1])
+            result = _single(self.prices[start:stop], bins)
+        else:
+            result = _single(self.prices[:0], bins)
+        self._results[(key, bins)] = result
+        return result
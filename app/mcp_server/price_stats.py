@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.mcp_server.price_snapshot import PriceSnapshot
+from app.models import Product
+from app.stats import products_version
+
+
+class PriceStatsCache:
+    """Snapshot of the price column, rebuilt after any write to products.
+
+    Every product write bumps ``products_version`` in the same transaction,
+    so one primary-key read tells whether the snapshot is current, including
+    for writes made by other server processes and for writes that leave the
+    catalog-wide aggregates unchanged (a category move, two swapped prices).
+    """
+
+    def __init__(self) -> None:
+        self._snapshot: Optional[PriceSnapshot] = None
+        self._lock = asyncio.Lock()
+        self.builds = 0
+
+    def invalidate(self) -> None:
+        self._snapshot = None
+
+    async def snapshot(self, session_factory: async_sessionmaker) -> PriceSnapshot:
+        async with self._lock:
+            async with session_factory() as s:
+                version = await products_version(s)
+                snap = self._snapshot
+                if snap is not None and snap.version == version:
+                    return snap
+                rows = (await s.execute(select(Product.category_key, Product.price))).tuples().all()
+            # Sorting a large catalog is CPU-bound; numpy releases the GIL for it.
+            snap = await asyncio.to_thread(PriceSnapshot.build, version, rows)
+            self._snapshot = snap
+            self.builds += 1
+            return snap
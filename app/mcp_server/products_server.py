@@ -1,21 +1,44 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from app.mcp_server import startup  # first: starts the startup-profile clock
+
+import os
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from fastmcp import FastMCP
-from sqlalchemy import func, select
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import SessionLocal
-from app.models import Product
+from app.db import ReadSessionLocal, SessionLocal
+from app.mcp_server.bulk_import import import_records, parse_records
+from app.mcp_server.cache import TTLCache
+from app.mcp_server.price_snapshot import DEFAULT_BINS, MAX_BINS
+from app.mcp_server.price_stats import PriceStatsCache
+from app.mcp_server.search import DEFAULT_LIMIT as SEARCH_DEFAULT_LIMIT, MAX_LIMIT as SEARCH_MAX_LIMIT
+from app.mcp_server.search import search_products as _search_products
+from app.models import GLOBAL_STATS_KEY, Product, ProductStats, category_key
+from app.stats import apply_stats_delta, products_version
 
 
 mcp = FastMCP(
     "Products MCP Server",
-    instructions="Tools: list_products, get_product, add_product, get_statistics",
+    instructions="Tools: list_products, get_product, search_products, add_product, add_products_bulk, get_statistics, get_price_distribution, cache_stats",
 )
 
+# Read-through caches for the hot read paths. PRODUCTS_CACHE_SIZE=0 disables them.
+_CACHE_SIZE = int(os.getenv("PRODUCTS_CACHE_SIZE", "1024"))
+_CACHE_TTL = float(os.getenv("PRODUCTS_CACHE_TTL", "5"))
+_product_cache = TTLCache(maxsize=_CACHE_SIZE, ttl=_CACHE_TTL)
+# list_products pages as row tuples, tagged by category_key (None for the unfiltered listing).
+# Keyed by products_version as well: a write through any server process
+# sharing the database makes the older pages unreachable here.
+_list_cache = TTLCache(maxsize=_CACHE_SIZE, ttl=_CACHE_TTL)
+# Columnar price snapshot for get_price_distribution; rebuilt after writes.
+_price_stats = PriceStatsCache()
+
 
-def _p_to_dict(p: Product) -> Dict[str, Any]:
+def _p_to_dict(p: Any) -> Dict[str, Any]:
+    # Accepts a Product or a products row (e.g. from INSERT ... RETURNING).
     return {
         "id": p.id,
         "name": p.name,
@@ -25,30 +48,102 @@ def _p_to_dict(p: Product) -> Dict[str, Any]:
     }
 
 
+# Column order of compact list_products pages: {"columns": [...], "rows": [[...], ...]}.
+PRODUCT_COLUMNS = ("id", "name", "price", "category", "in_stock")
+_product_columns = [Product.__table__.c[name] for name in PRODUCT_COLUMNS]
+
+
+def _p_to_row(p: Any, categories: Dict[str, str]) -> Tuple[Any, ...]:
+    # Category values repeat down a page; keep one string object per distinct value.
+    c = categories.setdefault(p.category, p.category)
+    return (p.id, p.name, float(p.price), c, bool(p.in_stock))
+
+
 def _norm_text(s: str) -> str:
     return " ".join(str(s).replace("\u00A0", " ").split()).strip()
 
 
 @mcp.tool
-async def list_products(category: Optional[str] = None) -> List[Dict[str, Any]]:
-    async with SessionLocal() as s:
-        stmt = select(Product).order_by(Product.id.asc())
-        if category:
-            cat = " ".join(str(category).replace("\u00A0", " ").split()).strip()
-            stmt = stmt.where(func.lower(Product.category) == func.lower(cat))
-        rows = (await s.execute(stmt)).scalars().all()
-        return [_p_to_dict(p) for p in rows]
+async def list_products(
+    category: Optional[str] = None,
+    limit: Optional[int] = None,
+    after_id: Optional[int] = None,
+    compact: bool = False,
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """Список продуктов по возрастанию id.
+
+    Keyset-пагинация: limit — размер страницы, after_id — id последнего
+    продукта предыдущей страницы. Без limit возвращаются все записи.
+    compact=true — страница в виде {"columns": [...], "rows": [[...], ...]}
+    без повторения ключей в каждой записи.
+    """
+    if limit is not None and int(limit) <= 0:
+        raise ValueError("limit must be > 0")
+
+    key = category_key(category) if category else None
+    async with ReadSessionLocal() as s:
+        # One read session: a hit costs the version lookup, and a miss reads
+        # the rows in the same transaction, so they match the version exactly.
+        version = await products_version(s) if _list_cache.enabled else None
+        cache_key = (version, key, None if limit is None else int(limit), None if after_id is None else int(after_id))
+        rows = _list_cache.get(cache_key)
+        if rows is None:
+            rows = await _fetch_rows(s, key, limit, after_id)
+            _list_cache.set(cache_key, rows, tag=key)
+    if compact:
+        return {"columns": list(PRODUCT_COLUMNS), "rows": rows}
+    return [dict(zip(PRODUCT_COLUMNS, r)) for r in rows]
+
+
+async def _fetch_rows(
+    s: AsyncSession, key: Optional[str], limit: Optional[int], after_id: Optional[int]
+) -> List[Tuple[Any, ...]]:
+    # Plain column tuples: no ORM identity map or instance state per row.
+    stmt = select(*_product_columns).order_by(Product.id.asc())
+    if key is not None:
+        stmt = stmt.where(Product.category_key == key)
+    if after_id is not None:
+        stmt = stmt.where(Product.id > int(after_id))
+    if limit is not None:
+        stmt = stmt.limit(int(limit))
+    categories: Dict[str, str] = {}
+    return [_p_to_row(r, categories) for r in await s.execute(stmt)]
 
 
 @mcp.tool
 async def get_product(id: int) -> Dict[str, Any]:
     """Получить продукт по id. Если не найден — error."""
     try:
-        async with SessionLocal() as s:
+        cached = _product_cache.get(int(id))
+        if cached is not None:
+            return cached
+        async with ReadSessionLocal() as s:
             p = await s.get(Product, int(id))
             if not p:
                 return {"error": f"Product with id={id} not found"}
-            return _p_to_dict(p)
+            out = _p_to_dict(p)
+        _product_cache.set(int(id), out)
+        return out
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@mcp.tool
+async def search_products(query: str, limit: int = SEARCH_DEFAULT_LIMIT, offset: int = 0) -> Dict[str, Any]:
+    """Поиск продуктов по словам из названия и категории, лучшие совпадения первыми.
+
+    Каждое слово ищется как префикс («ноут» находит «Ноутбук»); слово, которое
+    не встречается в каталоге, дополнительно ищется с исправлением одной опечатки.
+    Постранично: limit (до 100) и offset; next_offset — offset следующей страницы
+    или null. corrections — какими словами каталога были заменены слова с опечатками.
+    """
+    try:
+        if not 1 <= int(limit) <= SEARCH_MAX_LIMIT:
+            return {"error": f"limit must be between 1 and {SEARCH_MAX_LIMIT}"}
+        if int(offset) < 0:
+            return {"error": "offset must be >= 0"}
+        async with ReadSessionLocal() as s:
+            return await _search_products(s, _norm_text(query), int(limit), int(offset))
     except Exception as e:
         return {"error": str(e)}
 
@@ -57,47 +152,117 @@ async def get_product(id: int) -> Dict[str, Any]:
 async def add_product(name: str, price: float, category: str, in_stock: bool = True) -> Dict[str, Any]:
     """Добавить продукт и вернуть созданную запись."""
     try:
-        if not name or not category:
+        if not name or not category or not category_key(category):
             return {"error": "name and category are required"}
         if float(price) < 0:
             return {"error": "price must be >= 0"}
 
-        async with SessionLocal() as s:
-            p = Product(
+        # INSERT ... RETURNING hands back the row in the same round trip
+        # (no refresh); product_stats is updated in the same transaction.
+        stmt = (
+            insert(Product.__table__)
+            .values(
                 name=str(name),
                 price=float(price),
                 category=str(category),
+                category_key=category_key(category),
                 in_stock=bool(in_stock),
             )
-            s.add(p)
+            .returning(*Product.__table__.c)
+        )
+        async with SessionLocal() as s:
+            row = (await s.execute(stmt)).one()
+            await s.run_sync(lambda ss: apply_stats_delta(ss.connection(), [(row.category_key, row.price)]))
             await s.commit()
-            await s.refresh(p)
-            return _p_to_dict(p)
+        _list_cache.invalidate_tag(row.category_key)
+        _list_cache.invalidate_tag(None)
+        return _p_to_dict(row)
     except Exception as e:
         return {"error": str(e)}
 
 
 @mcp.tool
-async def get_statistics() -> Dict[str, Any]:
-    """Статистика: count, avg_price, min_price, max_price."""
+async def add_products_bulk(
+    data: str,
+    format: str = "jsonl",
+    batch_size: int = 1000,
+    first_line: int = 1,
+) -> Dict[str, Any]:
+    """Массовый импорт продуктов из JSON Lines или CSV (с заголовком name,price,category,in_stock).
+
+    Вставка пачками по batch_size строк, по транзакции на пачку. first_line —
+    номер строки первой записи в исходном файле (для сообщений об ошибках).
+    Возвращает inserted/rejected, ошибки валидации и пропускную способность по пачкам.
+    """
     try:
-        async with SessionLocal() as s:
-            stmt = select(
-                func.count(Product.id),
-                func.avg(Product.price),
-                func.min(Product.price),
-                func.max(Product.price),
-            )
-            count, avg_, min_, max_ = (await s.execute(stmt)).one()
-            return {
-                "count": int(count or 0),
-                "avg_price": float(avg_ or 0.0),
-                "min_price": float(min_ or 0.0),
-                "max_price": float(max_ or 0.0),
-            }
+        records = parse_records(data.splitlines(), format, first_line=first_line)
+        try:
+            return await import_records(SessionLocal, records, batch_size=batch_size)
+        finally:
+            # Batches may have committed even if a later one failed.
+            _list_cache.clear()
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@mcp.tool
+async def get_statistics(category: Optional[str] = None) -> Dict[str, Any]:
+    """Статистика: count, avg_price, min_price, max_price (по всем продуктам или по категории).
+
+    Читает одну строку product_stats, которая обновляется вместе с записью продуктов.
+    """
+    try:
+        key = category_key(category) if category else GLOBAL_STATS_KEY
+        async with ReadSessionLocal() as s:
+            row = await s.get(ProductStats, key)
+            out: Dict[str, Any] = {"category": category} if category else {}
+            if row is None or not row.count:
+                out.update({"count": 0, "avg_price": 0.0, "min_price": 0.0, "max_price": 0.0})
+                return out
+            out.update({
+                "count": int(row.count),
+                "avg_price": float(row.price_sum) / int(row.count),
+                "min_price": float(row.min_price),
+                "max_price": float(row.max_price),
+            })
+            return out
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@mcp.tool
+async def get_price_distribution(category: Optional[str] = None, bins: int = DEFAULT_BINS) -> Dict[str, Any]:
+    """Распределение цен: count, mean, stddev, min, median, p90, p99, max и гистограмма из bins столбцов.
+
+    Без категории — по всему каталогу и отдельно по каждой категории (ключ — нормализованное
+    название). Считается векторно по снимку столбцов (категория, цена), который перечитывается
+    только после записи продуктов.
+    """
+    try:
+        if not 1 <= int(bins) <= MAX_BINS:
+            return {"error": f"bins must be between 1 and {MAX_BINS}"}
+        snap = await _price_stats.snapshot(ReadSessionLocal)
+        key = category_key(category) if category else None
+        out: Dict[str, Any] = {"category": category} if category else {}
+        out.update(snap.distribution(key, int(bins)))
+        return out
     except Exception as e:
         return {"error": str(e)}
 
 
+@mcp.tool
+async def cache_stats() -> Dict[str, Any]:
+    """Счётчики кэша этого процесса: hits/misses/evictions/invalidations по get_product и list_products, число пересборок снимка цен."""
+    return {
+        "get_product": _product_cache.stats(),
+        "list_products": _list_cache.stats(),
+        "price_snapshot_builds": _price_stats.builds,
+    }
+
+
+def main() -> None:
+    startup.run(mcp, "products")  # stdio
+
+
 if __name__ == "__main__":
-    mcp.run()
+    main()
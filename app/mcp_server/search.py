@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Sequence, Set, Tuple
+
+from sqlalchemy import and_, bindparam, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.fts import FTS_TABLE, VOCAB_TABLE
+from app.models import Product
+
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+# Words of a query that are used; the rest are ignored.
+MAX_TOKENS = 8
+# Shorter words are too ambiguous to correct ("чай" is one edit from "рай", "май", ...).
+MIN_TYPO_LEN = 4
+# bm25 column weights: a hit in the name counts more than one in the category.
+NAME_WEIGHT = 10.0
+CATEGORY_WEIGHT = 2.0
+
+_TOKEN_RE = re.compile(r"\w+")
+_CYRILLIC = "абвгдеёжзийклмнопрстуфхцчшщъыьэюя"
+_LATIN = "abcdefghijklmnopqrstuvwxyz"
+_DIGITS = "0123456789"
+
+
+def query_tokens(query: str) -> List[str]:
+    """Case-folded words of ``query``, deduplicated, at most MAX_TOKENS."""
+    out: List[str] = []
+    for tok in _TOKEN_RE.findall(str(query).casefold()):
+        if tok not in out:
+            out.append(tok)
+    return out[:MAX_TOKENS]
+
+
+def edits1(word: str) -> Set[str]:
+    """Every string one deletion, transposition, substitution or insertion away from ``word``.
+
+    Substitutions and insertions use the alphabet of the word's script, so a
+    Cyrillic word yields ~70 candidates per letter rather than thousands.
+    """
+    alphabet = _CYRILLIC if any(c in _CYRILLIC for c in word) else _LATIN
+    alphabet += _DIGITS
+    splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+    out = {a + b[1:] for a, b in splits if b}
+    out.update(a + b[1] + b[0] + b[2:] for a, b in splits if len(b) > 1)
+    out.update(a + c + b[1:] for a, b in splits if b for c in alphabet)
+    out.update(a + c + b for a, b in splits for c in alphabet)
+    out.discard(word)
+    return out
+
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def match_expression(tokens: Sequence[str], corrections: Dict[str, List[str]]) -> str:
+    """FTS5 MATCH string: every token is required, as a prefix or one of its corrections."""
+    parts = []
+    for tok in tokens:
+        alts = corrections.get(tok)
+        if alts:
+            parts.append("(" + " OR ".join([_quote(tok) + "*"] + [_quote(a) for a in alts]) + ")")
+        else:
+            parts.append(_quote(tok) + "*")
+    return " AND ".join(parts)
+
+
+_HAS_PREFIX = text(f"SELECT term FROM {VOCAB_TABLE} WHERE term >= :tok ORDER BY term LIMIT 1")
+_KNOWN_TERMS = text(f"SELECT term FROM {VOCAB_TABLE} WHERE term IN :terms").bindparams(
+    bindparam("terms", expanding=True)
+)
+
+
+async def corrections_for(session: AsyncSession, tokens: Sequence[str]) -> Dict[str, List[str]]:
+    """Indexed terms one edit away from each token that matches nothing as typed.
+
+    Looks the candidates up in the FTS vocabulary (an index seek per
+    candidate), so the result always reflects the current catalog.
+    """
+    out: Dict[str, List[str]] = {}
+    for tok in tokens:
+        if len(tok) < MIN_TYPO_LEN or tok.isdigit():
+            continue
+        first = (await session.execute(_HAS_PREFIX, {"tok": tok})).scalar()
+        if first is not None and first.startswith(tok):
+            continue
+        found = (await session.execute(_KNOWN_TERMS, {"terms": sorted(edits1(tok))})).scalars().all()
+        if found:
+            out[tok] = sorted(found)
+    return out
+
+
+_COLUMNS = (Product.id, Product.name, Product.price, Product.category, Product.in_stock)
+
+
+def _row_to_dict(r: Any) -> Dict[str, Any]:
+    return {"id": r.id, "name": r.name, "price": float(r.price), "category": r.category, "in_stock": bool(r.in_stock)}
+
+
+async def _search_fts(
+    session: AsyncSession, tokens: Sequence[str], limit: int, offset: int
+) -> Tuple[List[Any], Dict[str, List[str]]]:
+    corrections = await corrections_for(session, tokens)
+    stmt = text(
+        f"SELECT p.id, p.name, p.price, p.category, p.in_stock "
+        f"FROM {FTS_TABLE} JOIN products AS p ON p.id = {FTS_TABLE}.rowid "
+        f"WHERE {FTS_TABLE} MATCH :match "
+        f"ORDER BY bm25({FTS_TABLE}, {NAME_WEIGHT}, {CATEGORY_WEIGHT}), p.id "
+        f"LIMIT :limit OFFSET :offset"
+    )
+    params = {"match": match_expression(tokens, corrections), "limit": limit, "offset": offset}
+    return (await session.execute(stmt, params)).all(), corrections
+
+
+async def _search_like(
+    session: AsyncSession, tokens: Sequence[str], limit: int, offset: int
+) -> Tuple[List[Any], Dict[str, List[str]]]:
+    # Without FTS5 (PostgreSQL): substring match on every token, no ranking or corrections.
+    conds = [or_(Product.name.icontains(t, autoescape=True), Product.category.icontains(t, autoescape=True)) for t in tokens]
+    stmt = select(*_COLUMNS).where(and_(*conds)).order_by(Product.id).limit(limit).offset(offset)
+    return (await session.execute(stmt)).all(), {}
+
+
+async def search_products(
+    session: AsyncSession, query: str, limit: int = DEFAULT_LIMIT, offset: int = 0
+) -> Dict[str, Any]:
+    """Products whose name or category contain every word of ``query``, best matches first.
+
+    Returns ``items``, ``next_offset`` (None on the last page) and
+    ``corrections`` (word -> indexed words it was also matched as).
+    """
+    tokens = query_tokens(query)
+    if not tokens:
+        return {"query": query, "items": [], "next_offset": None, "corrections": {}}
+    search = _search_fts if session.bind.dialect.name == "sqlite" else _search_like
+    # One extra row tells whether there is a next page.
+    rows, corrections = await search(session, tokens, limit + 1, offset)
+    return {
+        "query": query,
+        "items": [_row_to_dict(r) for r in rows[:limit]],
+        "next_offset": offset + limit if len(rows) > limit else None,
+        "corrections": corrections,
+    }
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+from app.log import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# MCP_STARTUP_PROFILE=1: each server process logs one "mcp_startup" record
+# with its phase timings once it has answered its first tool call.
+ENABLED = os.getenv("MCP_STARTUP_PROFILE", "").strip().lower() in ("1", "true", "yes")
+
+# Set when the first app module of a server is imported (or at fork, for
+# zygote workers); phases are measured from here.
+_t0 = time.perf_counter()
+_marks: Dict[str, float] = {}
+_spawn = "exec"
+
+
+def _process_age_ms() -> Optional[float]:
+    """Milliseconds since the process was created (Linux), i.e. interpreter startup before ``_t0``."""
+    try:
+        with open("/proc/self/stat", "rb") as f:
+            start_ticks = int(f.read().rsplit(b")", 1)[1].split()[19])
+        with open("/proc/uptime", "rb") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round((uptime - start_ticks / os.sysconf("SC_CLK_TCK")) * 1000, 1)
+
+
+_age_at_t0 = _process_age_ms() if ENABLED else None
+
+
+def forked() -> None:
+    """Restart the clock in a freshly forked zygote worker."""
+    global _t0, _spawn, _age_at_t0
+    _t0 = time.perf_counter()
+    _spawn = "fork"
+    _age_at_t0 = None
+    _marks.clear()
+
+
+def mark(phase: str) -> None:
+    _marks.setdefault(phase, round((time.perf_counter() - _t0) * 1000, 2))
+
+
+def report(server: str) -> Dict[str, Any]:
+    out: Dict[str, Any] = {"server": server, "spawn": _spawn, **{f"{k}_ms": v for k, v in _marks.items()}}
+    if _age_at_t0 is not None:
+        out["interpreter_ms"] = _age_at_t0
+    logger.info("mcp_startup %s", out, extra={"event": "mcp_startup", **out})
+    return out
+
+
+def run(mcp: Any, server: str) -> None:
+    """Serve ``mcp`` over stdio, recording startup phases when profiling is on."""
+    if ENABLED:
+        from fastmcp.server.middleware import Middleware
+
+        configure_logging()
+
+        class _FirstCall(Middleware):
+            async def on_call_tool(self, context, call_next):
+                result = await call_next(context)
+                if "first_call" not in _marks:
+                    mark("first_call")
+                    report(server)
+                return result
+
+        mcp.add_middleware(_FirstCall())
+    mark("ready")
+    # The banner is rendered with rich on every start; stdio clients never see it.
+    mcp.run(show_banner=False)
@@ -2,13 +2,21 @@ from __future__ import annotations
 
 import json
 import os
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import asyncio
 
+from app.mcp_server.price_snapshot import DEFAULT_BINS, PriceSnapshot
 
-@dataclass
+try:  # POSIX only; without it cross-process appends are not serialized.
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+
+@dataclass(slots=True)
 class Product:
     id: int
     name: str
@@ -37,55 +45,220 @@ class Product:
 
 
 class ProductStore:
-    """Simple JSON-backed storage with an async lock.
+    """File-backed storage for the no-DB mode: an append-only JSON Lines log
+    with in-memory indexes.
+
+    Each line is one product record; a later line with the same id replaces
+    the earlier one. Products are indexed by id and by lower-cased category,
+    and count/price sum are kept as running totals, so lookups are O(1) /
+    O(k) and ``add_product`` appends one line instead of rewriting the file.
+
+    The MCP server is a subprocess (stdio transport), so several processes
+    may share the file. Before every operation the store compares the file's
+    (inode, size, mtime) with what it last saw: unchanged means no I/O, a
+    file that only grew is read from the last offset, anything else (e.g.
+    another process compacted it) triggers a full reload.
 
-    The MCP server is a subprocess (stdio transport), so persistence is done by writing to a JSON file.
+    The log is compacted (rewritten with one line per live product, then
+    atomically replaced) once superseded lines outnumber live ones. A legacy
+    ``products.json`` holding a JSON array is converted on first load.
     """
 
-    def __init__(self, path: str) -> None:
+    def __init__(self, path: str, compact_min_garbage: int = 1000) -> None:
         self.path = Path(path)
+        self.compact_min_garbage = compact_min_garbage
         self._lock = asyncio.Lock()
+
+        self._by_id: Dict[int, Product] = {}
+        self._by_category: Dict[str, Dict[int, None]] = {}  # insertion-ordered id sets
+        self._price_sum = 0.0
+        self._max_id = 0
+        self._lines = 0  # records in the log, including superseded ones
+        self._offset = 0  # bytes of the log already applied
+        self._inode: Optional[int] = None
+        self._seen: Optional[Tuple[int, int, int]] = None  # (inode, size, mtime_ns)
+        self._prices: Optional[PriceSnapshot] = None  # built on demand, dropped on change
+        self._file_locked = False
+
         self.path.parent.mkdir(parents=True, exist_ok=True)
         if not self.path.exists():
-            self._write_raw([])
+            self.path.touch()
+        self._refresh()
+
+    # -- index maintenance -------------------------------------------------
+
+    def _apply(self, p: Product) -> None:
+        old = self._by_id.get(p.id)
+        if old is not None:
+            self._price_sum -= old.price
+            self._by_category[old.category.lower()].pop(p.id, None)
+        self._by_id[p.id] = p
+        self._by_category.setdefault(p.category.lower(), {})[p.id] = None
+        self._price_sum += p.price
+        if p.id > self._max_id:
+            self._max_id = p.id
+        self._lines += 1
+        self._prices = None
+
+    def _reset(self) -> None:
+        self._by_id.clear()
+        self._by_category.clear()
+        self._price_sum = 0.0
+        self._max_id = 0
+        self._lines = 0
+        self._offset = 0
+        self._prices = None
+
+    # -- file I/O ----------------------------------------------------------
+
+    @staticmethod
+    def _signature(st: os.stat_result) -> Tuple[int, int, int]:
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _refresh(self) -> None:
+        """Bring the indexes up to date with the file, reading as little as possible."""
+        st = self.path.stat()
+        sig = self._signature(st)
+        if sig == self._seen:
+            return
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            self._reset()
+            self._inode = st.st_ino
+        with self.path.open("rb") as f:
+            if self._offset == 0 and f.read(1) == b"[":
+                self._load_legacy_array()
+                return
+            f.seek(self._offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # a writer is mid-append; pick the line up next time
+                self._offset += len(raw)
+                line = raw.strip()
+                if line:
+                    self._apply(Product.from_dict(json.loads(line)))
+        self._seen = sig if self._offset == st.st_size else None
 
-    def _read_raw(self) -> List[Dict[str, Any]]:
-        with self.path.open("r", encoding="utf-8") as f:
-            return json.load(f)
+    def _load_legacy_array(self) -> None:
+        with self._file_lock():
+            with self.path.open("rb") as f:
+                legacy = f.read(1) == b"["
+            if not legacy:
+                # Another process converted it while we waited for the lock.
+                self._reset()
+                self._inode = self._seen = None
+                self._refresh()
+                return
+            with self.path.open("r", encoding="utf-8") as f:
+                for d in json.load(f):
+                    self._apply(Product.from_dict(d))
+            self._rewrite()
 
-    def _write_raw(self, data: List[Dict[str, Any]]) -> None:
+    def _rewrite(self) -> None:
         tmp = self.path.with_suffix(".tmp")
         with tmp.open("w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+            for p in self._by_id.values():
+                f.write(json.dumps(p.to_dict(), ensure_ascii=False) + "\n")
         tmp.replace(self.path)
+        st = self.path.stat()
+        self._inode = st.st_ino
+        self._lines = len(self._by_id)
+        self._offset = st.st_size
+        self._seen = self._signature(st)
+
+    def _append(self, p: Product) -> None:
+        line = (json.dumps(p.to_dict(), ensure_ascii=False) + "\n").encode("utf-8")
+        with self.path.open("ab") as f:
+            f.write(line)
+        self._offset += len(line)
+        self._apply(p)
+        self._seen = self._signature(self.path.stat())
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        # Re-entrant: add_product and compact refresh under the lock, and a
+        # refresh may have to convert a legacy file.
+        if self._file_locked:
+            yield
+            return
+        with _FileLock(self.path.with_suffix(self.path.suffix + ".lock")):
+            self._file_locked = True
+            try:
+                yield
+            finally:
+                self._file_locked = False
+
+    def compact(self) -> None:
+        """Rewrite the log with one line per live product."""
+        with self._file_lock():
+            self._refresh()
+            self._rewrite()
+
+    def _maybe_compact(self) -> None:
+        garbage = self._lines - len(self._by_id)
+        if garbage >= self.compact_min_garbage and garbage > len(self._by_id):
+            self._rewrite()
+
+    # -- public API --------------------------------------------------------
 
     async def list_products(self, category: Optional[str] = None) -> List[Product]:
         async with self._lock:
-            items = [Product.from_dict(x) for x in self._read_raw()]
-        if category:
-            return [p for p in items if p.category.lower() == category.lower()]
-        return items
+            self._refresh()
+            if category:
+                ids = self._by_category.get(category.lower(), {})
+                return [self._by_id[i] for i in ids]
+            return list(self._by_id.values())
 
     async def get_product(self, product_id: int) -> Product:
         async with self._lock:
-            items = [Product.from_dict(x) for x in self._read_raw()]
-        for p in items:
-            if p.id == product_id:
-                return p
-        raise ValueError(f"Product with id={product_id} not found")
+            self._refresh()
+            p = self._by_id.get(int(product_id))
+        if p is None:
+            raise ValueError(f"Product with id={product_id} not found")
+        return p
 
     async def add_product(self, name: str, price: float, category: str, in_stock: bool = True) -> Product:
         async with self._lock:
-            raw = self._read_raw()
-            products = [Product.from_dict(x) for x in raw]
-            next_id = (max((p.id for p in products), default=0) + 1)
-            new_p = Product(id=next_id, name=name, price=float(price), category=category, in_stock=bool(in_stock))
-            raw.append(new_p.to_dict())
-            self._write_raw(raw)
+            with self._file_lock():
+                # Catch up with other writers first so the new id is unique.
+                self._refresh()
+                new_p = Product(id=self._max_id + 1, name=name, price=float(price), category=category, in_stock=bool(in_stock))
+                self._append(new_p)
+                self._maybe_compact()
         return new_p
 
     async def get_statistics(self) -> Dict[str, Any]:
-        products = await self.list_products()
-        count = len(products)
-        avg_price = (sum(p.price for p in products) / count) if count else 0.0
+        async with self._lock:
+            self._refresh()
+            count = len(self._by_id)
+            avg_price = (self._price_sum / count) if count else 0.0
         return {"count": count, "avg_price": avg_price}
+
+    async def get_price_distribution(self, category: Optional[str] = None, bins: int = DEFAULT_BINS) -> Dict[str, Any]:
+        """Price percentiles, stddev and histogram; see ``PriceSnapshot.distribution``."""
+        async with self._lock:
+            self._refresh()
+            if self._prices is None:
+                self._prices = PriceSnapshot.build(
+                    None, [(p.category.lower(), p.price) for p in self._by_id.values()]
+                )
+            return self._prices.distribution(category.lower() if category else None, bins)
+
+
+class _FileLock:
+    """Exclusive advisory lock on a side file (no-op where fcntl is unavailable)."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._fh = None
+
+    def __enter__(self) -> "_FileLock":
+        if fcntl is not None:
+            self._fh = self.path.open("a")
+            fcntl.flock(self._fh, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if self._fh is not None:
+            fcntl.flock(self._fh, fcntl.LOCK_UN)
+            self._fh.close()
+            self._fh = None
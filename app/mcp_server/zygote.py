@@ -0,0 +1,150 @@
+"""Pre-forked spawner ("zygote") for MCP server workers.
+
+Starting ``python -m app.mcp_server.products_server`` spends most of its
+time importing FastMCP, SQLAlchemy and the DB driver. The zygote imports
+those once, then listens on a Unix socket; every connection is handed to
+a forked child that imports the requested server module (cheap, its
+dependencies are already loaded) and serves MCP over the connection as
+its stdin/stdout, exactly like a stdio subprocess. The child exits when
+the client closes the connection.
+
+Protocol: the client sends one JSON line ``{"module": ..., "env": {...}}``
+and then speaks MCP stdio framing on the same socket.
+
+Run: ``python -m app.mcp_server.zygote --socket /tmp/mcp-zygote.sock``.
+Nothing that owns threads, an event loop or DB connections may be created
+before the fork, so only modules are preloaded, no engines.
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Iterable
+
+logger = logging.getLogger(__name__)
+
+# Server modules a client may ask for.
+SERVERS = ("app.mcp_server.products_server", "app.mcp_server.orders_server")
+
+# Imported once in the zygote. App modules that build engines at import
+# (app.db and everything above it) are left to the workers, which may get
+# a different DATABASE_URL per connection.
+PRELOAD = (
+    "fastmcp",
+    "fastmcp.server.middleware",
+    "mcp.server.stdio",
+    "sqlalchemy.ext.asyncio",
+    "sqlalchemy.orm",
+    "sqlalchemy.dialects.sqlite",
+    "aiosqlite",
+    "asyncpg",
+    "app.log",
+)
+
+READY_LINE = "zygote ready"
+MAX_HEADER = 64 * 1024
+
+
+def preload(modules: Iterable[str]) -> float:
+    t0 = time.perf_counter()
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            logger.debug("zygote: optional module %s is not installed", name)
+    if threading.active_count() > 1:
+        # A thread started by an import would not exist in the forked children.
+        logger.warning("zygote: %d threads alive before fork", threading.active_count())
+    return time.perf_counter() - t0
+
+
+def _read_header(conn: socket.socket) -> dict:
+    # Byte by byte: anything after the newline is the worker's MCP input.
+    buf = bytearray()
+    while not buf.endswith(b"\n"):
+        b = conn.recv(1)
+        if not b or len(buf) > MAX_HEADER:
+            raise ValueError("zygote: bad or missing header")
+        buf += b
+    return json.loads(buf)
+
+
+def _worker(conn: socket.socket) -> None:
+    """Body of a forked child; never returns."""
+    code = 1
+    try:
+        from app.mcp_server import startup
+
+        startup.forked()
+        req = _read_header(conn)
+        module = req.get("module")
+        if module not in SERVERS:
+            raise ValueError(f"zygote: unknown server module {module!r}")
+        os.environ.update({str(k): str(v) for k, v in (req.get("env") or {}).items()})
+        os.dup2(conn.fileno(), 0)
+        os.dup2(conn.fileno(), 1)
+        conn.close()
+        importlib.import_module(module).main()
+        code = 0
+    except Exception:
+        logger.exception("zygote worker failed")
+    finally:
+        try:
+            sys.stdout.flush()
+        finally:
+            os._exit(code)
+
+
+def serve(path: str, modules: Iterable[str] = PRELOAD) -> None:
+    seconds = preload(modules)
+    # Children are not waited for; the kernel reaps them.
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    if os.path.exists(path):
+        os.unlink(path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)  # socket usable by this user only
+    try:
+        sock.bind(path)
+    finally:
+        os.umask(old_umask)
+    sock.listen(128)
+    logger.info("zygote: preloaded in %.0f ms, listening on %s", seconds * 1000, path)
+    print(READY_LINE, flush=True)
+
+    try:
+        while True:
+            conn, _ = sock.accept()
+            pid = os.fork()
+            if pid == 0:
+                sock.close()
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                _worker(conn)
+            conn.close()
+    finally:
+        sock.close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Pre-forked spawner for MCP server workers.")
+    ap.add_argument("--socket", required=True, help="Unix socket path to listen on")
+    args = ap.parse_args()
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), stream=sys.stderr)
+    # SIGTERM -> SystemExit, so the socket file is removed.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    serve(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,116 @@
 from __future__ import annotations
 
 from datetime import datetime
-from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Integer, Float, Boolean, DateTime, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column, validates
+from sqlalchemy import String, Integer, Float, Boolean, DateTime, ForeignKey, Index
 
 from .db import Base
 
 
+def category_key(category: str) -> str:
+    """Normalized category used for case-insensitive lookups.
+
+    Computed in Python because SQLite's lower() only folds ASCII letters.
+    """
+    return " ".join(str(category).replace("\u00A0", " ").split()).casefold()
+
+
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # Covers "WHERE category_key = ? AND id > ? ORDER BY id" (keyset pages).
+        Index("ix_products_category_key_id", "category_key", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     price: Mapped[float] = mapped_column(Float, nullable=False)
     category: Mapped[str] = mapped_column(String(255), nullable=False)
+    category_key: Mapped[str] = mapped_column(String(255), nullable=False)
     in_stock: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
 
+    @validates("category")
+    def _sync_category_key(self, _key: str, value: str) -> str:
+        self.category_key = category_key(value)
+        return value
+
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Covers time-range pages "ORDER BY created_at DESC, id DESC" with an id tie-break.
+        Index("ix_orders_created_at_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), nullable=False)
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), nullable=False, index=True)
     quantity: Mapped[int] = mapped_column(Integer, nullable=False)
     total_price: Mapped[float] = mapped_column(Float, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ProductStats(Base):
+    """Running price aggregates per category_key.
+
+    The row with ``category_key == GLOBAL_STATS_KEY`` covers the whole
+    catalog. Maintained by ``app.stats`` in the same transaction as the
+    product writes.
+    """
+
+    __tablename__ = "product_stats"
+
+    category_key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, nullable=False)
+    price_sum: Mapped[float] = mapped_column(Float, nullable=False)
+    min_price: Mapped[float] = mapped_column(Float, nullable=False)
+    max_price: Mapped[float] = mapped_column(Float, nullable=False)
+
+
+GLOBAL_STATS_KEY = ""
+
+
+class ProductsVersion(Base):
+    """Counter bumped by every write to products, in the same transaction.
+
+    A single row (``id == PRODUCTS_VERSION_ID``). The MCP server caches
+    compare it with the value they were filled at, so one primary-key read
+    tells whether any process has written products since. Maintained by
+    ``app.stats``.
+    """
+
+    __tablename__ = "products_version"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+PRODUCTS_VERSION_ID = 1
+
+
+class OrderRollup(Base):
+    """Orders, quantity and revenue per product per hour/day bucket.
+
+    ``category_key`` is the product's category at order time, so
+    per-category revenue is a GROUP BY over these rows. Maintained by
+    ``app.rollups`` in the same transaction as the order inserts.
+    """
+
+    __tablename__ = "order_rollups"
+    __table_args__ = (
+        # Covers "WHERE granularity = ? AND category_key = ? AND bucket_start BETWEEN ...".
+        Index("ix_order_rollups_category", "granularity", "category_key", "bucket_start"),
+    )
+
+    granularity: Mapped[str] = mapped_column(String(8), primary_key=True)  # "hour" | "day"
+    bucket_start: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    product_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    category_key: Mapped[str] = mapped_column(String(255), nullable=False)
+    orders: Mapped[int] = mapped_column(Integer, nullable=False)
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False)
+    revenue: Mapped[float] = mapped_column(Float, nullable=False)
+
+
+from . import stats as _stats  # noqa: E402,F401  (registers the flush listener)
+from . import fts as _fts  # noqa: E402
+
+_fts.install(Product.__table__)
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy.engine import Connection
+
+from .models import OrderRollup
+from .stats import upsert
+
+
+GRANULARITIES = ("hour", "day")
+
+_rollups = OrderRollup.__table__
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"granularity must be one of {GRANULARITIES}")
+
+
+def _aggregate(
+    orders: Iterable[Tuple[int, str, datetime, int, float]],
+) -> Dict[Tuple[str, datetime, int], List]:
+    """Fold (product_id, category_key, created_at, quantity, total) into per-bucket sums."""
+    out: Dict[Tuple[str, datetime, int], List] = {}
+    for product_id, key, created_at, quantity, total in orders:
+        for g in GRANULARITIES:
+            k = (g, bucket_start(created_at, g), product_id)
+            a = out.get(k)
+            if a is None:
+                out[k] = [key, 1, quantity, total]
+            else:
+                a[1] += 1
+                a[2] += quantity
+                a[3] += total
+    return out
+
+
+def apply_order_rollups(conn: Connection, orders: Iterable[Tuple[int, str, datetime, int, float]]) -> None:
+    """Add new orders to the hourly and daily rollups.
+
+    Must run on the connection (and transaction) that inserted the orders.
+    One upsert per touched (granularity, bucket, product), however many
+    orders share it.
+    """
+    for (g, start, product_id), (key, n, quantity, revenue) in _aggregate(orders).items():
+        stmt = upsert(conn.dialect.name, _rollups).values(
+            granularity=g, bucket_start=start, product_id=product_id,
+            category_key=key, orders=n, quantity=quantity, revenue=revenue,
+        )
+        ex = stmt.excluded
+        conn.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[_rollups.c.granularity, _rollups.c.bucket_start, _rollups.c.product_id],
+                set_={
+                    "orders": _rollups.c.orders + ex.orders,
+                    "quantity": _rollups.c.quantity + ex.quantity,
+                    "revenue": _rollups.c.revenue + ex.revenue,
+                },
+            )
+        )
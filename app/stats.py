@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, event, func, or_, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, attributes
+
+from .models import GLOBAL_STATS_KEY, PRODUCTS_VERSION_ID, Product, ProductStats, ProductsVersion
+
+
+_stats = ProductStats.__table__
+_products = Product.__table__
+_version = ProductsVersion.__table__
+
+
+def _aggregate(rows: Iterable[Tuple[str, float]]) -> Dict[str, List[float]]:
+    """Fold (category_key, price) rows into {key: [count, sum, min, max]}, global row included."""
+    out: Dict[str, List[float]] = {}
+    for key, price in rows:
+        for k in (key, GLOBAL_STATS_KEY):
+            a = out.get(k)
+            if a is None:
+                out[k] = [1, price, price, price]
+            else:
+                a[0] += 1
+                a[1] += price
+                if price < a[2]:
+                    a[2] = price
+                if price > a[3]:
+                    a[3] = price
+    return out
+
+
+def upsert(dialect_name: str, table):
+    """INSERT for ``table`` supporting ``on_conflict_do_update`` on SQLite and PostgreSQL."""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+def bump_products_version(conn: Connection) -> None:
+    """Increment products_version; must run in the transaction that wrote the products."""
+    stmt = upsert(conn.dialect.name, _version).values(id=PRODUCTS_VERSION_ID, version=1)
+    conn.execute(
+        stmt.on_conflict_do_update(index_elements=[_version.c.id], set_={"version": _version.c.version + 1})
+    )
+
+
+async def products_version(session: AsyncSession) -> Optional[int]:
+    """Current products_version (None before the first tracked write)."""
+    stmt = select(_version.c.version).where(_version.c.id == PRODUCTS_VERSION_ID)
+    return (await session.execute(stmt)).scalar()
+
+
+def _price_agg(fn, key: str):
+    q = select(fn(_products.c.price))
+    if key != GLOBAL_STATS_KEY:
+        q = q.where(_products.c.category_key == key)
+    return q.scalar_subquery()
+
+
+def apply_stats_delta(
+    conn: Connection,
+    added: Iterable[Tuple[str, float]] = (),
+    removed: Iterable[Tuple[str, float]] = (),
+) -> None:
+    """Fold inserted/removed (category_key, price) rows into product_stats
+    and bump products_version.
+
+    Must run on the connection (and transaction) that wrote the products.
+    Inserts are O(1) upserts per touched key. Removals subtract count/sum
+    and only rescan prices when the removed range reaches the stored
+    min or max.
+    """
+    for key, (n, total, lo, hi) in _aggregate(added).items():
+        stmt = upsert(conn.dialect.name, _stats).values(
+            category_key=key, count=n, price_sum=total, min_price=lo, max_price=hi
+        )
+        ex = stmt.excluded
+        conn.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[_stats.c.category_key],
+                set_={
+                    "count": _stats.c.count + ex.count,
+                    "price_sum": _stats.c.price_sum + ex.price_sum,
+                    "min_price": case((ex.min_price < _stats.c.min_price, ex.min_price), else_=_stats.c.min_price),
+                    "max_price": case((ex.max_price > _stats.c.max_price, ex.max_price), else_=_stats.c.max_price),
+                },
+            )
+        )
+
+    removed_agg = _aggregate(removed)
+    for key, (n, total, _lo, _hi) in removed_agg.items():
+        conn.execute(
+            update(_stats)
+            .where(_stats.c.category_key == key)
+            .values(count=_stats.c.count - n, price_sum=_stats.c.price_sum - total)
+        )
+    if removed_agg:
+        conn.execute(delete(_stats).where(_stats.c.count <= 0))
+    for key, (_n, _total, lo, hi) in removed_agg.items():
+        # The subqueries only run when the removed prices reached an extreme.
+        conn.execute(
+            update(_stats)
+            .where(_stats.c.category_key == key, or_(_stats.c.min_price >= lo, _stats.c.max_price <= hi))
+            .values(min_price=_price_agg(func.min, key), max_price=_price_agg(func.max, key))
+        )
+    bump_products_version(conn)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_product_stats(session: Session, _flush_context) -> None:
+    # new/dirty/deleted still hold the pre-flush state inside after_flush.
+    added: List[Tuple[str, float]] = []
+    removed: List[Tuple[str, float]] = []
+    # Writes that leave prices and categories alone (a rename) still bump the version.
+    touched = False
+
+    for obj in session.new:
+        if isinstance(obj, Product):
+            added.append((obj.category_key, float(obj.price)))
+
+    for obj in session.deleted:
+        if isinstance(obj, Product):
+            removed.append((obj.category_key, float(obj.price)))
+
+    for obj in session.dirty:
+        if not isinstance(obj, Product) or not session.is_modified(obj):
+            continue
+        touched = True
+        price = attributes.get_history(obj, "price")
+        key = attributes.get_history(obj, "category_key")
+        if not (price.has_changes() or key.has_changes()):
+            continue
+        old_price = price.deleted[0] if price.deleted else obj.price
+        old_key = key.deleted[0] if key.deleted else obj.category_key
+        removed.append((old_key, float(old_price)))
+        added.append((obj.category_key, float(obj.price)))
+
+    if added or removed:
+        apply_stats_delta(session.connection(), added, removed)
+    elif touched:
+        bump_products_version(session.connection())
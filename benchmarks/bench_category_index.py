@@ -0,0 +1,109 @@
+"""Category lookup with and without ix_products_category_key_id.
+
+Usage:
+    python benchmarks/bench_category_index.py --products 500000
+
+Seeds a temporary SQLite database through the ORM table definitions,
+prints EXPLAIN QUERY PLAN for the list_products category query and the
+orders lookups, then times the category query with the index in place
+and after dropping it.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import create_engine, insert, select, text  # noqa: E402
+
+from app.db import Base  # noqa: E402
+from app.models import Order, Product, category_key  # noqa: E402
+
+CATEGORIES = ["Электроника", "Продукты", "Книги", "Одежда", "Дом", "Спорт", "Игрушки", "Авто"]
+
+
+def _seed(conn, n: int, batch: int = 10000) -> None:
+    rnd = random.Random(7)
+    # Skewed: the first categories get most of the rows.
+    weights = [1 / (i + 1) ** 2 for i in range(len(CATEGORIES))]
+    start = datetime(2026, 1, 1)
+    for lo in range(0, n, batch):
+        cats = rnd.choices(CATEGORIES, weights=weights, k=min(batch, n - lo))
+        conn.execute(insert(Product), [
+            {"name": f"Товар {lo + i}", "price": float(rnd.randint(100, 100000)), "category": c,
+             "category_key": category_key(c), "in_stock": True}
+            for i, c in enumerate(cats)
+        ])
+        conn.execute(insert(Order), [
+            {"product_id": lo + i + 1, "quantity": 1, "total_price": 1.0,
+             "created_at": start + timedelta(minutes=lo + i)}
+            for i in range(0, len(cats), 10)
+        ])
+
+
+def _plan(conn, stmt) -> str:
+    sql = str(stmt.compile(conn.engine, compile_kwargs={"literal_binds": True}))
+    return " | ".join(r[-1] for r in conn.execute(text("EXPLAIN QUERY PLAN " + sql)))
+
+
+def _time(conn, stmt, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        conn.execute(stmt).all()
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--products", type=int, default=200000)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_index_")
+    engine = create_engine(f"sqlite:///{tmp}/app.db")
+    Base.metadata.create_all(engine)
+
+    with engine.begin() as conn:
+        _seed(conn, args.products)
+        conn.execute(text("ANALYZE"))
+
+    # A rare category so the page is small and the scan cost dominates.
+    page = (
+        select(Product)
+        .where(Product.category_key == category_key("Авто"), Product.id > 0)
+        .order_by(Product.id)
+        .limit(500)
+    )
+    by_product = select(Order).where(Order.product_id == args.products // 2)
+    by_time = select(Order).where(Order.created_at >= datetime(2026, 1, 2), Order.created_at < datetime(2026, 1, 3))
+
+    results = {}
+    with engine.connect() as conn:
+        results["plans"] = {
+            "list_products_page": _plan(conn, page),
+            "orders_by_product": _plan(conn, by_product),
+            "orders_by_time": _plan(conn, by_time),
+        }
+        results["indexed_ms"] = round(_time(conn, page, args.repeat), 3)
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_products_category_key_id"))
+    # Drop cached prepared statements that still reference the index.
+    engine.dispose()
+    with engine.connect() as conn:
+        results["plans"]["list_products_page_no_index"] = _plan(conn, page)
+        results["full_scan_ms"] = round(_time(conn, page, args.repeat), 3)
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""MCP server cold start: time from opening a session to the first tool result.
+
+Usage:
+    python benchmarks/bench_cold_start.py --runs 10 --modes stdio,zygote,inprocess
+
+Seeds a small temporary SQLite database, then repeatedly opens a fresh
+products MCP session in each transport mode and calls ``get_statistics``
+once. ``stdio`` pays interpreter start plus all imports on every run;
+``zygote`` forks from a spawner that has already imported them (its own
+one-time preload is reported separately as ``zygote_preload_ms``);
+``inprocess`` is the floor with no process at all. Servers are run with
+MCP_STARTUP_PROFILE=1, so their ``mcp_startup`` records show the split.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+CATEGORIES = ["Электроника", "Продукты", "Книги", "Одежда", "Дом"]
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+async def _seed(n: int) -> None:
+    from app.db import Base, SessionLocal, engine
+    from app.models import Product
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as s:
+        s.add_all([
+            Product(name=f"Товар {i}", price=float(100 + i % 5000), category=CATEGORIES[i % len(CATEGORIES)], in_stock=True)
+            for i in range(1, n + 1)
+        ])
+        await s.commit()
+
+
+async def _first_call(mode: str, db_url: str) -> float:
+    from app.agent.mcp_client import MCPProductsClient
+
+    t0 = time.perf_counter()
+    async with MCPProductsClient(db_url, transport=mode) as mcp:
+        await mcp.get_statistics()
+        return time.perf_counter() - t0
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--products", type=int, default=1000)
+    ap.add_argument("--runs", type=int, default=10)
+    ap.add_argument("--modes", default="stdio,zygote,inprocess")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_cold_start_")
+    db_url = f"sqlite+aiosqlite:///{tmp}/app.db"
+    os.environ["DATABASE_URL"] = db_url
+    os.environ["MCP_STARTUP_PROFILE"] = "1"
+    os.environ["MCP_ZYGOTE_SOCKET"] = f"{tmp}/zygote.sock"
+    await _seed(args.products)
+
+    from app.agent.zygote import ensure_zygote, stop_zygote
+
+    results: Dict[str, Dict[str, float]] = {}
+    try:
+        for mode in args.modes.split(","):
+            row: Dict[str, float] = {}
+            if mode == "zygote":
+                t0 = time.perf_counter()
+                await ensure_zygote()
+                row["zygote_preload_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            samples = [await _first_call(mode, db_url) for _ in range(args.runs)]
+            row.update({
+                "first_call_p50_ms": round(statistics.median(samples) * 1000, 1),
+                "first_call_p95_ms": round(_percentile(samples, 0.95) * 1000, 1),
+                "first_call_max_ms": round(max(samples) * 1000, 1),
+            })
+            results[mode] = row
+            print(f"{mode:>10}: {row}", file=sys.stderr)
+    finally:
+        await stop_zygote()
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,148 @@
+"""Client-side CPU per large list_products response: legacy vs schema-driven decoding.
+
+Usage:
+    python benchmarks/bench_decode.py --products 10000 --rounds 20
+
+Seeds a temporary database, fetches one list_products result of
+``--products`` rows from the in-process server (once as dicts, once as a
+compact page) and serializes each as the JSON-RPC frame a stdio server
+writes. Every path starts from that frame and measures CPU time per
+response, including the frame parse the MCP client session does
+(``JSONRPCMessage`` then ``CallToolResult``):
+  legacy  - frame parse, FastMCP's typed parsing (call_tool),
+            _extract_payload, recursive _to_plain and tools_custom._plain
+            (copied below), on the dict payload;
+  decoded - frame parse and decode_tool_result, on the dict payload;
+  compact - frame parse, decode_tool_result and decode_product_rows, on the
+            compact page the agent's client asks for.
+``frame_parse`` is the frame parse alone, the part no decoder can skip.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _legacy_to_plain(x: Any) -> Any:
+    if x is None:
+        return None
+    if hasattr(x, "model_dump"):
+        return _legacy_to_plain(x.model_dump())
+    if hasattr(x, "dict"):
+        return _legacy_to_plain(x.dict())
+    if hasattr(x, "root"):
+        return _legacy_to_plain(getattr(x, "root"))
+    if hasattr(x, "__root__"):
+        return _legacy_to_plain(getattr(x, "__root__"))
+    if hasattr(x, "data"):
+        return _legacy_to_plain(getattr(x, "data"))
+    if isinstance(x, list):
+        return [_legacy_to_plain(i) for i in x]
+    if isinstance(x, dict):
+        return {k: _legacy_to_plain(v) for k, v in x.items()}
+    return x
+
+
+def _legacy_extract_payload(res: Any) -> Any:
+    # Only the branch our servers hit: first content block is JSON text.
+    c0 = res.content[0]
+    text = getattr(c0, "text", None)
+    if isinstance(text, str) and text.strip():
+        try:
+            return json.loads(text)
+        except Exception:
+            return text
+    return None
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--products", type=int, default=10000)
+    ap.add_argument("--rounds", type=int, default=20)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_decode_")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmp}/app.db"
+
+    from fastmcp import Client
+    from sqlalchemy import insert
+
+    from mcp import types as mcp_types
+
+    from app.agent.mcp_client import decode_product_rows, decode_tool_result
+    from app.agent.tools_custom import _plain
+    from app.db import Base, SessionLocal, engine
+    from app.mcp_server import products_server
+    from app.models import Product
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as s:
+        await s.execute(insert(Product.__table__), [
+            {"name": f"Товар {i}", "price": float(i), "category": "Электроника",
+             "category_key": "электроника", "in_stock": bool(i % 2)}
+            for i in range(args.products)
+        ])
+        await s.commit()
+
+    def frame(result: mcp_types.CallToolResult) -> bytes:
+        response = mcp_types.JSONRPCResponse(jsonrpc="2.0", id=1, result=result.model_dump(by_alias=True, exclude_none=True))
+        return mcp_types.JSONRPCMessage(response).model_dump_json(by_alias=True, exclude_none=True).encode()
+
+    def parse_frame(data: bytes) -> mcp_types.CallToolResult:
+        # What ClientSession does with a response line: validate the message, then the result type.
+        message = mcp_types.JSONRPCMessage.model_validate_json(data)
+        return mcp_types.CallToolResult.model_validate(message.root.result)
+
+    def cpu_ms(fn) -> float:
+        t0 = time.process_time()
+        for _ in range(args.rounds):
+            fn()
+        return (time.process_time() - t0) / args.rounds * 1000
+
+    async with Client(products_server.mcp) as client:
+        tools = {t.name: t for t in await client.list_tools()}
+        wrapped = bool(tools["list_products"].outputSchema.get("x-fastmcp-wrap-result"))
+        dict_frame = frame(await client.call_tool_mcp("list_products", {"category": "Электроника"}))
+        compact_frame = frame(await client.call_tool_mcp("list_products", {"category": "Электроника", "compact": True}))
+
+        legacy_ms = 0.0
+        for _ in range(args.rounds):
+            t0 = time.process_time()
+            parsed = await client._parse_call_tool_result("list_products", parse_frame(dict_frame))
+            legacy = _plain(_legacy_to_plain(_legacy_extract_payload(parsed)))
+            legacy_ms += (time.process_time() - t0) * 1000
+        legacy_ms /= args.rounds
+
+    decoded = decode_tool_result(parse_frame(dict_frame), wrapped)
+    rows = decode_product_rows(decode_tool_result(parse_frame(compact_frame), wrapped))
+    assert legacy == decoded, "decoders disagree"
+    assert [r._asdict() for r in rows] == decoded, "compact rows disagree"
+
+    results = {
+        "products": len(decoded),
+        "frame_kib": {"dicts": round(len(dict_frame) / 1024, 1), "compact": round(len(compact_frame) / 1024, 1)},
+        "cpu_ms": {
+            "frame_parse": round(cpu_ms(lambda: parse_frame(dict_frame)), 2),
+            "legacy": round(legacy_ms, 2),
+            "decoded": round(cpu_ms(lambda: decode_tool_result(parse_frame(dict_frame), wrapped)), 2),
+            "compact": round(cpu_ms(lambda: decode_product_rows(decode_tool_result(parse_frame(compact_frame), wrapped))), 2),
+        },
+    }
+    cpu = results["cpu_ms"]
+    results["speedup_vs_legacy"] = {k: round(cpu["legacy"] / cpu[k], 1) for k in ("decoded", "compact") if cpu[k]}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+"""Multi-intent queries: one fanned-out request vs its parts asked one after another.
+
+Usage:
+    python benchmarks/bench_fanout.py --products 100000 --repeat 20 --transport stdio
+
+Seeds a temporary SQLite database with a synthetic catalog
+(``benchmarks/catalog.py``), starts warm MCP session pools and, with the
+agent's answer cache off, times for each compound query:
+
+- ``sequential``: ``run_agent`` on each part in turn (what a client had
+  to do before: one request per intent);
+- ``fanout``: ``run_agent`` on the compound query (one plan, one MCP
+  session, parts run concurrently);
+- ``slowest_part``: the slowest part on its own, the lower bound.
+
+Reports p50 per query in milliseconds.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from catalog import category_names, seed_database  # noqa: E402
+
+
+def _queries(categories: List[str]) -> Dict[str, List[str]]:
+    """Compound query -> its parts as standalone queries."""
+    big, mid, small = categories[0], categories[3], categories[9]
+    return {
+        f"Покажи все продукты в категории {small} и среднюю цену": [
+            f"Покажи все продукты в категории {small}",
+            "Какая средняя цена продуктов?",
+        ],
+        f"Какая средняя цена в категории {big}; статистика по категории {mid}; найди чайник": [
+            f"Какая средняя цена в категории {big}?",
+            f"Статистика по категории {mid}",
+            "Найди чайник",
+        ],
+        f"Покажи все продукты в категории {small} и в категории {mid}": [
+            f"Покажи все продукты в категории {small}",
+            f"Покажи все продукты в категории {mid}",
+        ],
+    }
+
+
+async def _p50(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - t0)
+    return round(statistics.median(samples) * 1000, 1)
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--products", type=int, default=100_000)
+    ap.add_argument("--categories", type=int, default=20)
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--transport", default="stdio")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_fanout_")
+    db_url = f"sqlite+aiosqlite:///{tmp}/app.db"
+    os.environ["DATABASE_URL"] = db_url
+    os.environ["MCP_TRANSPORT"] = args.transport
+    os.environ["AGENT_CACHE_SIZE"] = "0"  # measure the calls, not the answer cache
+    await seed_database(db_url, args.products, args.categories, batch_size=10_000)
+
+    from app.agent.graph import run_agent
+    from app.agent.mcp_pool import create_orders_pool, create_products_pool, set_orders_pool, set_products_pool
+    from app.mcp_server.products_server import _list_cache
+
+    _list_cache.clear()
+    pool, orders_pool = create_products_pool(db_url), create_orders_pool(db_url)
+    await asyncio.gather(pool.start(), orders_pool.start())
+    set_products_pool(pool)
+    set_orders_pool(orders_pool)
+
+    results: Dict[str, Any] = {"products": args.products, "transport": args.transport, "queries": {}}
+    try:
+        for compound, parts in _queries(category_names(args.categories)).items():
+            out = await run_agent(compound)
+            assert out["plan"]["intent"] == "multi", out["plan"]
+
+            async def sequential():
+                for q in parts:
+                    await run_agent(q)
+
+            row = {
+                "parts": len(parts),
+                "sequential_ms": await _p50(sequential, args.repeat),
+                "fanout_ms": await _p50(lambda: run_agent(compound), args.repeat),
+            }
+            part_ms = [await _p50(lambda q=q: run_agent(q), args.repeat) for q in parts]
+            row["slowest_part_ms"] = max(part_ms)
+            row["sum_of_parts_ms"] = round(sum(part_ms), 1)
+            results["queries"][compound] = row
+            print(f"{row}", file=sys.stderr)
+    finally:
+        set_products_pool(None)
+        set_orders_pool(None)
+        await asyncio.gather(pool.close(), orders_pool.close())
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
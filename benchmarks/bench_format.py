@@ -0,0 +1,130 @@
+"""Formatted rows/sec: legacy format_products (print per row) vs the one-pass formatter.
+
+Usage:
+    python benchmarks/bench_format.py --rows 10000 --rounds 20
+
+The legacy formatter is copied below with its DEBUG prints, which go to
+/dev/null here, so its numbers are a lower bound of the cost in a
+container whose stdout is collected. The current formatter is measured as the
+agent graph calls it (the tool's function), through LangChain's
+``tool.invoke`` (schema validation + callbacks), and at DEBUG through the
+JSON formatter with sampling at 1% and 100%.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.agent import tools_custom  # noqa: E402
+from app.agent.tools_custom import _plain, format_products  # noqa: E402
+from app.log import JsonFormatter  # noqa: E402
+
+
+def legacy_format_products(products: Any) -> str:
+    print(f"DEBUG format_products: Received type: {type(products)}")
+
+    if not (isinstance(products, list) and (not products or isinstance(products[0], dict))):
+        products = _plain(products)
+    print(f"DEBUG format_products: After _plain type: {type(products)}")
+    print(f"DEBUG format_products: After _plain value: {products}")
+
+    if isinstance(products, dict):
+        for key in ["products", "items", "results", "data", "content"]:
+            if key in products and isinstance(products[key], list):
+                products = products[key]
+                break
+
+    if not products or (isinstance(products, list) and len(products) == 0):
+        return "Ничего не найдено."
+
+    if not isinstance(products, list):
+        if isinstance(products, dict):
+            products = [products]
+        else:
+            return f"Ошибка: ожидался список, получен {type(products)}"
+
+    lines = []
+    for i, p in enumerate(products):
+        print(f"DEBUG format_products: Processing item {i}: {p}")
+
+        if not isinstance(p, dict):
+            print(f"DEBUG format_products: Item {i} is not dict: {type(p)}")
+            continue
+
+        p_id = p.get("id", "N/A")
+        name = p.get("name", "Без названия")
+        price = p.get("price", 0)
+        category = p.get("category", "Без категории")
+        in_stock = p.get("in_stock", False)
+
+        stock = "в наличии" if in_stock else "нет в наличии"
+        lines.append(
+            f'#{p_id} — {name} — {price} — {category} — {stock}'
+        )
+
+    return "\n".join(lines) if lines else "Ничего не найдено."
+
+
+def _rows_per_sec(fn: Callable[[List[Dict[str, Any]]], str], rows: List[Dict[str, Any]], rounds: int) -> float:
+    fn(rows)
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        fn(rows)
+    return len(rows) * rounds / (time.perf_counter() - t0)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=10000)
+    ap.add_argument("--rounds", type=int, default=20)
+    args = ap.parse_args()
+
+    rows = [
+        {"id": i, "name": f"Товар {i}", "price": float(100 + i), "category": "Электроника", "in_stock": bool(i % 2)}
+        for i in range(1, args.rows + 1)
+    ]
+
+    def current(r):
+        return format_products.func(r)
+
+    def current_invoke(r):
+        return format_products.invoke({"products": r})
+
+    results: Dict[str, float] = {}
+    with open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            if legacy_format_products(rows) != current(rows):
+                raise SystemExit("formatters disagree")
+            results["legacy_print"] = _rows_per_sec(legacy_format_products, rows, max(1, args.rounds // 10))
+
+        logger = logging.getLogger("app.agent.tools_custom")
+        handler = logging.StreamHandler(devnull)
+        handler.setFormatter(JsonFormatter())
+        logger.addHandler(handler)
+        logger.propagate = False
+
+        logger.setLevel(logging.INFO)
+        results["one_pass_info"] = _rows_per_sec(current, rows, args.rounds)
+        results["one_pass_info_tool_invoke"] = _rows_per_sec(current_invoke, rows, args.rounds)
+        logger.setLevel(logging.DEBUG)
+        for rate in (0.01, 1.0):
+            tools_custom.LOG_SAMPLE_RATE = rate
+            results[f"one_pass_debug_sample_{rate:g}"] = _rows_per_sec(current, rows, args.rounds)
+
+    out = {k: round(v) for k, v in results.items()}
+    out["speedup_vs_legacy"] = round(results["one_pass_info"] / results["legacy_print"], 1)
+    print(json.dumps(out, indent=2))
+
+
+if __name__ == "__main__":
+    main()
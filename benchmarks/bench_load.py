@@ -0,0 +1,288 @@
+"""Concurrent HTTP load against the agent API over a synthetic catalog.
+
+Usage:
+    python benchmarks/bench_load.py --products 100000 --concurrency 16 --requests 2000 --output run.json
+    python benchmarks/bench_load.py --products 100000 --compare run.json
+
+Seeds a temporary SQLite database with ``benchmarks/catalog.py`` (or uses
+``--database-url`` as is with ``--no-seed``), starts the FastAPI app with
+its lifespan (warm MCP pools) and drives ``POST /api/v1/agent/query``
+through httpx's ASGI transport from ``--concurrency`` closed-loop workers.
+
+Queries follow ``--mix`` over the four agent intents; categories are drawn
+with the catalog's own Zipf skew, so popular categories are also queried
+most. Reports throughput, client-side p50/p95/p99 per intent, and per-stage
+and per-tool percentiles estimated from the Prometheus histograms
+(interpolated within buckets, like ``histogram_quantile``). The result is
+JSON; ``--compare`` prints the relative change against an earlier run.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from catalog import CategorySampler, category_names, seed_database  # noqa: E402
+
+DEFAULT_MIX = "list=35,stats=30,discount=30,add=5"
+INTENTS = {"list": "list_by_category", "stats": "stats", "discount": "discount", "add": "add_product"}
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _summary_ms(values: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50": round(_percentile(values, 0.50) * 1000, 3),
+        "p95": round(_percentile(values, 0.95) * 1000, 3),
+        "p99": round(_percentile(values, 0.99) * 1000, 3),
+    }
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix: Dict[str, float] = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in INTENTS:
+            raise SystemExit(f"--mix: unknown intent {name!r}, expected one of {sorted(INTENTS)}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+class QueryMix:
+    """Random agent queries: (intent, text) following the mix weights."""
+
+    def __init__(self, mix: Dict[str, float], categories: List[str], skew: float, products: int, seed: int) -> None:
+        self._rng = random.Random(seed)
+        self._names = list(mix)
+        self._weights = [mix[n] for n in self._names]
+        self._category = CategorySampler(categories, skew, self._rng)
+        self._products = products
+        self._added = 0
+
+    def __call__(self) -> Tuple[str, str]:
+        rng = self._rng
+        name = rng.choices(self._names, self._weights)[0]
+        if name == "list":
+            text = f"Покажи все продукты в категории {self._category()}"
+        elif name == "stats":
+            text = (
+                "Какая средняя цена продуктов?"
+                if rng.random() < 0.5
+                else f"Какая средняя цена в категории {self._category()}?"
+            )
+        elif name == "discount":
+            text = f"Посчитай скидку {rng.choice((5, 10, 15, 20, 30))}% на товар с ID {rng.randint(1, self._products)}"
+        else:
+            self._added += 1
+            text = f"Добавь новый продукт: Нагрузка{self._added}, цена {rng.randint(100, 90000)}, категория {self._category()}"
+        return INTENTS[name], text
+
+
+def _histogram_snapshot(metric) -> Dict[Tuple[Tuple[str, str], ...], Dict[str, Any]]:
+    """{labels: {"buckets": [(le, cumulative)], "count": n}} for a prometheus Histogram."""
+    out: Dict[Tuple[Tuple[str, str], ...], Dict[str, Any]] = {}
+    for family in metric.collect():
+        for s in family.samples:
+            labels = tuple(sorted((k, v) for k, v in s.labels.items() if k != "le"))
+            entry = out.setdefault(labels, {"buckets": [], "count": 0.0})
+            if s.name.endswith("_bucket"):
+                entry["buckets"].append((float(s.labels["le"]), s.value))
+            elif s.name.endswith("_count"):
+                entry["count"] = s.value
+    return out
+
+
+def _histogram_quantile(buckets: List[Tuple[float, float]], q: float) -> float:
+    """Linear interpolation inside the bucket holding the q-th observation."""
+    total = buckets[-1][1] if buckets else 0.0
+    if total <= 0:
+        return 0.0
+    rank = q * total
+    prev_le, prev_count = 0.0, 0.0
+    for le, count in buckets:
+        if count >= rank:
+            if le == float("inf"):
+                return prev_le  # beyond the last finite bound
+            width = count - prev_count
+            return prev_le + (le - prev_le) * ((rank - prev_count) / width if width else 0.0)
+        prev_le, prev_count = le, count
+    return prev_le
+
+
+def _histogram_delta(before, after) -> Dict[str, Dict[str, Any]]:
+    out: Dict[str, Dict[str, Any]] = {}
+    for labels, entry in after.items():
+        base = before.get(labels, {"buckets": [], "count": 0.0})
+        base_counts = dict(base["buckets"])
+        buckets = [(le, c - base_counts.get(le, 0.0)) for le, c in entry["buckets"]]
+        count = entry["count"] - base["count"]
+        if count <= 0:
+            continue
+        name = "/".join(v for _, v in labels)
+        out[name] = {
+            "count": int(count),
+            **{f"p{int(q * 100)}": round(_histogram_quantile(buckets, q) * 1000, 3) for q in (0.5, 0.95, 0.99)},
+        }
+    return dict(sorted(out.items()))
+
+
+async def run_load(
+    mix: QueryMix, requests: int, concurrency: int, warmup: int
+) -> Dict[str, Any]:
+    from httpx import ASGITransport, AsyncClient
+
+    from app.agent import metrics
+    from app.api import app
+
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench", timeout=None) as ac:
+
+            async def one(record: bool) -> None:
+                intent, text = mix()
+                t0 = time.perf_counter()
+                try:
+                    r = await ac.post("/api/v1/agent/query", json={"query": text})
+                    ok = r.status_code == 200 and r.json()["plan"].get("intent") == intent
+                except Exception:
+                    ok = False
+                dt = time.perf_counter() - t0
+                if not record:
+                    return
+                if ok:
+                    latencies.setdefault(intent, []).append(dt)
+                else:
+                    errors[intent] = errors.get(intent, 0) + 1
+
+            for _ in range(warmup):
+                await one(record=False)
+
+            stages_before = _histogram_snapshot(metrics.STAGE_SECONDS)
+            tools_before = _histogram_snapshot(metrics.TOOL_CALL_SECONDS)
+            remaining = requests
+
+            async def worker() -> None:
+                nonlocal remaining
+                while remaining > 0:
+                    remaining -= 1
+                    await one(record=True)
+
+            t0 = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            wall = time.perf_counter() - t0
+
+    all_latencies = [v for vs in latencies.values() for v in vs]
+    return {
+        "seconds": round(wall, 3),
+        "throughput_rps": round(len(all_latencies) / wall, 1) if wall > 0 else None,
+        "errors": errors,
+        "latency_ms": {"all": _summary_ms(all_latencies), **{k: _summary_ms(v) for k, v in sorted(latencies.items())}},
+        "stages_ms": _histogram_delta(stages_before, _histogram_snapshot(metrics.STAGE_SECONDS)),
+        "tools_ms": _histogram_delta(tools_before, _histogram_snapshot(metrics.TOOL_CALL_SECONDS)),
+    }
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Relative change (%) of throughput and latency percentiles vs ``baseline``."""
+
+    def pct(old: Optional[float], new: Optional[float]) -> Optional[float]:
+        return round((new / old - 1) * 100, 1) if old and new is not None else None
+
+    out: Dict[str, Any] = {"throughput_rps": pct(baseline.get("throughput_rps"), current.get("throughput_rps"))}
+    for section in ("latency_ms", "stages_ms", "tools_ms"):
+        old_s, new_s = baseline.get(section, {}), current.get(section, {})
+        out[section] = {
+            name: {q: pct(old_s[name].get(q), new_s[name].get(q)) for q in ("p50", "p95", "p99")}
+            for name in new_s
+            if name in old_s
+        }
+    return out
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--products", type=int, default=1000)
+    ap.add_argument("--categories", type=int, default=20)
+    ap.add_argument("--skew", type=float, default=1.1)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--requests", type=int, default=1000)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--warmup", type=int, default=50)
+    ap.add_argument("--mix", default=DEFAULT_MIX, help="weights per intent: list, stats, discount, add")
+    ap.add_argument("--transport", choices=("inprocess", "stdio"), default="inprocess")
+    ap.add_argument("--database-url", help="benchmark an existing database instead of a temporary SQLite file")
+    ap.add_argument("--no-seed", action="store_true", help="don't generate a catalog (use with --database-url)")
+    ap.add_argument("--label", default="", help="free-form tag stored with the result")
+    ap.add_argument("--output", type=Path, help="write the result JSON here")
+    ap.add_argument("--compare", type=Path, help="earlier result JSON to compare against")
+    args = ap.parse_args()
+
+    db_url = args.database_url or f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='bench_load_')}/app.db"
+    os.environ["DATABASE_URL"] = db_url
+    os.environ["MCP_TRANSPORT"] = args.transport
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    seed_report = None
+    if not args.no_seed:
+        seed_report = await seed_database(None, args.products, args.categories, args.skew, args.seed)
+
+    mix = QueryMix(parse_mix(args.mix), category_names(args.categories), args.skew, args.products, args.seed)
+    result: Dict[str, Any] = {
+        "label": args.label,
+        "config": {
+            k: getattr(args, k)
+            for k in ("products", "categories", "skew", "seed", "requests", "concurrency", "warmup", "mix", "transport")
+        },
+        "env": {
+            "git": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "database": db_url.split("://", 1)[0],
+            "agent_cache_size": os.getenv("AGENT_CACHE_SIZE", "1024"),
+        },
+        "seed_rows_per_sec": seed_report["rows_per_sec"] if seed_report else None,
+        **await run_load(mix, args.requests, args.concurrency, args.warmup),
+    }
+    if args.compare:
+        result["vs_baseline"] = compare(json.loads(args.compare.read_text(encoding="utf-8")), result)
+
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""Memory per large listing: dict-per-product pipeline vs compact rows (tracemalloc).
+
+Usage:
+    python benchmarks/bench_memory.py --products 100000
+
+Seeds a temporary SQLite database with a synthetic catalog
+(``benchmarks/catalog.py``), disables the server's list cache, then
+measures retained and peak traced memory, plus time, for one unpaged
+listing of the whole catalog at each stage:
+
+- server fetch: ORM entities + ``_p_to_dict`` vs ``select(columns)`` tuples;
+- wire: JSON size of the list_products payload, dicts vs compact;
+- MCP call: one in-process list_products round trip decoded into dicts
+  (``compact=False``) vs ProductRows (``MCPProductsClient.list_products``);
+  server and client share the process here, so the peak covers both;
+- format: ``format_products`` over dicts vs over ProductRows.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from catalog import seed_database  # noqa: E402
+
+
+async def _measure(fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, Dict[str, float]]:
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = await fn()
+    seconds = time.perf_counter() - t0
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, {
+        "retained_mib": round(retained / 2**20, 1),
+        "peak_mib": round(peak / 2**20, 1),
+        "seconds": round(seconds, 3),
+    }
+
+
+def _pair(old: Dict[str, float], new: Dict[str, float]) -> Dict[str, Any]:
+    return {
+        "dicts": old,
+        "compact": new,
+        "peak_ratio": round(old["peak_mib"] / new["peak_mib"], 2) if new["peak_mib"] else None,
+    }
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--products", type=int, default=100_000)
+    ap.add_argument("--categories", type=int, default=20)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_memory_")
+    db_url = f"sqlite+aiosqlite:///{tmp}/app.db"
+    os.environ["DATABASE_URL"] = db_url
+    os.environ["PRODUCTS_CACHE_SIZE"] = "0"
+    await seed_database(db_url, args.products, args.categories, batch_size=10_000)
+
+    from pydantic_core import to_json
+    from sqlalchemy import select
+
+    import app.mcp_server.products_server as ps
+    from app.agent.mcp_client import MCPProductsClient
+    from app.agent.tools_custom import format_products
+    from app.models import Product
+
+    results: Dict[str, Any] = {"products": args.products}
+
+    async def orm_dicts():
+        async with ps.ReadSessionLocal() as s:
+            return [ps._p_to_dict(p) for p in (await s.execute(select(Product).order_by(Product.id))).scalars()]
+
+    async def column_rows():
+        async with ps.ReadSessionLocal() as s:
+            return await ps._fetch_rows(s, None, None, None)
+
+    dicts, old = await _measure(orm_dicts)
+    rows, new = await _measure(column_rows)
+    results["server_fetch"] = _pair(old, new)
+
+    compact = {"columns": list(ps.PRODUCT_COLUMNS), "rows": rows}
+    results["wire_mib"] = {
+        "dicts": round(len(to_json(dicts)) / 2**20, 1),
+        "compact": round(len(to_json(compact)) / 2**20, 1),
+    }
+    del dicts, rows, compact
+
+    async with MCPProductsClient(db_url, transport="inprocess") as mcp:
+        await mcp.get_statistics()  # session and tool schemas are set up outside the measurement
+        listed, old = await _measure(lambda: mcp._call("list_products", {"category": None}))
+        product_rows, new = await _measure(lambda: mcp.list_products())
+    results["mcp_call"] = _pair(old, new)
+
+    async def fmt(items):
+        return format_products.func(items)
+
+    text_old, old = await _measure(lambda: fmt(listed))
+    text_new, new = await _measure(lambda: fmt(product_rows))
+    assert len(text_old) == len(text_new)
+    results["format"] = _pair(old, new)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
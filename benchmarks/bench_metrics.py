@@ -0,0 +1,106 @@
+"""Overhead of the Prometheus instrumentation on the agent pipeline.
+
+Usage:
+    python benchmarks/bench_metrics.py --requests 2000 --rounds 5
+
+Seeds a temporary SQLite database and runs ``run_agent`` over a query mix
+through a warm in-process MCP pool, alternating rounds with recording on and
+off (``app.agent.metrics.ENABLED``). Reports mean per-request latency for
+both and the relative overhead, plus the raw cost of one ``track`` block.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+QUERIES = [
+    "Покажи все продукты в категории Электроника",
+    "Какая средняя цена продуктов?",
+    "Посчитай скидку 15% на товар с ID 1",
+    "Какая средняя цена в категории Книги?",
+    "Привет",
+]
+
+
+async def _seed(n: int) -> None:
+    from app.db import Base, engine, SessionLocal
+    from app.models import Product
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as s:
+        cats = ["Электроника", "Книги", "Дом"]
+        s.add_all([Product(name=f"Товар {i}", price=float(i), category=cats[i % 3], in_stock=True) for i in range(1, n + 1)])
+        await s.commit()
+
+
+async def _round(run_agent, requests: int) -> float:
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        t0 = time.perf_counter()
+        for i in range(requests):
+            await run_agent(QUERIES[i % len(QUERIES)])
+        return (time.perf_counter() - t0) / requests
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--products", type=int, default=30)
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--rounds", type=int, default=5)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_metrics_")
+    db_url = f"sqlite+aiosqlite:///{tmp}/app.db"
+    os.environ["DATABASE_URL"] = db_url
+    os.environ["MCP_TRANSPORT"] = "inprocess"
+    await _seed(args.products)
+
+    from app.agent import metrics
+    from app.agent.graph import run_agent
+    from app.agent.mcp_pool import create_products_pool, set_products_pool
+
+    pool = create_products_pool(db_url)
+    await pool.start()
+    set_products_pool(pool)
+    await _round(run_agent, 100)  # warm-up
+
+    on, off = [], []
+    for _ in range(args.rounds):
+        for enabled, sink in ((True, on), (False, off)):
+            metrics.ENABLED = enabled
+            sink.append(await _round(run_agent, args.requests))
+    await pool.close()
+
+    metrics.ENABLED = True
+
+    def one_track() -> None:
+        with metrics.track("bench"):
+            pass
+
+    n = 200_000
+    track_ns = timeit.timeit(one_track, number=n) / n * 1e9
+
+    mean_on, mean_off = statistics.median(on), statistics.median(off)
+    results = {
+        "request_us_metrics_on": round(mean_on * 1e6, 1),
+        "request_us_metrics_off": round(mean_off * 1e6, 1),
+        "overhead_pct": round((mean_on / mean_off - 1) * 100, 2),
+        "track_block_ns": round(track_ns),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
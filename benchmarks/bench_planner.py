@@ -0,0 +1,143 @@
+"""Planner throughput: legacy per-request MockPlannerLLM vs precompiled plan_query.
+
+Usage:
+    python benchmarks/bench_planner.py --rounds 2000
+
+Runs the regression corpus from tests/planner_corpus.py through the
+legacy rules (copied below, recompiling patterns and building a new
+planner model per query, as plan_node used to) and through the current
+module-level rules. It checks that both produce identical plans, then
+reports plans/sec for the bare classifier, plan_batch and the full
+chat-model ainvoke path.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+
+from app.agent.mock_llm import PLANNER, MockPlannerLLM, plan_query  # noqa: E402
+from tests.planner_corpus import CORPUS  # noqa: E402
+
+
+LATER_INTENTS = {"create_order", "get_order", "list_orders", "search", "multi"}
+
+
+def legacy_plan(text: str) -> dict:
+    """MockPlannerLLM._plan before the rewrite, kept verbatim for comparison."""
+    t = text.strip()
+
+    m = re.search(r"категори[ия]\s+([\w\-]+)", t, flags=re.IGNORECASE)
+    if ("покажи" in t.lower() or "показать" in t.lower() or "выведи" in t.lower()) and m:
+        return {"intent": "list_by_category", "category": m.group(1)}
+
+    if re.search(r"средн(яя|юю)\s+цен", t, flags=re.IGNORECASE) or "статист" in t.lower():
+        if m:
+            return {"intent": "stats", "category": m.group(1)}
+        return {"intent": "stats"}
+
+    if t.lower().startswith("добавь") or t.lower().startswith("добавить"):
+        name = None
+        price = None
+        category = None
+        in_stock = True
+
+        m_name = re.search(r"продукт\s*:\s*([^,]+)", t, flags=re.IGNORECASE)
+        if m_name:
+            name = m_name.group(1).strip()
+
+        m_price = re.search(r"цен[аы]\s*(\d+(?:[\.,]\d+)?)", t, flags=re.IGNORECASE)
+        if m_price:
+            price = float(m_price.group(1).replace(",", "."))
+
+        m_cat = re.search(r"категори[ия]\s*([\w\-]+)", t, flags=re.IGNORECASE)
+        if m_cat:
+            category = m_cat.group(1).strip()
+
+        if name and price is not None and category:
+            return {"intent": "add_product", "name": name, "price": price, "category": category, "in_stock": in_stock}
+
+    m_disc = re.search(r"скидк\w*\s*(\d+(?:[\.,]\d+)?)%?", t, flags=re.IGNORECASE)
+    m_id = re.search(r"(?:id|ID)\s*(\d+)", t)
+    if m_disc and m_id:
+        disc = float(m_disc.group(1).replace(",", "."))
+        pid = int(m_id.group(1))
+        return {"intent": "discount", "discount_percent": disc, "product_id": pid}
+
+    return {"intent": "unknown"}
+
+
+def _rate(fn, queries, rounds: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        fn(queries)
+    return rounds * len(queries) / (time.perf_counter() - t0)
+
+
+async def _arate(fn, queries, rounds: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for q in queries:
+            await fn(q)
+    return rounds * len(queries) / (time.perf_counter() - t0)
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rounds", type=int, default=2000)
+    args = ap.parse_args()
+
+    # Order, search and multi-intent plans postdate the legacy rules; time both on the shared subset.
+    queries = [q for q, plan in CORPUS if plan["intent"] not in LATER_INTENTS]
+    mismatches = [q for q in queries if legacy_plan(q) != plan_query(q)]
+    if mismatches:
+        raise SystemExit(f"plan mismatch on: {mismatches}")
+
+    # Defeat re's internal pattern cache to measure the per-call compile cost
+    # a cold process (or a cache-thrashing one) pays with inline patterns.
+    def legacy_cold(qs):
+        for q in qs:
+            re.purge()
+            MockPlannerLLM()
+            legacy_plan(q)
+
+    def legacy_warm(qs):
+        for q in qs:
+            MockPlannerLLM()
+            legacy_plan(q)
+
+    async def legacy_chat(q):
+        res = await MockPlannerLLM().ainvoke([HumanMessage(content=q)])
+        json.loads(res.content)
+
+    async def shared_chat(q):
+        res = await PLANNER.ainvoke([HumanMessage(content=q)])
+        json.loads(res.content)
+
+    chat_rounds = max(1, args.rounds // 20)
+    results = {
+        "corpus_size": len(queries),
+        "identical_plans": True,
+        "plans_per_sec": {
+            "legacy_recompile": round(_rate(legacy_cold, queries, max(1, args.rounds // 10))),
+            "legacy_new_model": round(_rate(legacy_warm, queries, args.rounds)),
+            "plan_query": round(_rate(lambda qs: [plan_query(q) for q in qs], queries, args.rounds)),
+            "plan_batch": round(_rate(PLANNER.plan_batch, queries, args.rounds)),
+            "legacy_chat_ainvoke": round(await _arate(legacy_chat, queries, chat_rounds)),
+            "shared_chat_ainvoke": round(await _arate(shared_chat, queries, chat_rounds)),
+        },
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+"""Grouped price statistics: NumPy snapshot vs a pure-Python per-category pass.
+
+Usage:
+    python benchmarks/bench_price_stats.py --products 1000000 --categories 50
+
+Generates a synthetic catalog in memory (``benchmarks/catalog.py``), then
+times ``PriceSnapshot.build`` (dictionary-encode, argsort by price, then a
+stable argsort by category code), a cold ``distribution()`` over the whole
+catalog and every category, a cached repeat, and the same aggregates
+computed with dicts, ``sorted`` and ``statistics``. Database fetch time is
+not included.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from catalog import generate_products  # noqa: E402
+
+
+def _python_stats(rows: List[Tuple[str, float]], bins: int) -> Dict[str, Dict[str, float]]:
+    groups: Dict[str, List[float]] = {}
+    for key, price in rows:
+        groups.setdefault(key, []).append(price)
+    groups["*"] = [p for _, p in rows]
+
+    def pct(sorted_prices: List[float], q: float) -> float:
+        pos = q * (len(sorted_prices) - 1)
+        lo = math.floor(pos)
+        hi = min(lo + 1, len(sorted_prices) - 1)
+        return sorted_prices[lo] + (sorted_prices[hi] - sorted_prices[lo]) * (pos - lo)
+
+    out = {}
+    for key, prices in groups.items():
+        prices.sort()
+        lo, hi = prices[0], prices[-1]
+        width = (hi - lo) or 1.0
+        hist = [0] * bins
+        for p in prices:
+            hist[min(int((p - lo) / width * bins), bins - 1)] += 1
+        out[key] = {
+            "mean": statistics.fmean(prices),
+            "stddev": statistics.pstdev(prices),
+            "median": pct(prices, 0.5),
+            "p90": pct(prices, 0.9),
+            "p99": pct(prices, 0.99),
+            "hist": hist,
+        }
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--products", type=int, default=1_000_000)
+    ap.add_argument("--categories", type=int, default=50)
+    ap.add_argument("--bins", type=int, default=10)
+    args = ap.parse_args()
+
+    from app.mcp_server.price_snapshot import PriceSnapshot
+
+    rows = [(p["category"].casefold(), p["price"]) for p in generate_products(args.products, args.categories)]
+
+    t0 = time.perf_counter()
+    snap = PriceSnapshot.build(1, rows)
+    build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    dist = snap.distribution(None, args.bins)
+    cold = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    snap.distribution(None, args.bins)
+    cached = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    ref = _python_stats(rows, args.bins)
+    python = time.perf_counter() - t0
+
+    top = max(dist["categories"], key=lambda k: dist["categories"][k]["count"])
+    assert math.isclose(ref[top]["p99"], dist["categories"][top]["p99"])
+    assert ref["*"]["hist"] == dist["histogram"]["counts"]
+
+    numpy_total = build + cold
+    print(json.dumps({
+        "products": args.products,
+        "categories": len(dist["categories"]),
+        "snapshot_build_ms": round(build * 1000, 1),
+        "distribution_cold_ms": round(cold * 1000, 1),
+        "distribution_cached_us": round(cached * 1e6, 1),
+        "python_ms": round(python * 1000, 1),
+        "speedup": round(python / numpy_total, 1) if numpy_total > 0 else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Product search: FTS5 index vs a LIKE '%...%' scan over the same catalog.
+
+Usage:
+    python benchmarks/bench_search.py --products 1000000 --repeat 20
+
+Seeds a temporary SQLite database with a synthetic catalog
+(``benchmarks/catalog.py``; the FTS index is filled by the insert
+triggers, so the seed rate includes indexing), then times
+``search_products`` for a few query shapes (a common word, a prefix, two
+words, a typo, a rare word, no match) against the same queries answered
+by the unindexed, unranked LIKE fallback. LIKE stops at the first
+``limit`` matches in id order, so it is quick for common words and scans
+the whole table for rare ones; FTS ranks every match. Reports p50/p95
+per query and the import rate.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from catalog import seed_database  # noqa: E402
+
+QUERIES = {
+    "word": "чайник",
+    "prefix": "ноут",
+    "two_words": "умный чайник",
+    "typo": "чайнек",
+    "rare": "777",
+    "miss": "холодильник",
+}
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+async def _time(fn, repeat: int) -> Dict[str, Any]:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = await fn()
+        samples.append(time.perf_counter() - t0)
+    return {
+        "p50_ms": round(statistics.median(samples) * 1000, 2),
+        "p95_ms": round(_percentile(samples, 0.95) * 1000, 2),
+        "hits": len(out),
+    }
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--products", type=int, default=1_000_000)
+    ap.add_argument("--categories", type=int, default=50)
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--limit", type=int, default=20)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_search_")
+    db_url = f"sqlite+aiosqlite:///{tmp}/app.db"
+    os.environ["DATABASE_URL"] = db_url
+    report = await seed_database(db_url, args.products, args.categories, batch_size=10_000)
+
+    from app.db import ReadSessionLocal
+    from app.mcp_server.search import _search_like, query_tokens, search_products
+
+    results: Dict[str, Any] = {
+        "products": args.products,
+        "seed_rows_per_sec": report["rows_per_sec"],
+        "db_mb": round(os.path.getsize(f"{tmp}/app.db") / 2**20, 1),
+        "queries": {},
+    }
+    async with ReadSessionLocal() as s:
+        for name, query in QUERIES.items():
+
+            async def fts():
+                return (await search_products(s, query, args.limit))["items"]
+
+            async def like():
+                # SQLite's lower() leaves Cyrillic alone: match the catalog's capitalization.
+                tokens = [t.capitalize() for t in query_tokens(query)]
+                return (await _search_like(s, tokens, args.limit, 0))[0]
+
+            row = {"query": query, "fts": await _time(fts, args.repeat), "like": await _time(like, args.repeat)}
+            results["queries"][name] = row
+            print(f"{name:>10}: {row}", file=sys.stderr)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,176 @@
+"""SQLite engine profiles under concurrent readers and writers: default vs tuned.
+
+Usage:
+    python benchmarks/bench_sqlite_profile.py --processes 4 --readers 8 --writers 2 --seconds 5
+
+Seeds a temporary SQLite file, then starts ``--processes`` worker processes
+(one per MCP server subprocess in production), each running ``--readers``
+read loops (get by id, one 500-row category page) and ``--writers`` loops
+inserting ``--write-rows`` products per transaction, concurrently for
+``--seconds``. Each worker builds its engines with
+``app.db.create_engines`` for the profile under test. Reports reads/sec,
+written rows/sec, p99 latency and "database is locked" errors per profile.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+CATEGORIES = ["Электроника", "Продукты", "Книги", "Одежда", "Дом"]
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+async def _seed(db_url: str, n: int) -> None:
+    from app.db import Base, create_engines
+    from app.models import Product
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    engine, _ = create_engines(db_url, profile="default")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine)() as s:
+        s.add_all([
+            Product(name=f"Товар {i}", price=float(100 + i % 5000), category=CATEGORIES[i % len(CATEGORIES)], in_stock=True)
+            for i in range(1, n + 1)
+        ])
+        await s.commit()
+    await engine.dispose()
+
+
+async def _worker_main(
+    db_url: str, profile: str, readers: int, writers: int, write_rows: int, seconds: float, products: int, seed: int
+) -> Dict:
+    from sqlalchemy import select
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    from app.db import create_engines
+    from app.models import Product, category_key
+
+    write_engine, read_engine = create_engines(db_url, profile=profile)
+    Write = async_sessionmaker(write_engine, expire_on_commit=False)
+    Read = async_sessionmaker(read_engine, expire_on_commit=False)
+    out = {"reads": 0, "writes": 0, "locked": 0, "read_lat": [], "write_lat": []}
+    deadline = time.perf_counter() + seconds
+
+    async def write_loop(rnd: random.Random) -> None:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                async with Write() as s:
+                    s.add_all([
+                        Product(name="bench", price=float(rnd.randint(1, 9999)), category=rnd.choice(CATEGORIES), in_stock=True)
+                        for _ in range(write_rows)
+                    ])
+                    await s.commit()
+            except OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                out["locked"] += 1
+                continue
+            out["writes"] += write_rows
+            out["write_lat"].append(time.perf_counter() - start)
+
+    async def read_loop(rnd: random.Random) -> None:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                async with Read() as s:
+                    if rnd.random() < 0.5:
+                        await s.get(Product, rnd.randint(1, products))
+                    else:
+                        key = category_key(rnd.choice(CATEGORIES))
+                        stmt = select(Product).where(Product.category_key == key).order_by(Product.id).limit(500)
+                        (await s.execute(stmt)).scalars().all()
+            except OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                out["locked"] += 1
+                continue
+            out["reads"] += 1
+            out["read_lat"].append(time.perf_counter() - start)
+
+    await asyncio.gather(
+        *(read_loop(random.Random(seed * 1000 + i)) for i in range(readers)),
+        *(write_loop(random.Random(seed * 1000 + 500 + i)) for i in range(writers)),
+    )
+    await write_engine.dispose()
+    if read_engine is not write_engine:
+        await read_engine.dispose()
+    return out
+
+
+def _worker(args) -> Dict:
+    return asyncio.run(_worker_main(*args))
+
+
+def run_profile(
+    db_url: str,
+    profile: str,
+    processes: int,
+    readers: int,
+    writers: int,
+    write_rows: int,
+    seconds: float,
+    products: int,
+) -> Dict[str, float]:
+    ctx = mp.get_context("spawn")
+    with ctx.Pool(processes) as pool:
+        parts = pool.map(_worker, [(db_url, profile, readers, writers, write_rows, seconds, products, i) for i in range(processes)])
+    read_lat = [x for p in parts for x in p["read_lat"]]
+    write_lat = [x for p in parts for x in p["write_lat"]]
+    reads = sum(p["reads"] for p in parts)
+    writes = sum(p["writes"] for p in parts)
+    return {
+        "reads_per_s": round(reads / seconds, 1),
+        "rows_written_per_s": round(writes / seconds, 1),
+        "read_p99_ms": round(_percentile(read_lat, 0.99) * 1000, 2),
+        "write_p99_ms": round(_percentile(write_lat, 0.99) * 1000, 2),
+        "locked_errors": sum(p["locked"] for p in parts),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--products", type=int, default=20000)
+    ap.add_argument("--processes", type=int, default=4)
+    ap.add_argument("--readers", type=int, default=8)
+    ap.add_argument("--writers", type=int, default=2)
+    ap.add_argument("--write-rows", type=int, default=1, help="products per write transaction")
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--profiles", default="default,tuned")
+    args = ap.parse_args()
+
+    results = {}
+    for profile in args.profiles.split(","):
+        # Fresh file per profile: WAL mode persists in the database file.
+        tmp = tempfile.mkdtemp(prefix="bench_sqlite_")
+        db_url = f"sqlite+aiosqlite:///{tmp}/app.db"
+        asyncio.run(_seed(db_url, args.products))
+        results[profile] = run_profile(
+            db_url, profile, args.processes, args.readers, args.writers, args.write_rows, args.seconds, args.products
+        )
+        print(f"{profile:>8}: {results[profile]}")
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Compare MCP transport modes: stdio subprocess vs in-process (in-memory).
+
+Usage:
+    python benchmarks/bench_transport.py --products 1000 --requests 2000 --concurrency 8
+
+Seeds a temporary SQLite database, then drives the products MCP server
+through a warm MCPSessionPool in each mode with a mix of get_product,
+list_products and get_statistics calls. Reports p50/p99 latency and
+requests/sec per mode.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+CATEGORIES = ["Электроника", "Продукты", "Книги", "Одежда", "Дом"]
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+async def _seed(n: int) -> None:
+    from app.db import Base, engine, SessionLocal
+    from app.models import Product
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as s:
+        s.add_all([
+            Product(name=f"Товар {i}", price=float(100 + i % 5000), category=CATEGORIES[i % len(CATEGORIES)], in_stock=bool(i % 3))
+            for i in range(1, n + 1)
+        ])
+        await s.commit()
+
+
+async def _run_mode(mode: str, db_url: str, products: int, requests: int, concurrency: int) -> Dict[str, float]:
+    from app.agent.mcp_client import MCPProductsClient
+    from app.agent.mcp_pool import MCPSessionPool
+
+    pool = MCPSessionPool(lambda: MCPProductsClient(db_url, transport=mode), size=concurrency)
+    t0 = time.perf_counter()
+    await pool.start()
+    startup = time.perf_counter() - t0
+
+    rnd = random.Random(42)
+    latencies: List[float] = []
+
+    async def one(i: int) -> None:
+        kind = i % 10
+        async with pool.session() as mcp:
+            start = time.perf_counter()
+            if kind < 6:
+                await mcp.get_product(product_id=rnd.randint(1, products))
+            elif kind < 9:
+                await mcp.get_statistics()
+            else:
+                await mcp.list_products(category=rnd.choice(CATEGORIES))
+            latencies.append(time.perf_counter() - start)
+
+    sem = asyncio.Semaphore(concurrency)
+
+    async def bounded(i: int) -> None:
+        async with sem:
+            await one(i)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(bounded(i) for i in range(requests)))
+    elapsed = time.perf_counter() - t0
+    await pool.close()
+
+    return {
+        "pool_startup_s": round(startup, 3),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+        "rps": round(requests / elapsed, 1),
+    }
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--products", type=int, default=1000)
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--modes", default="stdio,inprocess")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_transport_")
+    db_url = f"sqlite+aiosqlite:///{tmp}/app.db"
+    # In-process servers use app.db's engine, which reads DATABASE_URL at import.
+    os.environ["DATABASE_URL"] = db_url
+    await _seed(args.products)
+
+    results = {}
+    for mode in args.modes.split(","):
+        results[mode] = await _run_mode(mode, db_url, args.products, args.requests, args.concurrency)
+        print(f"{mode:>10}: {results[mode]}")
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""Synthetic product catalogs for benchmarks: N products over a Zipf-skewed set of categories.
+
+Usage:
+    python benchmarks/catalog.py --products 100000 --categories 50 --skew 1.1
+    python benchmarks/catalog.py --products 1000000 --out feed.jsonl
+
+Without ``--out`` the rows are inserted into ``DATABASE_URL`` (tables are
+created if missing) through the ``Product`` model and the bulk-import path,
+so ``product_stats`` stays consistent. With ``--out`` a JSON Lines feed is
+written instead, ready for ``scripts/seed.py`` or ``POST /api/v1/products:bulk``.
+
+Category ``k`` (1-based) gets a share proportional to ``1 / k**skew``, so a
+few categories hold most of the catalog, as in real shops; ``--skew 0``
+spreads products evenly. The same ``--seed`` always yields the same catalog.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import bisect
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+BASE_CATEGORIES = ["Электроника", "Продукты", "Книги", "Одежда", "Дом", "Спорт", "Игрушки", "Красота", "Авто", "Сад"]
+_NOUNS = ["Ноутбук", "Кофе", "Роман", "Куртка", "Лампа", "Мяч", "Конструктор", "Крем", "Шина", "Лопата", "Чайник", "Кабель"]
+_ADJECTIVES = ["Новый", "Классический", "Компактный", "Большой", "Лёгкий", "Умный", "Быстрый", "Тихий"]
+
+
+def category_names(n: int) -> List[str]:
+    """``n`` single-word category names the planner can parse ("Электроника", ..., "Электроника-2")."""
+    return [
+        BASE_CATEGORIES[i % len(BASE_CATEGORIES)] + (f"-{i // len(BASE_CATEGORIES) + 1}" if i >= len(BASE_CATEGORIES) else "")
+        for i in range(n)
+    ]
+
+
+class CategorySampler:
+    """Draws category names with Zipf weights ``1 / rank**skew``."""
+
+    def __init__(self, names: List[str], skew: float, rng: random.Random) -> None:
+        self.names = names
+        self._cum = list(itertools.accumulate(1.0 / (k ** skew) for k in range(1, len(names) + 1)))
+        self._rng = rng
+
+    def __call__(self) -> str:
+        x = self._rng.random() * self._cum[-1]
+        return self.names[bisect.bisect_right(self._cum, x)]
+
+
+def generate_products(
+    n: int, categories: int = 20, skew: float = 1.1, seed: int = 42
+) -> Iterator[Dict[str, Any]]:
+    """Yield ``n`` product dicts (name, price, category, in_stock)."""
+    rng = random.Random(seed)
+    sample_category = CategorySampler(category_names(categories), skew, rng)
+    for i in range(1, n + 1):
+        # Log-normal prices: mostly hundreds to a few thousand, a long tail above.
+        price = round(min(1_000_000.0, math.exp(rng.gauss(7.0, 1.2))), 2)
+        yield {
+            "name": f"{rng.choice(_ADJECTIVES)} {rng.choice(_NOUNS)} {i}",
+            "price": price,
+            "category": sample_category(),
+            "in_stock": rng.random() < 0.85,
+        }
+
+
+async def seed_database(
+    db_url: Optional[str] = None,
+    products: int = 1000,
+    categories: int = 20,
+    skew: float = 1.1,
+    seed: int = 42,
+    batch_size: int = 5000,
+) -> Dict[str, Any]:
+    """Create the schema and bulk-insert a synthetic catalog; returns the import report."""
+    if db_url:
+        os.environ["DATABASE_URL"] = db_url
+    from app.db import Base, SessionLocal, engine
+    from app.mcp_server.bulk_import import import_records, validate_row
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    records = ((i, validate_row(p), None) for i, p in enumerate(generate_products(products, categories, skew, seed), 1))
+    return await import_records(SessionLocal, records, batch_size=batch_size)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--products", type=int, default=1000)
+    ap.add_argument("--categories", type=int, default=20)
+    ap.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of the category distribution")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--batch-size", type=int, default=5000)
+    ap.add_argument("--out", type=Path, help="write a JSON Lines feed instead of inserting")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    if args.out:
+        with args.out.open("w", encoding="utf-8") as f:
+            for p in generate_products(args.products, args.categories, args.skew, args.seed):
+                f.write(json.dumps(p, ensure_ascii=False) + "\n")
+        result: Dict[str, Any] = {"written": args.products, "path": str(args.out)}
+    else:
+        report = asyncio.run(
+            seed_database(None, args.products, args.categories, args.skew, args.seed, args.batch_size)
+        )
+        result = {"inserted": report["inserted"], "rows_per_sec": report["rows_per_sec"]}
+    result["seconds"] = round(time.perf_counter() - t0, 2)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,28 @@ from sqlalchemy import select
 
 from app.db import SessionLocal
 from app.models import Product
+from app.mcp_server.bulk_import import import_records, parse_records
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 
+async def load_feed(path: Path, batch_size: int = 5000):
+    """Bulk-load a JSON Lines / CSV supplier feed (format by file extension)."""
+    fmt = "csv" if path.suffix.lower() == ".csv" else "jsonl"
+    with path.open(encoding="utf-8", newline="") as f:
+        first_line = 2 if fmt == "csv" else 1
+        report = await import_records(SessionLocal, parse_records(f, fmt, first_line=first_line), batch_size=batch_size)
+    print(f"Seed: inserted {report['inserted']}, rejected {report['rejected']}, {report['rows_per_sec']} rows/s")
+    for e in report["errors"]:
+        print(f"  line {e['line']}: {e['error']}")
+
+
 async def main():
+    if len(sys.argv) > 1:
+        await load_feed(Path(sys.argv[1]))
+        return
+
     async with SessionLocal() as s:
         exists = (await s.execute(select(Product.id).limit(1))).first()
         if exists:
@@ -0,0 +1,70 @@
+"""Regression corpus for the mock planner: (query, expected plan)."""
+
+CORPUS = [
+    ("Покажи все продукты в категории Электроника", {"intent": "list_by_category", "category": "Электроника"}),
+    ("покажи категорию Продукты", {"intent": "unknown"}),
+    ("ВЫВЕДИ КАТЕГОРИЯ Книги", {"intent": "list_by_category", "category": "Книги"}),
+    ("Показать товары из категории Home-Office", {"intent": "list_by_category", "category": "Home-Office"}),
+    ("Покажи все продукты", {"intent": "unknown"}),
+    ("Категория Электроника", {"intent": "unknown"}),
+    ("Какая средняя цена продуктов?", {"intent": "stats"}),
+    ("СРЕДНЮЮ ЦЕНУ посчитай", {"intent": "stats"}),
+    ("Покажи статистику", {"intent": "stats"}),
+    ("Какая средняя цена в категории Электроника?", {"intent": "stats", "category": "Электроника"}),
+    ("Статистика по категории Продукты", {"intent": "stats", "category": "Продукты"}),
+    ("Покажи среднюю цену в категории Книги", {"intent": "list_by_category", "category": "Книги"}),
+    (
+        "Добавь новый продукт: Мышка, цена 1500, категория Электроника",
+        {"intent": "add_product", "name": "Мышка", "price": 1500.0, "category": "Электроника", "in_stock": True},
+    ),
+    (
+        "добавить продукт: Чай зелёный, цены 99,5, категория Продукты",
+        {"intent": "add_product", "name": "Чай зелёный", "price": 99.5, "category": "Продукты", "in_stock": True},
+    ),
+    ("Добавь продукт: Мышка, категория Электроника", {"intent": "unknown"}),
+    ("Добавь продукт Мышка цена 1500 категория Электроника", {"intent": "unknown"}),
+    ("Посчитай скидку 15% на товар с ID 1", {"intent": "discount", "discount_percent": 15.0, "product_id": 1}),
+    ("скидка 7,5 для id 42", {"intent": "discount", "discount_percent": 7.5, "product_id": 42}),
+    ("Скидку 10% на товар Id 3", {"intent": "unknown"}),
+    ("Посчитай скидку на товар с ID 1", {"intent": "unknown"}),
+    ("Добавь скидку 20% на ID 5", {"intent": "discount", "discount_percent": 20.0, "product_id": 5}),
+    ("Закажи 3 шт товара с ID 1", {"intent": "create_order", "items": [{"product_id": 1, "quantity": 3}]}),
+    (
+        "Закажи ID 1 x2, ID 2 х3",
+        {"intent": "create_order", "items": [{"product_id": 1, "quantity": 2}, {"product_id": 2, "quantity": 3}]},
+    ),
+    ("Оформи заказ: ID 5", {"intent": "create_order", "items": [{"product_id": 5, "quantity": 1}]}),
+    ("Закажи что-нибудь", {"intent": "unknown"}),
+    ("Закажи ID 1 x0", {"intent": "unknown"}),
+    ("Статус заказа №7", {"intent": "get_order", "order_id": 7}),
+    ("Покажи заказ 12", {"intent": "get_order", "order_id": 12}),
+    ("Покажи мои заказы", {"intent": "list_orders"}),
+    ("Список заказов", {"intent": "list_orders"}),
+    ("Найди ноутбук", {"intent": "search", "text": "ноутбук"}),
+    ("Поиск: кофе зерновой?", {"intent": "search", "text": "кофе зерновой"}),
+    ("найди товары Чайник Bosch", {"intent": "search", "text": "Чайник Bosch"}),
+    ("Найди заказ 3", {"intent": "get_order", "order_id": 3}),
+    ("Найди", {"intent": "unknown"}),
+    (
+        "Покажи все продукты в категории Электроника и среднюю цену",
+        {"intent": "multi", "plans": [{"intent": "list_by_category", "category": "Электроника"}, {"intent": "stats"}]},
+    ),
+    (
+        "Какая средняя цена в категории Книги; найди чайник",
+        {"intent": "multi", "plans": [{"intent": "stats", "category": "Книги"}, {"intent": "search", "text": "чайник"}]},
+    ),
+    (
+        "Покажи заказ 3 и статистику",
+        {"intent": "multi", "plans": [{"intent": "get_order", "order_id": 3}, {"intent": "stats"}]},
+    ),
+    (
+        "Закажи ID 1 x2 и ID 2 x3",
+        {"intent": "create_order", "items": [{"product_id": 1, "quantity": 2}, {"product_id": 2, "quantity": 3}]},
+    ),
+    (
+        "Добавь новый продукт: Хлеб и масло, цена 10, категория Продукты",
+        {"intent": "add_product", "name": "Хлеб и масло", "price": 10.0, "category": "Продукты", "in_stock": True},
+    ),
+    ("  Привет!  ", {"intent": "unknown"}),
+    ("", {"intent": "unknown"}),
+]
@@ -1,40 +1,10 @@
+import json
 import os
 import pytest
-from pathlib import Path
 
 from httpx import AsyncClient, ASGITransport
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
 from app.api import app
-from app.db import Base
-from app.models import Product
-
-
-@pytest.fixture(autouse=True)
-async def _set_test_db(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
-    # Create a temporary SQLite DB for tests
-    db_file = tmp_path / "app.db"
-    db_url = f"sqlite+aiosqlite:////{db_file}"
-
-    monkeypatch.setenv("DATABASE_URL", db_url)
-    monkeypatch.setenv("ALEMBIC_DATABASE_URL", db_url.replace("+aiosqlite", ""))
-
-    # Create schema + seed data
-    engine = create_async_engine(db_url, echo=False, future=True)
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
-    Session = async_sessionmaker(engine, expire_on_commit=False)
-    async with Session() as s:
-        s.add_all([
-            Product(name="Ноутбук", price=50000, category="Электроника", in_stock=True),
-            Product(name="Кофе", price=1200, category="Продукты", in_stock=False),
-        ])
-        await s.commit()
-
-    yield
-
-    await engine.dispose()
 
 
 @pytest.mark.asyncio
@@ -71,3 +41,234 @@ async def test_discount():
         assert "Цена со скидкой" in data["answer"]
         # 50000 * 0.85 = 42500
         assert "42500" in data["answer"]
+
+
+@pytest.mark.asyncio
+async def test_inprocess_transport(monkeypatch: pytest.MonkeyPatch):
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    import app.mcp_server.products_server as products_server
+
+    # The embedded server shares this process's engine; point it at the test DB.
+    engine = create_async_engine(os.environ["DATABASE_URL"])
+    monkeypatch.setattr(products_server, "SessionLocal", async_sessionmaker(engine, expire_on_commit=False))
+    monkeypatch.setattr(products_server, "ReadSessionLocal", async_sessionmaker(engine, expire_on_commit=False))
+    monkeypatch.setenv("MCP_TRANSPORT", "inprocess")
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.post("/api/v1/agent/query", json={"query": "Какая средняя цена продуктов?"})
+        assert r.status_code == 200
+        assert "25600" in r.json()["answer"]
+
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_zygote_transport(monkeypatch: pytest.MonkeyPatch):
+    from app.agent.zygote import get_zygote, stop_zygote
+
+    monkeypatch.setenv("MCP_TRANSPORT", "zygote")
+    zygote = get_zygote()
+    starts = zygote.starts
+
+    transport = ASGITransport(app=app)
+    try:
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            for _ in range(2):
+                r = await ac.post("/api/v1/agent/query", json={"query": "Какая средняя цена продуктов?"})
+                assert r.status_code == 200
+                assert "25600" in r.json()["answer"]
+        # Both requests were served by workers forked from one spawner.
+        assert zygote.starts == starts + 1
+        assert zygote.running
+    finally:
+        await stop_zygote()
+    assert not zygote.running
+
+
+@pytest.mark.asyncio
+async def test_list_products_stream_pages():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.get("/api/v1/products", params={"page_size": 1})
+        assert r.status_code == 200
+        rows = [json.loads(line) for line in r.text.splitlines()]
+        assert [p["id"] for p in rows] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_statistics_by_category():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.post("/api/v1/agent/query", json={"query": "Какая средняя цена в категории Продукты?"})
+        assert r.status_code == 200
+        data = r.json()
+        assert data["plan"] == {"intent": "stats", "category": "Продукты"}
+        assert "Всего продуктов: 1" in data["answer"]
+        assert "1200" in data["answer"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_jsonl_and_csv():
+    jsonl = "\n".join([
+        json.dumps({"name": "Мышка", "price": 1500, "category": "Электроника"}, ensure_ascii=False),
+        json.dumps({"name": "Клавиатура", "price": -1, "category": "Электроника"}, ensure_ascii=False),
+        "not json",
+        json.dumps({"name": "Чай", "price": "300,5", "category": "Продукты", "in_stock": False}, ensure_ascii=False),
+    ])
+    csv_body = "name,price,category,in_stock\nМонитор,20000,Электроника,да\nХлеб,,Продукты,нет\n"
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.post("/api/v1/products:bulk", params={"batch_size": 1}, content=jsonl.encode())
+        assert r.status_code == 200
+        report = r.json()
+        assert report["inserted"] == 2
+        assert [e["line"] for e in report["errors"]] == [2, 3]
+        assert len(report["batches"]) == 2
+
+        r = await ac.post("/api/v1/products:bulk", params={"format": "csv"}, content=csv_body.encode())
+        report = r.json()
+        assert (report["inserted"], report["rejected"]) == (1, 1)
+        assert report["errors"][0]["line"] == 3
+
+        r = await ac.post("/api/v1/agent/query", json={"query": "Какая средняя цена в категории Электроника?"})
+        assert "Всего продуктов: 3" in r.json()["answer"]
+
+
+@pytest.mark.asyncio
+async def test_batch_query_groups_calls_and_keeps_order():
+    queries = [
+        "Посчитай скидку 15% на товар с ID 1",
+        "Покажи все продукты в категории Электроника",
+        "Какая средняя цена продуктов?",
+        "Посчитай скидку 50% на товар с ID 1",
+        "Покажи все продукты в категории электроника",
+        "Привет",
+        "Добавь новый продукт: Мышка, цена 1500, категория Электроника",
+    ]
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.post("/api/v1/agent/query:batch", json={"queries": queries, "concurrency": 2})
+        assert r.status_code == 200
+        results = r.json()["results"]
+
+    assert len(results) == len(queries)
+    assert "42500" in results[0]["answer"] and "25000" in results[3]["answer"]
+    assert "batched:2" in results[0]["trace"]
+    # The write runs before the reads, so both listings include the new product.
+    assert results[1]["answer"] == results[4]["answer"]
+    assert "Мышка" in results[1]["answer"]
+    assert "Всего продуктов: 3" in results[2]["answer"]
+    assert results[5]["trace"][-1] == "intent:unknown"
+    assert results[6]["answer"].startswith("Добавлено:")
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.post("/api/v1/agent/query", json={"query": "Посчитай скидку 15% на товар с ID 1"})
+        r = await ac.get("/metrics")
+    assert r.status_code == 200
+    body = r.text
+    assert 'agent_queries_total{intent="discount"}' in body
+    for stage in ("plan", "exec", "mcp_session"):
+        assert f'agent_stage_seconds_count{{stage="{stage}"}}' in body
+    assert 'mcp_tool_call_seconds_count{server="products",tool="get_product"}' in body
+    assert 'mcp_sessions_active{server="products"} 0.0' in body
+
+
+def _sse_events(text: str):
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        yield fields["event"], json.loads(fields["data"])
+
+
+@pytest.mark.asyncio
+async def test_agent_query_stream(monkeypatch: pytest.MonkeyPatch):
+    import app.agent.graph as graph
+
+    monkeypatch.setattr(graph, "STREAM_FIRST_PAGE_SIZE", 1)
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.post("/api/v1/agent/query", json={"query": "Добавь новый продукт: Мышка, цена 1500, категория Электроника"})
+        r = await ac.post("/api/v1/agent/query:stream", json={"query": "Покажи все продукты в категории Электроника"})
+        full = await ac.post("/api/v1/agent/query", json={"query": "Покажи все продукты в категории Электроника"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+
+    events = list(_sse_events(r.text))
+    assert [e for e, _ in events] == ["plan", "chunk", "chunk", "trace"]
+    assert events[0][1]["intent"] == "list_by_category"
+    assert "Ноутбук" in events[1][1]["text"] and "Мышка" in events[2][1]["text"]
+    assert "\n".join(d["text"] for e, d in events if e == "chunk") == full.json()["answer"]
+    assert events[-1][1]["trace"][-1] == "called:list_products"
+
+
+@pytest.mark.asyncio
+async def test_multi_intent_query_fans_out_over_one_session(monkeypatch: pytest.MonkeyPatch):
+    import app.agent.graph as graph
+
+    opened = []
+    real_session = graph.products_session
+
+    def counting_session():
+        opened.append(1)
+        return real_session()
+
+    monkeypatch.setattr(graph, "products_session", counting_session)
+    query = "Покажи все продукты в категории Электроника и среднюю цену"
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.post("/api/v1/agent/query", json={"query": query})
+        assert r.status_code == 200
+        data = r.json()
+        assert data["plan"] == {
+            "intent": "multi",
+            "plans": [{"intent": "list_by_category", "category": "Электроника"}, {"intent": "stats"}],
+        }
+        listing, stats = data["answer"].split("\n\n")
+        assert "Ноутбук" in listing and "Кофе" not in listing
+        assert "Средняя цена: 25600" in stats
+        assert data["trace"][1:] == ["called:list_products", "called:get_statistics", "fanout:2"]
+        assert len(opened) == 1
+
+        r = await ac.post("/api/v1/agent/query:batch", json={"queries": [query, "Какая средняя цена продуктов?"]})
+        first, second = r.json()["results"]
+        assert first["answer"] == data["answer"]
+        assert first["trace"][-1] == "fanout:2"
+        assert second["answer"] == stats
+
+
+@pytest.mark.asyncio
+async def test_fanout_runs_sub_plans_concurrently(monkeypatch: pytest.MonkeyPatch):
+    import asyncio
+    import time
+    from contextlib import asynccontextmanager
+
+    import app.agent.graph as graph
+    from app.agent.response_cache import RESPONSE_CACHE
+
+    class SlowProducts:
+        async def get_statistics(self, category=None):
+            await asyncio.sleep(0.3)
+            return {"count": 1, "avg_price": 1.0, "min_price": 1.0, "max_price": 1.0}
+
+        async def get_product(self, product_id):
+            await asyncio.sleep(0.3)
+            return {"id": product_id, "name": "x", "price": 100.0}
+
+    @asynccontextmanager
+    async def session():
+        yield SlowProducts()
+
+    monkeypatch.setattr(graph, "products_session", session)
+    RESPONSE_CACHE.clear()
+    t0 = time.perf_counter()
+    out = await graph.run_agent("Посчитай скидку 10% на товар с ID 1, а также статистику")
+    elapsed = time.perf_counter() - t0
+    assert out["plan"]["intent"] == "multi"
+    assert "Цена со скидкой: 90.00" in out["answer"] and "Всего продуктов: 1" in out["answer"]
+    # Two 0.3 s calls side by side, not one after the other.
+    assert elapsed < 0.55
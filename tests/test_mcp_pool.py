@@ -0,0 +1,39 @@
+import pytest
+
+from app.agent.graph import run_agent
+from app.agent.mcp_pool import create_products_pool, set_products_pool
+
+
+@pytest.fixture
+async def pool(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("MCP_POOL_SIZE", "2")
+    p = create_products_pool()
+    await p.start()
+    set_products_pool(p)
+    yield p
+    set_products_pool(None)
+    await p.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_warm_sessions(pool):
+    first = await run_agent("Какая средняя цена продуктов?")
+    second = await run_agent("Покажи все продукты в категории Электроника")
+    assert "25600" in first["answer"]
+    assert "Ноутбук" in second["answer"]
+    assert pool.in_use == 0
+    assert pool.respawns == 0
+
+
+@pytest.mark.asyncio
+async def test_pool_respawns_dead_session(pool):
+    # Kill the server process behind a session; the failed request triggers a health check.
+    with pytest.raises(Exception):
+        async with pool.session() as mcp:
+            await mcp.aclose()
+            await mcp.get_statistics()
+
+    assert pool.respawns == 1
+    for _ in range(pool.size):
+        out = await run_agent("Какая средняя цена продуктов?")
+        assert "25600" in out["answer"]
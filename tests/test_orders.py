@@ -0,0 +1,132 @@
+import os
+from datetime import datetime
+
+import pytest
+from fastmcp import Client
+from fastmcp.exceptions import ToolError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import app.mcp_server.orders_server as orders_server
+from app.agent import graph
+from app.agent.batch import run_agent_batch
+from app.agent.graph import run_agent
+from app.agent.mcp_pool import create_orders_pool, set_orders_pool
+
+
+@pytest.fixture
+async def server(monkeypatch: pytest.MonkeyPatch):
+    engine = create_async_engine(os.environ["DATABASE_URL"])
+    monkeypatch.setattr(orders_server, "SessionLocal", async_sessionmaker(engine, expire_on_commit=False))
+    monkeypatch.setattr(orders_server, "ReadSessionLocal", async_sessionmaker(engine, expire_on_commit=False))
+    async with Client(orders_server.mcp) as client:
+        yield client
+    await engine.dispose()
+
+
+@pytest.fixture
+async def orders_pool(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("MCP_ORDERS_POOL_SIZE", "1")
+    p = create_orders_pool()
+    await p.start()
+    set_orders_pool(p)
+    yield p
+    set_orders_pool(None)
+    await p.close()
+
+
+@pytest.mark.asyncio
+async def test_create_orders_batch_is_all_or_nothing(server):
+    items = [{"product_id": 1, "quantity": 2}, {"product_id": 2, "quantity": 3}]
+    orders = (await server.call_tool("create_orders_batch", {"items": items})).structured_content["result"]
+    assert [o["total_price"] for o in orders] == [100000.0, 3600.0]
+    assert all(o["id"] and o["created_at"] for o in orders)
+
+    with pytest.raises(ToolError, match="id=99"):
+        await server.call_tool("create_orders_batch", {"items": [{"product_id": 1, "quantity": 1}, {"product_id": 99, "quantity": 1}]})
+    listed = (await server.call_tool("list_orders", {})).structured_content["result"]
+    assert len(listed) == 2
+
+
+@pytest.mark.asyncio
+async def test_agent_orders_through_pool(orders_pool, monkeypatch: pytest.MonkeyPatch):
+    created = await run_agent("Закажи ID 1 x2, ID 2 x1")
+    assert created["plan"]["intent"] == "create_order"
+    assert created["answer"].startswith("Заказ оформлен:")
+    assert "Итого: 101200.0" in created["answer"]
+
+    missing = await run_agent("Закажи 3 шт товара с ID 99")
+    assert "Ошибка MCP" in missing["answer"]
+
+    results = await run_agent_batch(["Статус заказа №1", "Покажи мои заказы", "Покажи заказ 1"])
+    assert "товар #1 × 2" in results[0]["answer"]
+    assert results[0]["answer"] == results[2]["answer"]
+    assert "batched:2" in results[0]["trace"]
+    assert results[1]["answer"].count("Заказ #") == 2
+
+    # Only the newest page is listed, with the cursor for the rest.
+    monkeypatch.setattr(graph, "ORDERS_PAGE_SIZE", 1)
+    newest = await run_agent("Покажи мои заказы")
+    assert newest["answer"].count("Заказ #") == 1 and "Заказ #2 " in newest["answer"]
+    assert newest["answer"].endswith("более ранние: list_orders(before_id=2).")
+    assert orders_pool.respawns == 0
+
+
+@pytest.mark.asyncio
+async def test_list_orders_pages_by_time_and_revenue_rollups(server, monkeypatch: pytest.MonkeyPatch):
+    clock = []
+
+    class FixedClock(datetime):
+        @classmethod
+        def utcnow(cls):
+            return clock.pop(0)
+
+    monkeypatch.setattr(orders_server, "datetime", FixedClock)
+
+    async def call(tool, **args):
+        return (await server.call_tool(tool, args)).structured_content["result"]
+
+    for at, items in [
+        (datetime(2026, 1, 1, 10, 5), [{"product_id": 1, "quantity": 2}, {"product_id": 2, "quantity": 3}]),
+        (datetime(2026, 1, 1, 10, 40), [{"product_id": 1, "quantity": 1}]),
+        (datetime(2026, 1, 1, 11, 10), [{"product_id": 2, "quantity": 1}]),
+        (datetime(2026, 1, 2, 9, 0), [{"product_id": 1, "quantity": 1}]),
+    ]:
+        clock.append(at)
+        await call("create_orders_batch", items=items)
+
+    pages, before = [], None
+    while True:
+        page = await call("list_orders", limit=2, **({"before_id": before} if before else {}))
+        if not page:
+            break
+        pages.append([o["id"] for o in page])
+        before = page[-1]["id"]
+    assert pages == [[5, 4], [3, 2], [1]]
+
+    ranged = await call("list_orders", created_from="2026-01-01T10:30:00", created_to="2026-01-01T12:00:00")
+    assert [o["id"] for o in ranged] == [4, 3]
+    assert [o["id"] for o in await call("list_orders", created_from="2026-01-02T12:00:00+03:00")] == [5]
+
+    daily = await call("get_revenue")
+    assert daily == [
+        {"bucket": "2026-01-01T00:00:00", "orders": 4, "quantity": 7, "revenue": 154800.0},
+        {"bucket": "2026-01-02T00:00:00", "orders": 1, "quantity": 1, "revenue": 50000.0},
+    ]
+    hourly = await call(
+        "get_revenue", granularity="hour", group_by="category",
+        created_from="2026-01-01T10:30:00", created_to="2026-01-01T11:00:00",
+    )
+    assert hourly == [
+        {"bucket": "2026-01-01T10:00:00", "category": "продукты", "orders": 1, "quantity": 3, "revenue": 3600.0},
+        {"bucket": "2026-01-01T10:00:00", "category": "электроника", "orders": 2, "quantity": 3, "revenue": 150000.0},
+    ]
+    # Buckets overlapping [from, to) count whole, at both ends.
+    partial = await call(
+        "get_revenue", granularity="hour", created_from="2026-01-01T10:50:00", created_to="2026-01-01T11:05:00",
+    )
+    assert [(r["bucket"], r["orders"]) for r in partial] == [("2026-01-01T10:00:00", 3), ("2026-01-01T11:00:00", 1)]
+    by_product = await call("get_revenue", group_by="product", product_id=2)
+    assert [(r["bucket"][:10], r["product"], r["revenue"]) for r in by_product] == [("2026-01-01", 2, 4800.0)]
+
+    with pytest.raises(ToolError, match="granularity"):
+        await call("get_revenue", granularity="week")
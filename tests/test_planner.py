@@ -0,0 +1,40 @@
+import json
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from app.agent.mock_llm import PLANNER, plan_query
+from planner_corpus import CORPUS
+
+
+@pytest.mark.parametrize("query,expected", CORPUS)
+def test_plan_query_regression(query, expected):
+    assert plan_query(query) == expected
+
+
+@pytest.mark.asyncio
+async def test_batch_and_chat_interface_agree():
+    queries = [q for q, _ in CORPUS]
+    assert PLANNER.plan_batch(queries) == [e for _, e in CORPUS]
+    res = await PLANNER.ainvoke([HumanMessage(content=queries[0])])
+    assert json.loads(res.content) == CORPUS[0][1]
+
+
+def test_compound_part_that_only_names_a_category_keeps_the_intent():
+    assert plan_query("Какая средняя цена в категории Электроника и в категории Книги?") == {
+        "intent": "multi",
+        "plans": [{"intent": "stats", "category": "Электроника"}, {"intent": "stats", "category": "Книги"}],
+    }
+    assert plan_query("Покажи все продукты в категории Сад и Одежда")["plans"] == [
+        {"intent": "list_by_category", "category": "Сад"},
+        {"intent": "list_by_category", "category": "Одежда"},
+    ]
+
+
+def test_search_words_joined_by_and_stay_one_search():
+    # Search needs every word; only parts with their own verb become separate searches.
+    assert plan_query("Найди хлеб и молоко") == {"intent": "search", "text": "хлеб и молоко"}
+    assert plan_query("Найди хлеб и найди молоко") == {
+        "intent": "multi",
+        "plans": [{"intent": "search", "text": "хлеб"}, {"intent": "search", "text": "молоко"}],
+    }
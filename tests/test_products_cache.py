@@ -0,0 +1,130 @@
+import os
+
+import pytest
+from fastmcp import Client
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import app.mcp_server.products_server as products_server
+from app.agent.mcp_client import decode_product_rows
+from app.agent.mcp_pool import create_products_pool
+from app.agent.types import ProductRow
+from app.mcp_server.cache import TTLCache
+from app.models import Product
+
+
+@pytest.fixture
+async def server(monkeypatch: pytest.MonkeyPatch):
+    engine = create_async_engine(os.environ["DATABASE_URL"])
+    monkeypatch.setattr(products_server, "SessionLocal", async_sessionmaker(engine, expire_on_commit=False))
+    monkeypatch.setattr(products_server, "ReadSessionLocal", async_sessionmaker(engine, expire_on_commit=False))
+    monkeypatch.setattr(products_server, "_product_cache", TTLCache(maxsize=2, ttl=60))
+    monkeypatch.setattr(products_server, "_list_cache", TTLCache(maxsize=8, ttl=60))
+    async with Client(products_server.mcp) as client:
+        yield client
+    await engine.dispose()
+
+
+def test_ttl_cache_lru_and_expiry(monkeypatch: pytest.MonkeyPatch):
+    now = [100.0]
+    monkeypatch.setattr("app.mcp_server.cache.time.monotonic", lambda: now[0])
+    c = TTLCache(maxsize=2, ttl=10)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1
+    c.set("c", 3)  # evicts "b", the least recently used
+    assert c.get("b") is None
+    now[0] += 11
+    assert c.get("a") is None
+    assert (c.hits, c.misses, c.evictions, c.expirations) == (1, 2, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_reads_are_cached_and_writes_invalidate(server):
+    async def call(tool, **args):
+        return (await server.call_tool(tool, args)).structured_content
+
+    await call("get_product", id=1)
+    await call("get_product", id=1)
+    first = await call("list_products", category="электроника")
+    await call("list_products", category="ЭЛЕКТРОНИКА")
+
+    stats = await call("cache_stats")
+    assert (stats["get_product"]["hits"], stats["get_product"]["misses"]) == (1, 1)
+    assert (stats["list_products"]["hits"], stats["list_products"]["misses"]) == (1, 1)
+
+    await call("add_product", name="Мышка", price=1500, category="Электроника")
+    after = await call("list_products", category="Электроника")
+    assert len(after["result"]) == len(first["result"]) + 1
+    assert (await call("cache_stats"))["list_products"]["invalidations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_list_cache_sees_writes_from_other_server_processes(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("MCP_TRANSPORT", "stdio")
+    monkeypatch.setenv("MCP_POOL_SIZE", "2")
+    pool = create_products_pool()
+    await pool.start()
+    try:
+        # Two sessions held at once are two server processes, each with its own cache.
+        async with pool.session() as reader, pool.session() as writer:
+            before = await reader.list_products(category="Электроника")
+            assert [p.name for p in await reader.list_products(category="Электроника")] == ["Ноутбук"]
+            await writer.add_product(name="Мышка", price=1500, category="Электроника")
+            after = await reader.list_products(category="Электроника")
+            assert [p.name for p in after] == [p.name for p in before] + ["Мышка"]
+            stats = (await reader._call("cache_stats", {}))["list_products"]
+            assert (stats["hits"], stats["misses"]) == (1, 2)
+    finally:
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_compact_pages_decode_to_product_rows(server):
+    async def call(tool, **args):
+        return (await server.call_tool(tool, args)).structured_content["result"]
+
+    dicts = await call("list_products")
+    compact = await call("list_products", compact=True)
+    assert compact["columns"] == ["id", "name", "price", "category", "in_stock"]
+    assert [dict(zip(compact["columns"], r)) for r in compact["rows"]] == dicts
+
+    rows = decode_product_rows(compact)
+    assert rows == decode_product_rows(dicts)
+    assert rows[0] == ProductRow(1, "Ноутбук", 50000.0, "Электроника", True)
+    assert rows[1]._asdict() == dicts[1]
+    # Column order comes from the payload, not from position.
+    reordered = {"columns": compact["columns"][::-1], "rows": [r[::-1] for r in compact["rows"]]}
+    assert decode_product_rows(reordered) == rows
+
+
+@pytest.mark.asyncio
+async def test_price_distribution_is_cached_until_write(server, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(products_server, "_price_stats", products_server.PriceStatsCache())
+
+    async def call(tool, **args):
+        return (await server.call_tool(tool, args)).structured_content
+
+    overall = await call("get_price_distribution", bins=2)
+    assert (overall["count"], overall["median"], overall["max"]) == (2, 25600.0, 50000.0)
+    assert overall["stddev"] == 24400.0
+    assert overall["histogram"] == {"edges": [1200.0, 25600.0, 50000.0], "counts": [1, 1]}
+    assert overall["categories"]["электроника"]["p99"] == 50000.0
+
+    await call("get_price_distribution", category="ЭЛЕКТРОНИКА")
+    assert (await call("cache_stats"))["price_snapshot_builds"] == 1
+
+    await call("add_product", name="Мышка", price=1500, category="Электроника")
+    el = await call("get_price_distribution", category="Электроника")
+    assert (el["category"], el["count"], el["min"], el["median"]) == ("Электроника", 2, 1500.0, 25750.0)
+    assert (await call("cache_stats"))["price_snapshot_builds"] == 2
+
+    # A category move leaves the catalog-wide count, sum, min and max as they were.
+    async with products_server.SessionLocal() as s:
+        mouse = (await s.execute(select(Product).where(Product.name == "Мышка"))).scalar_one()
+        mouse.category = "Аксессуары"
+        await s.commit()
+    per = (await call("get_price_distribution"))["categories"]
+    assert (per["электроника"]["count"], per["аксессуары"]["count"]) == (1, 1)
+
+    assert "error" in await call("get_price_distribution", bins=0)
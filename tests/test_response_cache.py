@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from app.agent.graph import run_agent
+from app.agent.mcp_pool import create_products_pool, set_products_pool
+from app.agent.response_cache import ALL_PRODUCTS, ResponseCache, plan_cache_key
+
+
+@pytest.fixture
+async def pool(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("MCP_POOL_SIZE", "1")
+    p = create_products_pool()
+    await p.start()
+    set_products_pool(p)
+    yield p
+    set_products_pool(None)
+    await p.close()
+
+
+def test_plan_cache_key_normalizes_category():
+    a = plan_cache_key({"intent": "list_by_category", "category": "Электроника"})
+    b = plan_cache_key({"intent": "list_by_category", "category": " электроника "})
+    assert a == b == (("list_by_category", "электроника"), "электроника")
+    assert plan_cache_key({"intent": "stats"}) == (("stats", None), ALL_PRODUCTS)
+    assert plan_cache_key({"intent": "discount", "product_id": "2", "discount_percent": 15}) == (
+        ("discount", 2, 15.0),
+        ("product", 2),
+    )
+    assert plan_cache_key({"intent": "add_product", "category": "Электроника"}) is None
+
+
+@pytest.mark.asyncio
+async def test_single_flight_and_invalidation():
+    cache = ResponseCache(maxsize=8, ttl=60)
+    calls = 0
+    gate = asyncio.Event()
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await gate.wait()
+        return f"answer {calls}", True
+
+    tasks = [asyncio.create_task(cache.get_or_compute("k", compute, tag="a")) for _ in range(3)]
+    await asyncio.sleep(0)
+    gate.set()
+    results = await asyncio.gather(*tasks)
+    assert calls == 1
+    assert sorted(src for _, src in results) == ["coalesced", "coalesced", "miss"]
+    assert await cache.get_or_compute("k", compute, tag="a") == ("answer 1", "hit")
+
+    # Statistics depend on every category, so any add drops them.
+    await cache.get_or_compute("s", compute, tag=ALL_PRODUCTS)
+    cache.invalidate_category("A")
+    assert (await cache.get_or_compute("k", compute, tag="a"))[1] == "miss"
+    assert (await cache.get_or_compute("s", compute, tag=ALL_PRODUCTS))[1] == "miss"
+
+
+@pytest.mark.asyncio
+async def test_waiters_outlive_a_cancelled_owner():
+    cache = ResponseCache(maxsize=8, ttl=60)
+    calls = 0
+    gate = asyncio.Event()
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await gate.wait()
+        return f"answer {calls}", True
+
+    owner = asyncio.create_task(cache.get_or_compute("k", compute))
+    await asyncio.sleep(0)
+    waiters = [asyncio.create_task(cache.get_or_compute("k", compute)) for _ in range(2)]
+    await asyncio.sleep(0)
+    owner.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await owner
+    await asyncio.sleep(0)
+    gate.set()
+    # One waiter takes the computation over, the other joins it.
+    assert sorted(await asyncio.gather(*waiters)) == [("answer 2", "coalesced"), ("answer 2", "miss")]
+    assert calls == 2
+    assert await cache.get_or_compute("k", compute) == ("answer 2", "hit")
+
+
+@pytest.mark.asyncio
+async def test_stale_and_error_results_are_not_stored():
+    cache = ResponseCache(maxsize=8, ttl=60)
+
+    async def racing_write():
+        cache.invalidate_category("a")  # a write lands while we compute
+        return "stale", True
+
+    assert await cache.get_or_compute("k", racing_write, tag="a") == ("stale", "miss")
+
+    async def failing():
+        return "Ошибка", False
+
+    assert await cache.get_or_compute("e", failing) == ("Ошибка", "miss")
+    assert cache.stats()["size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_agent_serves_repeats_from_cache_until_add(pool):
+    first = await run_agent("Покажи все продукты в категории Электроника")
+    again = await run_agent("покажи все продукты в категории  электроника")
+    assert again["answer"] == first["answer"]
+    assert again["trace"][-1] == "cache:hit"
+
+    added = await run_agent("Добавь новый продукт: Мышка, цена 1500, категория Электроника")
+    assert "Мышка" in added["answer"]
+
+    after = await run_agent("Покажи все продукты в категории Электроника")
+    assert "Мышка" in after["answer"]
+    assert "cache:hit" not in after["trace"]
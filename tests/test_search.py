@@ -0,0 +1,74 @@
+import os
+
+import pytest
+from fastmcp import Client
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import app.mcp_server.products_server as products_server
+from app.api import app
+from app.mcp_server.bulk_import import import_records, validate_row
+from app.mcp_server.search import edits1, match_expression, query_tokens
+
+
+@pytest.fixture
+async def server(monkeypatch: pytest.MonkeyPatch):
+    engine = create_async_engine(os.environ["DATABASE_URL"])
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(products_server, "SessionLocal", Session)
+    monkeypatch.setattr(products_server, "ReadSessionLocal", Session)
+    async with Client(products_server.mcp) as client:
+        yield client, Session
+    await engine.dispose()
+
+
+def test_query_parsing():
+    assert query_tokens("  Ноутбук, LENOVO ноутбук!") == ["ноутбук", "lenovo"]
+    assert {"ноутбук", "нотбук", "ноутбкук", "ноутбук"} & edits1("ноутбук") == {"нотбук", "ноутбкук"}
+    assert "нутобук" not in edits1("ноутбук")  # two edits
+    assert match_expression(["нотбук", "le"], {"нотбук": ["ноутбук"]}) == '("нотбук"* OR "ноутбук") AND "le"*'
+
+
+@pytest.mark.sqlite_only
+@pytest.mark.asyncio
+async def test_search_ranks_prefixes_typos_and_pages(server):
+    client, Session = server
+
+    async def search(**args):
+        return (await client.call_tool("search_products", args)).structured_content
+
+    await client.call_tool("add_product", {"name": "Чехол для ноутбука", "price": 900, "category": "Аксессуары"})
+    row = validate_row({"name": "Ноутбук игровой", "price": 90000, "category": "Электроника", "in_stock": True})
+    await import_records(Session, [(1, row, None)])
+
+    # Indexed by triggers on every write path; name hits outrank the rest.
+    res = await search(query="НОУТ")
+    assert [p["name"] for p in res["items"]][:2] == ["Ноутбук", "Ноутбук игровой"]
+    assert len(res["items"]) == 3 and res["next_offset"] is None and res["corrections"] == {}
+
+    res = await search(query="нотбук игровой")
+    assert [p["name"] for p in res["items"]] == ["Ноутбук игровой"]
+    assert res["corrections"] == {"нотбук": ["ноутбук"]}
+
+    # Every word must match: name and category words combine.
+    assert [p["name"] for p in (await search(query="кофе продукты"))["items"]] == ["Кофе"]
+    assert (await search(query="кофе электроника"))["items"] == []
+
+    page1 = await search(query="ноутбук", limit=2)
+    page2 = await search(query="ноутбук", limit=2, offset=page1["next_offset"])
+    assert page1["next_offset"] == 2 and page2["next_offset"] is None
+    assert len({p["id"] for p in page1["items"] + page2["items"]}) == 3
+
+    assert "error" in await search(query="кофе", limit=0)
+
+
+@pytest.mark.asyncio
+async def test_agent_search_query():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.post("/api/v1/agent/query", json={"query": "Найди ноутбук"})
+        assert r.status_code == 200
+        data = r.json()
+        assert data["plan"] == {"intent": "search", "text": "ноутбук"}
+        assert "Ноутбук" in data["answer"] and "Кофе" not in data["answer"]
+        assert "called:search_products" in data["trace"]
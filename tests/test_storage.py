@@ -0,0 +1,101 @@
+import json
+import threading
+
+import pytest
+
+from app.mcp_server.storage import ProductStore, _FileLock
+
+
+@pytest.mark.asyncio
+async def test_store_indexes_and_appends(tmp_path):
+    path = tmp_path / "products.jsonl"
+    store = ProductStore(str(path))
+    await store.add_product("Ноутбук", 50000, "Электроника")
+    await store.add_product("Кофе", 1200, "Продукты", in_stock=False)
+    await store.add_product("Мышка", 1500, "электроника")
+
+    assert [p.name for p in await store.list_products("ЭЛЕКТРОНИКА")] == ["Ноутбук", "Мышка"]
+    assert (await store.get_product(2)).in_stock is False
+    assert not hasattr(await store.get_product(2), "__dict__")  # slots
+    assert await store.get_statistics() == {"count": 3, "avg_price": 17566.666666666668}
+    with pytest.raises(ValueError):
+        await store.get_product(99)
+    # One JSON line per write, nothing rewritten.
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 3
+
+
+@pytest.mark.asyncio
+async def test_store_sees_other_writers_and_converts_legacy_json(tmp_path):
+    path = tmp_path / "products.json"
+    path.write_text(json.dumps([
+        {"id": 1, "name": "Ноутбук", "price": 50000, "category": "Электроника", "in_stock": True},
+    ]), encoding="utf-8")
+    reader = ProductStore(str(path))
+    writer = ProductStore(str(path))
+    assert path.read_text(encoding="utf-8").startswith("{")  # converted to JSON Lines
+
+    added = await writer.add_product("Кофе", 1200, "Продукты")
+    assert added.id == 2
+    assert (await reader.get_product(2)).name == "Кофе"  # picked up from the appended tail
+
+    writer.compact()  # new file (inode) -> full reload on the reader side
+    assert (await reader.add_product("Чай", 300, "Продукты")).id == 3
+    assert [p.id for p in await writer.list_products("продукты")] == [2, 3]
+
+
+@pytest.mark.asyncio
+async def test_legacy_conversion_holds_the_file_lock(tmp_path):
+    path = tmp_path / "products.json"
+    legacy = json.dumps([{"id": 1, "name": "Ноутбук", "price": 50000, "category": "Электроника", "in_stock": True}])
+    path.write_text(legacy, encoding="utf-8")
+
+    # Another process holds the lock and converts the file meanwhile: the
+    # conversion waits, then finds JSON Lines and loads them as they are.
+    stores = []
+    with _FileLock(path.with_suffix(".json.lock")):
+        opening = threading.Thread(target=lambda: stores.append(ProductStore(str(path))))
+        opening.start()
+        opening.join(0.3)
+        assert opening.is_alive() and path.read_text(encoding="utf-8") == legacy
+        converted = tmp_path / "converted.jsonl"
+        converted.write_text(
+            "".join(json.dumps({**json.loads(legacy)[0], "id": i}) + "\n" for i in (1, 2)), encoding="utf-8"
+        )
+        converted.replace(path)
+    opening.join(5)
+    assert [p.id for p in await stores[0].list_products()] == [1, 2]
+
+    # A writer that finds a legacy file under its own lock converts it, then appends.
+    store = ProductStore(str(path))
+    restored = tmp_path / "restored.json"
+    restored.write_text(legacy, encoding="utf-8")
+    restored.replace(path)
+    assert (await store.add_product("Кофе", 1200, "Продукты")).id == 2
+    assert [json.loads(line)["id"] for line in path.read_text(encoding="utf-8").splitlines()] == [1, 2]
+    assert (await stores[0].get_product(2)).name == "Кофе"
+
+
+@pytest.mark.asyncio
+async def test_store_compacts_superseded_records(tmp_path):
+    path = tmp_path / "products.jsonl"
+    record = {"id": 1, "name": "Ноутбук", "price": 50000, "category": "Электроника", "in_stock": True}
+    path.write_text("".join(json.dumps({**record, "price": 100 + i}) + "\n" for i in range(5)), encoding="utf-8")
+    store = ProductStore(str(path), compact_min_garbage=2)
+    assert (await store.get_product(1)).price == 104  # last line wins
+    assert await store.get_statistics() == {"count": 1, "avg_price": 104.0}
+
+    await store.add_product("Кофе", 1200, "Продукты")
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 2
+
+
+@pytest.mark.asyncio
+async def test_store_price_distribution(tmp_path):
+    store = ProductStore(str(tmp_path / "products.jsonl"))
+    for price in (100, 200, 300, 400):
+        await store.add_product("Товар", price, "Дом")
+    dist = await store.get_price_distribution("дом", bins=4)
+    assert (dist["count"], dist["median"], dist["p90"]) == (4, 250.0, 370.0)
+    assert dist["histogram"]["counts"] == [1, 1, 1, 1]
+
+    await store.add_product("Товар", 1000, "Дом")
+    assert (await store.get_price_distribution(bins=4))["max"] == 1000.0
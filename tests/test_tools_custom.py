@@ -0,0 +1,35 @@
+import json
+import logging
+
+import pytest
+
+from app.agent import tools_custom
+from app.agent.tools_custom import format_products
+from app.agent.types import ProductRow
+from app.log import JsonFormatter
+
+
+def test_format_products_is_quiet_and_logs_sampled_structured_records(
+    capsys: pytest.CaptureFixture, caplog: pytest.LogCaptureFixture, monkeypatch: pytest.MonkeyPatch
+):
+    rows = [{"id": 1, "name": "Ноутбук", "price": 50000, "category": "Электроника", "in_stock": True}, "junk"]
+
+    monkeypatch.setattr(tools_custom, "LOG_SAMPLE_RATE", 0.0)
+    with caplog.at_level(logging.DEBUG, logger="app.agent.tools_custom"):
+        assert format_products.invoke({"products": rows}) == "#1 — Ноутбук — 50000 — Электроника — в наличии"
+    assert capsys.readouterr().out == ""
+    assert not caplog.records
+
+    monkeypatch.setattr(tools_custom, "LOG_SAMPLE_RATE", 1.0)
+    with caplog.at_level(logging.DEBUG, logger="app.agent.tools_custom"):
+        format_products.invoke({"products": rows})
+    (record,) = caplog.records
+    data = json.loads(JsonFormatter().format(record))
+    assert (data["tool"], data["rows"], data["skipped"]) == ("format_products", 1, 1)
+
+
+def test_format_products_accepts_product_rows():
+    rows = [ProductRow(1, "Ноутбук", 50000.0, "Электроника", True), ProductRow(2, "Кофе", 1200.0, "Продукты", False)]
+    assert format_products.func(rows) == format_products.func([r._asdict() for r in rows]) == (
+        "#1 — Ноутбук — 50000.0 — Электроника — в наличии\n#2 — Кофе — 1200.0 — Продукты — нет в наличии"
+    )